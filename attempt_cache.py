@@ -0,0 +1,80 @@
+import os
+from typing import NamedTuple, Optional
+from metrics import TimedORJSONResponse
+from sqlmodel import Session, select
+from cache import LRUCache
+from models import QuizAttempt, AttemptAnswer, Question
+from retention import load_archived_attempt
+
+ATTEMPT_CACHE_SIZE = int(os.getenv("ATTEMPT_CACHE_SIZE", "1000"))
+
+# A submitted attempt never changes, but its detail view embeds question text and
+# the correct option, so entries are keyed by the question table version too and
+# fall out of use as soon as any question is written.
+attempt_cache = LRUCache("attempt_details", ATTEMPT_CACHE_SIZE)
+
+
+class AttemptDetails(NamedTuple):
+    user_id: int
+    etag: str
+    body: bytes
+
+
+def attempt_details_query(attempt_id: int):
+    # Attempt, answers and question fields in one statement; the outer join keeps
+    # attempts without answers, and answers whose question was deleted come back NULL
+    return (
+        select(
+            QuizAttempt.user_id, QuizAttempt.score, QuizAttempt.total_questions, QuizAttempt.attempted_at,
+            AttemptAnswer.question_id, AttemptAnswer.selected_option, AttemptAnswer.is_correct,
+            Question.text, Question.correct_answer,
+        )
+        .select_from(QuizAttempt)
+        .outerjoin(AttemptAnswer, AttemptAnswer.attempt_id == QuizAttempt.id)
+        .outerjoin(Question, Question.id == AttemptAnswer.question_id)
+        .where(QuizAttempt.id == attempt_id)
+    )
+
+
+def load_attempt_details(session: Session, attempt_id: int, question_version: int) -> Optional[AttemptDetails]:
+    key = (attempt_id, question_version)
+    details = attempt_cache.get(key)
+    if details is not None:
+        return details
+    rows = session.exec(attempt_details_query(attempt_id)).all()
+    if rows:
+        attempt = rows[0]
+        user_id = attempt.user_id
+        payload = {
+            "attempt_id": attempt_id,
+            "score": attempt.score,
+            "total_questions": attempt.total_questions,
+            "attempted_at": attempt.attempted_at.isoformat(),
+            "answers": [
+                {
+                    "question_id": row.question_id,
+                    "question_text": row.text,
+                    "selected_option": row.selected_option,
+                    "is_correct": row.is_correct,
+                    "correct_option": row.correct_answer
+                }
+                for row in rows if row.text is not None
+            ]
+        }
+    else:
+        # Moved out by the retention job (see retention.py)
+        archived = load_archived_attempt(session, attempt_id)
+        if archived is None:
+            return None
+        user_id = archived["user_id"]
+        payload = {
+            "attempt_id": attempt_id,
+            "score": archived["score"],
+            "total_questions": archived["total_questions"],
+            "attempted_at": archived["attempted_at"].isoformat(),
+            "answers": archived["answers"]
+        }
+    # Rendered once; hits are served as bytes without re-serializing
+    details = AttemptDetails(user_id, f'"attempt-{attempt_id}-{question_version}"', TimedORJSONResponse(payload).body)
+    attempt_cache.put(key, details)
+    return details
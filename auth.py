@@ -1,21 +1,41 @@
+import os
+import time
+import threading
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import delete
 from sqlmodel import Session, select
 from database import get_session
-from models import User
+from models import User, TokenRevocation
+from cache import TTLCache, VersionWatch, bump_version
+from hashing import pwd_context
 
 SECRET_KEY = "supersecretkey"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+# Tokens carry user_id/is_admin and requests are authorized from the claims alone, with no
+# user lookup; demotions take effect through revoke_tokens(). Off by default.
+AUTH_CLAIMS_ONLY = os.getenv("AUTH_CLAIMS_ONLY", "false").lower() in ("1", "true", "yes")
+# How long a worker trusts its cached users and revocation list before re-reading the "auth"
+# cacheversion row. A change made through invalidate_user() or revoke_tokens() in another
+# worker applies there within this long; in the worker that made it, at once.
+AUTH_POLL_SECONDS = float(os.getenv("AUTH_POLL_SECONDS", "5"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
-
-def hash_password(password: str):
-    return pwd_context.hash(password)
+principal_cache = TTLCache("principals", PRINCIPAL_CACHE_SIZE)
+# Verified token -> (claims, claims-only principal or None), until the token's exp
+token_cache = TTLCache("tokens", TOKEN_CACHE_SIZE)
+# user_id -> time of revocation; tokens issued up to then are refused. A copy of the
+# tokenrevocation table, whose rows outlive every token they could apply to and are then
+# dropped, never evicted early.
+revocations = {}
+_revocations_lock = threading.Lock()
+# Bumped with every change to a user row or to the revocations
+auth_watch = VersionWatch("auth", AUTH_POLL_SECONDS)
 
 def verify_password(password: str, hashed: str):
     return pwd_context.verify(password, hashed)
@@ -23,19 +43,84 @@ def verify_password(password: str, hashed: str):
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": time.time()})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
+def access_token_for(user: User):
+    claims = {"sub": user.email}
+    if AUTH_CLAIMS_ONLY:
+        claims.update({"user_id": user.id, "is_admin": user.is_admin})
+    return create_access_token(claims)
+
+def invalidate_user(session: Session, email: str):
+    # Call in the transaction that changes a user's row (e.g. is_admin), so every worker reloads it
+    bump_version(session, auth_watch.name)
+    principal_cache.pop(email)
+
+def revoke_tokens(session: Session, user_id: int):
+    # Call when a claims-only token must stop working early (e.g. the user was demoted);
+    # takes effect when the caller commits
+    now = time.time()
+    session.execute(delete(TokenRevocation).where(TokenRevocation.revoked_at < now - ACCESS_TOKEN_EXPIRE_MINUTES * 60))
+    session.merge(TokenRevocation(user_id=user_id, revoked_at=now))
+    bump_version(session, auth_watch.name)
+    with _revocations_lock:
+        revocations[user_id] = now
+
+def sync_auth(session: Session):
+    # Another worker changed a user or revoked tokens: drop every cached user and reload the list
+    if not auth_watch.poll(session):
+        return
+    principal_cache.clear()
+    since = time.time() - ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    rows = session.exec(select(TokenRevocation.user_id, TokenRevocation.revoked_at).where(TokenRevocation.revoked_at >= since)).all()
+    with _revocations_lock:
+        revocations.clear()
+        revocations.update(rows)
+
+def is_revoked(claims: dict) -> bool:
+    revoked_at = revocations.get(claims["user_id"])
+    return revoked_at is not None and claims.get("iat", 0) <= revoked_at
+
+def verify_token(token: str):
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    principal = None
+    if "user_id" in payload and "is_admin" in payload:
+        # Built once per token; routes only read id, email and is_admin
+        principal = User(id=payload["user_id"], email=payload["sub"], is_admin=payload["is_admin"], hashed_password="")
+    entry = (payload, principal)
+    if payload.get("exp"):
+        token_cache.put(token, entry, payload["exp"])
+    return entry
+
+async def get_current_user(token: str = Depends(oauth2_scheme), session=Depends(get_session)):
+    # Repeat tokens skip signature verification and JSON parsing
+    payload, principal = verify_token(token)
+    # No thread hop (or read) while the last check is recent enough
+    if auth_watch.due():
+        await session.run_sync(sync_auth)
+    if AUTH_CLAIMS_ONLY and principal is not None:
+        if is_revoked(payload):
+            raise HTTPException(status_code=401, detail="Token revoked")
+        return principal
 
-    user = session.exec(select(User).where(User.email == email)).first()
+    email = payload["sub"]
+    user = principal_cache.get(email)
+    if user is not None:
+        return user
+    user = (await session.exec(select(User).where(User.email == email))).first()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
-    return user
\ No newline at end of file
+    # Cached detached, for no longer than the token that loaded it is valid
+    session.expunge(user)
+    if payload.get("exp"):
+        principal_cache.put(email, user, payload["exp"])
+    return user
@@ -0,0 +1,106 @@
+"""
+GET /quiz/attempts/{id} latency by number of answers in the attempt.
+
+"legacy" is the previous implementation (attempt, its answers, then one
+session.get per answer); "joined" is the single-query build with the detail
+cache cleared before every call; "cached" serves the pre-rendered body from
+the cache (one cacheversion lookup). All paths run against the same
+sync-mode session with no HTTP layer.
+
+    python -m bench.attempt_details [--answers 10,100,1000] [--iterations 200]
+"""
+
+import argparse
+import random
+from bench import common
+
+
+def legacy_details(session, attempt_id):
+    from sqlmodel import select
+    from models import QuizAttempt, AttemptAnswer, Question
+    attempt = session.get(QuizAttempt, attempt_id)
+    answers = session.exec(select(AttemptAnswer).where(AttemptAnswer.attempt_id == attempt_id)).all()
+    details = []
+    for answer in answers:
+        question = session.get(Question, answer.question_id)
+        if question:
+            details.append({
+                "question_id": answer.question_id,
+                "question_text": question.text,
+                "selected_option": answer.selected_option,
+                "is_correct": answer.is_correct,
+                "correct_option": question.correct_answer
+            })
+    return {"attempt_id": attempt.id, "score": attempt.score, "total_questions": attempt.total_questions,
+            "attempted_at": attempt.attempted_at.isoformat(), "answers": details}
+
+
+def seed_attempt(user_id, bank, n):
+    from sqlalchemy import insert
+    from sqlmodel import Session
+    from database import engine
+    from models import QuizAttempt, AttemptAnswer
+    with Session(engine) as session:
+        attempt = QuizAttempt(user_id=user_id, score=0, total_questions=n)
+        session.add(attempt)
+        session.flush()
+        session.execute(insert(AttemptAnswer), [
+            {"attempt_id": attempt.id, "question_id": qid, "selected_option": f"{qid - 1}-a", "is_correct": True}
+            for qid in random.sample(range(1, bank + 1), n)
+        ])
+        session.commit()
+        return attempt.id
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--answers", default="10,100,1000")
+    parser.add_argument("--bank", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    tmp = common.use_temp_database()
+    try:
+        from sqlmodel import Session
+        from database import engine, init_db
+        from attempt_cache import attempt_cache, load_attempt_details
+        from response_cache import question_versions
+
+        init_db()
+        common.seed_questions(args.bank)
+        user_id, _ = common.seed_user("bench@example.com")
+
+        rows = []
+        for n in (int(a) for a in args.answers.split(",")):
+            attempt_id = seed_attempt(user_id, args.bank, n)
+            with Session(engine) as session:
+                version = question_versions.sync(session)
+
+                # expunge_all: each call starts with an empty identity map, as a request would
+                def legacy():
+                    session.expunge_all()
+                    legacy_details(session, attempt_id)
+
+                def joined():
+                    attempt_cache.clear()
+                    load_attempt_details(session, attempt_id, version)
+
+                def cached():
+                    load_attempt_details(session, attempt_id, version)
+
+                old = common.measure(legacy, args.iterations)
+                new = common.measure(joined, args.iterations)
+                hit = common.measure(cached, args.iterations)
+            rows.append((n, old["p50_ms"], new["p50_ms"], hit["p50_ms"], old["p99_ms"], new["p99_ms"], hit["p99_ms"],
+                         old["mean_ms"] / new["mean_ms"]))
+        common.print_table(
+            f"Attempt detail latency in ms ({args.iterations} calls each)",
+            ["answers", "legacy p50", "joined p50", "cached p50", "legacy p99", "joined p99", "cached p99", "speedup"],
+            rows,
+        )
+    finally:
+        common.remove_temp_database(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Per-request overhead of the get_current_user dependency.
+
+Calls the dependency directly (no HTTP layer) against a seeded users table:
+
+- token cached / cold: the verified-token cache warm, or cleared before
+  every call so the JWT is verified and parsed again (principal cache warm)
+- claims-only: AUTH_CLAIMS_ONLY with a token carrying user_id/is_admin,
+  which never needs the user row; cached and cold token
+- principal cache cleared: both caches cleared, so every call also looks
+  the user up by email, with and without the email index (the original
+  behaviour)
+
+    python -m bench.auth_overhead [--users 100000] [--iterations 2000]
+"""
+
+import argparse
+from bench import common
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    tmp = common.use_temp_database()
+    try:
+        from sqlalchemy import text
+        from database import engine, init_db
+        import auth
+        from auth import get_current_user, principal_cache, token_cache, create_access_token
+        from hashing import hash_password
+
+        init_db()
+
+        hashed = hash_password(common.BENCH_PASSWORD)
+        conn = common.raw_connection()
+        conn.cursor().executemany(
+            "INSERT INTO user (email, hashed_password, is_admin) VALUES (?, ?, 0)",
+            ((f"user{i}@example.com", hashed) for i in range(args.users)),
+        )
+        conn.commit()
+        conn.close()
+        user_id, headers = common.seed_user("bench@example.com")
+        token = headers["Authorization"].split()[1]
+        claims_token = create_access_token({"sub": "bench@example.com", "user_id": user_id, "is_admin": False})
+
+        def call(token):
+            session = common.threaded_session()
+            common.run_async(get_current_user(token, session))
+            common.run_async(session.close())
+
+        def cold(token):
+            token_cache.clear()
+            call(token)
+
+        def uncached():
+            principal_cache.clear()
+            cold(token)
+
+        rows = [("token cached",) + stats(common.measure(lambda: call(token), args.iterations))]
+        rows.append(("token cold",) + stats(common.measure(lambda: cold(token), args.iterations)))
+        auth.AUTH_CLAIMS_ONLY = True
+        rows.append(("claims-only, token cached",) + stats(common.measure(lambda: call(claims_token), args.iterations)))
+        rows.append(("claims-only, token cold",) + stats(common.measure(lambda: cold(claims_token), args.iterations)))
+        auth.AUTH_CLAIMS_ONLY = False
+        rows.append(("principal cache cleared, email index",) + stats(common.measure(uncached, args.iterations)))
+        with engine.begin() as c:
+            c.execute(text("DROP INDEX ix_user_email"))
+        rows.append(("principal cache cleared, no index",) + stats(common.measure(uncached, max(20, args.iterations // 100))))
+        common.print_table(
+            f"get_current_user overhead per request (ms), {args.users} users",
+            ["mode", "mean", "p50", "p99"],
+            rows,
+        )
+    finally:
+        common.remove_temp_database(tmp)
+
+
+def stats(s):
+    return (s["mean_ms"], s["p50_ms"], s["p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Question bank import/export throughput in rows/sec.
+
+Imports --rows questions through POST /questions/import as NDJSON and as
+CSV, compares against the previous way of loading a bank (one
+POST /questions per question, measured on --single-rows and reported as
+rows/sec), then streams the whole table back out through
+GET /questions/export in both formats. Runs the app in-process.
+
+    python -m bench.bulk_questions [--rows 100000] [--batch-size 1000]
+"""
+
+import argparse
+import json
+import time
+from bench import common
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--single-rows", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    tmp = common.use_temp_database()
+    try:
+        from fastapi.testclient import TestClient
+        import main as app_main
+        from bulk import csv_lines
+
+        _, headers = common.seed_user("admin@example.com", is_admin=True)
+        client = TestClient(app_main.app)
+        questions = [{"text": f"Question {i}?", "options": [f"{i}-a", f"{i}-b", f"{i}-c", f"{i}-d"], "correct_answer": f"{i}-a"}
+                     for i in range(args.rows)]
+        ndjson = "".join(json.dumps(q) + "\n" for q in questions).encode()
+        csv_body = csv_lines([["text", "options", "correct_answer"]] +
+                             [[q["text"], json.dumps(q["options"]), q["correct_answer"]] for q in questions]).encode()
+
+        rows = []
+        t0 = time.perf_counter()
+        for q in questions[:args.single_rows]:
+            client.post("/questions", json=q, headers=headers).raise_for_status()
+        rows.append(("import", "one POST per row", args.single_rows, args.single_rows / (time.perf_counter() - t0)))
+
+        for fmt, body in (("ndjson", ndjson), ("csv", csv_body)):
+            t0 = time.perf_counter()
+            r = client.post(f"/questions/import?format={fmt}&batch_size={args.batch_size}", content=body, headers=headers)
+            r.raise_for_status()
+            assert r.json()["inserted"] == args.rows, r.json()
+            rows.append(("import", fmt, args.rows, args.rows / (time.perf_counter() - t0)))
+
+        total = args.single_rows + 2 * args.rows
+        for fmt in ("ndjson", "csv"):
+            t0 = time.perf_counter()
+            with client.stream("GET", f"/questions/export?format={fmt}", headers=headers) as r:
+                size = sum(len(chunk) for chunk in r.iter_bytes())
+            rows.append(("export", fmt, total, total / (time.perf_counter() - t0)))
+            assert size > 0
+        common.print_table(
+            f"Question bank throughput (batch size {args.batch_size})",
+            ["direction", "format", "rows", "rows/s"],
+            rows,
+        )
+    finally:
+        common.remove_temp_database(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Shared helpers for the benchmark scripts in this directory.
+
+Each script runs the app in-process against a throwaway SQLite file, so no
+server needs to be running. Run them from the repository root, e.g.:
+
+    python -m bench.quiz_sampling
+
+Requires httpx (for FastAPI's TestClient) in addition to requirements.txt.
+"""
+
+import os
+import sys
+import json
+import asyncio
+import threading
+import subprocess
+import shutil
+import tempfile
+import time
+import random
+import statistics
+from datetime import datetime, timedelta
+
+BENCH_PASSWORD = "bench123"
+
+
+def use_temp_database():
+    # Must run before main/database are imported: the engine reads DATABASE_URL at import time.
+    tmp = tempfile.mkdtemp(prefix="quizbench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'quiz.db')}"
+    return tmp
+
+
+def remove_temp_database(tmp):
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+def run_isolated(module, env, argv):
+    # Settings such as DATABASE_MODE are read at import time, so each configuration gets its own interpreter
+    out = subprocess.run(
+        [sys.executable, "-m", module, "--run", *map(str, argv)],
+        env={**os.environ, **env}, capture_output=True, text=True,
+    )
+    if out.returncode != 0:
+        raise RuntimeError(f"{module} {env} failed:\n{out.stderr}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def raw_connection():
+    from database import engine
+    return engine.raw_connection()
+
+
+def seed_questions(n, start=0, batch=50_000):
+    conn = raw_connection()
+    try:
+        cur = conn.cursor()
+        for lo in range(start, start + n, batch):
+            hi = min(lo + batch, start + n)
+            cur.executemany(
+                "INSERT INTO question (text, options, correct_answer) VALUES (?, ?, ?)",
+                ((f"Question {i}?", json.dumps([f"{i}-a", f"{i}-b", f"{i}-c", f"{i}-d"]), f"{i}-a") for i in range(lo, hi)),
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def seed_user(email, is_admin=False):
+    from sqlmodel import Session, select
+    from database import engine
+    from models import User
+    from hashing import hash_password
+    from auth import create_access_token
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.email == email)).first()
+        if not user:
+            user = User(email=email, hashed_password=hash_password(BENCH_PASSWORD), is_admin=is_admin)
+            session.add(user)
+            session.commit()
+            session.refresh(user)
+        return user.id, {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+
+def seed_users(n, prefix="user"):
+    # One bcrypt hash shared by every seeded user (same password), so seeding stays fast
+    from hashing import hash_password
+    from auth import create_access_token
+    hashed = hash_password(BENCH_PASSWORD)
+    conn = raw_connection()
+    try:
+        cur = conn.cursor()
+        emails = [f"{prefix}{i}@example.com" for i in range(n)]
+        cur.executemany("INSERT INTO user (email, hashed_password, is_admin) VALUES (?, ?, 0)", ((e, hashed) for e in emails))
+        conn.commit()
+        ids = [row[0] for row in cur.execute(f"SELECT id FROM user WHERE email LIKE '{prefix}%@example.com' ORDER BY id")]
+    finally:
+        conn.close()
+    return [(user_id, email, {"Authorization": f"Bearer {create_access_token({'sub': email})}"}) for user_id, email in zip(ids, emails)]
+
+
+def seed_attempts(users, attempts, answers, bank):
+    conn = raw_connection()
+    try:
+        cur = conn.cursor()
+        start = datetime(2024, 1, 1)
+        cur.executemany(
+            "INSERT INTO quizattempt (user_id, score, total_questions, attempted_at) VALUES (?, ?, ?, ?)",
+            ((random.choice(users), random.randint(0, answers), answers, (start + timedelta(seconds=i)).isoformat(" "))
+             for i in range(attempts)),
+        )
+        cur.executemany(
+            "INSERT INTO attemptanswer (attempt_id, question_id, selected_option, is_correct, attempted_at) VALUES (?, ?, 'a', ?, ?)",
+            ((a, random.randint(1, bank), random.random() < 0.5, start.isoformat(" "))
+             for a in range(1, attempts + 1) for _ in range(answers)),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+_loops = threading.local()
+
+
+def run_async(coro):
+    # One event loop per thread, so handlers can be awaited from plain (threaded) benchmark code
+    loop = getattr(_loops, "loop", None)
+    if loop is None:
+        loop = _loops.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(coro)
+
+
+def threaded_session():
+    from sqlmodel import Session
+    from database import engine, ThreadedSession
+    return ThreadedSession(Session(engine, expire_on_commit=False))
+
+
+def measure(fn, iterations, warmup=5):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples)
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    def pct(p):
+        return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+    return {
+        "n": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+    }
+
+
+def print_table(title, columns, rows):
+    print(f"\n{title}")
+    widths = [max(len(str(c)), *(len(fmt(r[i])) for r in rows)) for i, c in enumerate(columns)]
+    print("  ".join(str(c).rjust(w) for c, w in zip(columns, widths)))
+    for r in rows:
+        print("  ".join(fmt(v).rjust(w) for v, w in zip(r, widths)))
+
+
+def fmt(v):
+    if isinstance(v, float):
+        return f"{v:.3f}"
+    return str(v)
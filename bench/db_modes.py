@@ -0,0 +1,79 @@
+"""
+Sync vs async database mode under the same concurrent load.
+
+Each mode runs in its own subprocess (DATABASE_MODE is read at import time)
+and drives a mixed workload through the ASGI app in-process: start a quiz,
+submit it, read the attempt history.
+
+    python -m bench.db_modes [--clients 32] [--seconds 5] [--modes sync,async]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from bench import common
+
+
+async def drive(app, headers, clients, seconds):
+    import httpx
+    latencies = []
+    deadline = time.perf_counter() + seconds
+
+    async def client_loop(client):
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            quiz = (await client.get("/quiz", headers=headers)).json()
+            answers = {str(q["id"]): q["options"][0] for q in quiz}
+            (await client.post("/quiz/result", json={"answers": answers}, headers=headers)).raise_for_status()
+            (await client.get("/quiz/attempts", headers=headers)).raise_for_status()
+            latencies.append((time.perf_counter() - t0) / 3)
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - t0
+    from database import close_db
+    await close_db()
+    return len(latencies) * 3 / elapsed, common.summarize(latencies)
+
+
+def run_mode(args):
+    tmp = common.use_temp_database()
+    try:
+        import main as app_main
+        common.seed_questions(args.bank)
+        _, headers = common.seed_user("bench@example.com")
+        rps, stats = asyncio.run(drive(app_main.app, headers, args.clients, args.seconds))
+        print(json.dumps({"rps": rps, **stats}))
+    finally:
+        common.remove_temp_database(tmp)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", default="sync,async")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--bank", type=int, default=10_000)
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        return run_mode(args)
+
+    rows = []
+    for mode in args.modes.split(","):
+        r = common.run_isolated(
+            "bench.db_modes", {"DATABASE_MODE": mode},
+            ["--clients", args.clients, "--seconds", args.seconds, "--bank", args.bank],
+        )
+        rows.append((mode, r["rps"], r["p50_ms"], r["p95_ms"], r["p99_ms"]))
+    common.print_table(
+        f"Mixed quiz workload, {args.clients} concurrent clients (per-request latency, ms)",
+        ["mode", "req/s", "p50", "p95", "p99"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
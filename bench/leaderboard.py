@@ -0,0 +1,86 @@
+"""
+Leaderboard rank lookups at scale.
+
+Seeds --users rows into userstats, loads the in-process boards from them
+(the startup cost) and times, on the "best" board: a user's rank, a top-10
+page at various offsets, and a score update. The same rank lookup is timed
+as SQL over userstats (COUNT of users with a higher score) for comparison.
+
+    python -m bench.leaderboard [--users 1000000] [--iterations 2000]
+"""
+
+import argparse
+import random
+import time
+from bench import common
+
+
+def seed_stats(users, max_score):
+    conn = common.raw_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("PRAGMA foreign_keys=OFF")  # stats rows without matching user rows are fine here
+        cur.executemany(
+            "INSERT INTO userstats (user_id, attempts, total_score, best_score, total_questions) VALUES (?, ?, ?, ?, 0)",
+            ((i, 1, s, s, ) for i, s in ((i, random.randint(0, max_score)) for i in range(1, users + 1))),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def micro(fn, iterations):
+    # Sub-millisecond timings; reported in microseconds
+    stats = common.measure(fn, iterations, warmup=10)
+    return stats["p50_ms"] * 1000, stats["p99_ms"] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--max-score", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    tmp = common.use_temp_database()
+    try:
+        from sqlalchemy import func
+        from sqlmodel import Session, select
+        from database import engine, init_db
+        from models import UserStats
+        from leaderboard import leaderboard
+
+        init_db()
+        seed_stats(args.users, args.max_score)
+        with Session(engine) as session:
+            t0 = time.perf_counter()
+            leaderboard.load(session)
+            load_s = time.perf_counter() - t0
+
+            def user():
+                return random.randint(1, args.users)
+
+            rows = [
+                ("rank (in-memory)", *micro(lambda: leaderboard.rank("best", user()), args.iterations)),
+                ("top 10, offset 0", *micro(lambda: leaderboard.page("best", 0, 10), args.iterations)),
+                ("top 10, offset 500k", *micro(lambda: leaderboard.page("best", args.users // 2, 10), args.iterations)),
+                ("score update", *micro(lambda: leaderboard.record(user(), args.max_score + random.randint(1, 100), 0, 0), args.iterations)),
+            ]
+
+            def sql_rank():
+                score = session.get(UserStats, user()).best_score
+                session.exec(select(func.count()).where(UserStats.best_score > score)).one()
+                session.expunge_all()
+
+            rows.append(("rank (SQL COUNT)", *micro(sql_rank, max(args.iterations // 100, 10))))
+        common.print_table(
+            f"Leaderboard at {args.users} users (microseconds); boards loaded in {load_s:.2f} s",
+            ["operation", "p50 us", "p99 us"],
+            rows,
+        )
+    finally:
+        common.remove_temp_database(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+GET /questions cost over a large bank.
+
+"legacy" is the previous handler (ORM rows, json.loads on every options
+column, then FastAPI's encoder over the list of dicts), mounted on a
+bench-only path; "spliced" is the current handler, which splices the
+stored options JSON into the response text. Both go through the ASGI app
+in-process and the response bytes are decoded to check they match.
+
+    python -m bench.list_questions [--rows 50000] [--iterations 10]
+"""
+
+import argparse
+import json
+from bench import common
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    tmp = common.use_temp_database()
+    try:
+        from fastapi import Depends
+        from fastapi.testclient import TestClient
+        from sqlmodel import select
+        import main as app_main
+        from database import get_session
+        from models import Question
+
+        @app_main.app.get("/bench/legacy-questions")
+        async def legacy_list(session=Depends(get_session)):
+            questions = (await session.exec(select(Question))).all()
+            return [{"id": q.id, "text": q.text, "options": json.loads(q.options), "correct_answer": q.correct_answer} for q in questions]
+
+        common.seed_questions(args.rows)
+        _, headers = common.seed_user("admin@example.com", is_admin=True)
+        client = TestClient(app_main.app)
+        assert client.get("/bench/legacy-questions").json() == client.get("/questions", headers=headers).json()
+
+        legacy = common.measure(lambda: client.get("/bench/legacy-questions").raise_for_status(), args.iterations, warmup=1)
+        spliced = common.measure(lambda: client.get("/questions", headers=headers).raise_for_status(), args.iterations, warmup=1)
+        common.print_table(
+            f"GET /questions over {args.rows} questions (ms)",
+            ["handler", "mean", "p50", "p95"],
+            [(name, r["mean_ms"], r["p50_ms"], r["p95_ms"]) for name, r in (("legacy", legacy), ("spliced", spliced))],
+        )
+    finally:
+        common.remove_temp_database(tmp)
+
+
+if __name__ == "__main__":
+    main()
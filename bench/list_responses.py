@@ -0,0 +1,88 @@
+"""
+Response serialization cost of GET /quiz/attempts by payload size.
+
+"legacy" is the previous handler shape (list of dicts returned to FastAPI,
+which runs jsonable_encoder and the stdlib JSONResponse), mounted on a
+bench-only path; "orjson" is the current handler, which returns an
+ORJSONResponse directly. Both go through the ASGI app in-process and
+must produce identical JSON. Time is averaged over --iterations calls;
+"peak KiB" is the tracemalloc peak of one extra call.
+
+    python -m bench.list_responses [--sizes 1000,10000,100000] [--iterations 5]
+"""
+
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta
+from bench import common
+
+
+def seed_attempts(user_id, n):
+    conn = common.raw_connection()
+    try:
+        start = datetime(2024, 1, 1)
+        conn.cursor().executemany(
+            "INSERT INTO quizattempt (user_id, score, total_questions, attempted_at) VALUES (?, ?, ?, ?)",
+            ((user_id, i % 10, 10, (start + timedelta(seconds=i, microseconds=i)).isoformat(" ")) for i in range(n)),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def peak_kib(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = common.use_temp_database()
+    try:
+        from fastapi import Depends
+        from fastapi.responses import JSONResponse
+        from fastapi.testclient import TestClient
+        from sqlmodel import select
+        import main as app_main
+        from auth import get_current_user
+        from database import get_session
+        from models import QuizAttempt
+        from routes.quiz import user_attempt
+
+        @app_main.app.get("/bench/legacy-attempts", response_class=JSONResponse)
+        async def legacy_attempts(session=Depends(get_session), user=Depends(get_current_user)):
+            statement = select(QuizAttempt.id, QuizAttempt.score, QuizAttempt.total_questions, QuizAttempt.attempted_at)
+            statement = statement.where(QuizAttempt.user_id == user.id).order_by(QuizAttempt.attempted_at, QuizAttempt.id)
+            return [user_attempt(row) for row in (await session.exec(statement)).all()]
+
+        client = TestClient(app_main.app)
+        rows = []
+        for i, n in enumerate(int(s) for s in args.sizes.split(",")):
+            user_id, headers = common.seed_user(f"bench{i}@example.com")
+            seed_attempts(user_id, n)
+            assert client.get("/bench/legacy-attempts", headers=headers).json() == client.get("/quiz/attempts", headers=headers).json()
+            result = {}
+            for name, path in (("legacy", "/bench/legacy-attempts"), ("orjson", "/quiz/attempts")):
+                call = lambda: client.get(path, headers=headers).raise_for_status()
+                result[name] = (common.measure(call, args.iterations, warmup=1)["mean_ms"], peak_kib(call))
+            rows.append((n, result["legacy"][0], result["orjson"][0], result["legacy"][0] / result["orjson"][0],
+                         result["legacy"][1], result["orjson"][1]))
+        common.print_table(
+            "GET /quiz/attempts response time (ms) and allocation peak (KiB)",
+            ["items", "legacy ms", "orjson ms", "speedup", "legacy peak KiB", "orjson peak KiB"],
+            rows,
+        )
+    finally:
+        common.remove_temp_database(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Login throughput vs. quiz latency during a login storm.
+
+Login clients hammer POST /login while a few quiz clients keep calling
+GET /quiz; the quiz latency shows how much the hashing work starves the
+rest of the app. "shared" is the previous behaviour (bcrypt on Starlette's
+shared threadpool, unbounded); the others use the dedicated hasher with
+PASSWORD_HASH_WORKERS workers and a PASSWORD_HASH_QUEUE bound, so logins
+beyond it get an immediate 503. Each configuration runs in its own
+subprocess through the ASGI app in-process. The defaults (one worker, a
+queue of 4) are sized for a small machine; on more cores raise --workers.
+
+    python -m bench.login_storm [--logins 32] [--quiz-clients 4] [--seconds 5] [--rounds 10]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from bench import common
+
+CONFIGS = {
+    "shared": {},
+    "thread": {"PASSWORD_HASH_EXECUTOR": "thread"},
+    "process": {"PASSWORD_HASH_EXECUTOR": "process"},
+}
+
+
+async def drive(app, headers, args):
+    import httpx
+    logins, rejected, quiz = [], [], []
+    deadline = time.perf_counter() + args.seconds
+    form = {"username": "bench@example.com", "password": common.BENCH_PASSWORD}
+
+    async def login_loop(client):
+        while time.perf_counter() < deadline:
+            r = await client.post("/login", data=form)
+            if r.status_code == 503:
+                rejected.append(1)
+                # A well-behaved client honours Retry-After; a short pause keeps the loop from spinning
+                await asyncio.sleep(0.05)
+            else:
+                r.raise_for_status()
+                logins.append(1)
+
+    async def quiz_loop(client):
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            (await client.get("/quiz", headers=headers)).raise_for_status()
+            quiz.append(time.perf_counter() - t0)
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench", timeout=None) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(login_loop(client) for _ in range(args.logins)),
+                             *(quiz_loop(client) for _ in range(args.quiz_clients)))
+        elapsed = time.perf_counter() - t0
+    from database import close_db
+    await close_db()
+    return {"logins_per_s": len(logins) / elapsed, "rejected": len(rejected), **common.summarize(quiz or [0])}
+
+
+def run_config(args):
+    tmp = common.use_temp_database()
+    try:
+        import main as app_main
+        from hashing import password_hasher
+        if args.legacy:
+            from starlette.concurrency import run_in_threadpool
+            password_hasher.run = run_in_threadpool
+        common.seed_questions(args.bank)
+        _, headers = common.seed_user("bench@example.com")
+        print(json.dumps(asyncio.run(drive(app_main.app, headers, args))))
+        password_hasher.shutdown()
+    finally:
+        common.remove_temp_database(tmp)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--configs", default="shared,thread,process")
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--quiz-clients", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--queue", type=int, default=4)
+    parser.add_argument("--bank", type=int, default=1000)
+    parser.add_argument("--legacy", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        return run_config(args)
+
+    rows = []
+    for name in args.configs.split(","):
+        env = {**CONFIGS[name], "BCRYPT_ROUNDS": str(args.rounds),
+               "PASSWORD_HASH_WORKERS": str(args.workers), "PASSWORD_HASH_QUEUE": str(args.queue)}
+        argv = ["--logins", args.logins, "--quiz-clients", args.quiz_clients, "--seconds", args.seconds, "--bank", args.bank]
+        if name == "shared":
+            argv.append("--legacy")
+        r = common.run_isolated("bench.login_storm", env, argv)
+        rows.append((name, r["logins_per_s"], r["rejected"], r["p50_ms"], r["p95_ms"], r["p99_ms"]))
+    common.print_table(
+        f"{args.logins} login clients + {args.quiz_clients} quiz clients, bcrypt rounds={args.rounds} "
+        f"(GET /quiz latency, ms)",
+        ["config", "logins/s", "503s", "quiz p50", "quiz p95", "quiz p99"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Bandwidth and latency of a client polling the read-mostly endpoints.
+
+Seeds --bank questions and a user with --attempts attempts, then polls
+GET /questions/{id}, GET /questions (admin), GET /quiz/attempts/{id} and
+GET /quiz/attempts?limit=20 --polls times each. After every --write-every
+polls an admin updates a question and the user submits a quiz, so some
+polls see new data. Three clients per endpoint:
+
+    recompute    no If-None-Match, response and attempt caches cleared
+                 before every poll (what each call cost before ETags)
+    cached       no If-None-Match; the body comes from the response cache
+    conditional  sends the last ETag back; unchanged data is a 304
+
+"KiB/poll" is the mean response body size, "SQL/poll" the mean number of
+statements the poll ran (writes excluded).
+
+    python -m bench.polling [--bank 2000] [--attempts 200] [--polls 500] [--write-every 50]
+"""
+
+import argparse
+import time
+from bench import common
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bank", type=int, default=2000)
+    parser.add_argument("--attempts", type=int, default=200)
+    parser.add_argument("--answers", type=int, default=10)
+    parser.add_argument("--polls", type=int, default=500)
+    parser.add_argument("--write-every", type=int, default=50)
+    args = parser.parse_args()
+
+    tmp = common.use_temp_database()
+    try:
+        from fastapi.testclient import TestClient
+        from sqlalchemy import event
+        import main as app_main
+        from attempt_cache import attempt_cache
+        from database import engine
+        from response_cache import response_cache
+
+        client = TestClient(app_main.app)
+        client.__enter__()
+        common.seed_questions(args.bank)
+        user_id, user = common.seed_user("bench@example.com")
+        _, admin = common.seed_user("admin@example.com", is_admin=True)
+        common.seed_attempts([user_id], args.attempts, args.answers, args.bank)
+        attempt_id = args.attempts // 2
+
+        statements = [0]
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements[0] += 1
+
+        writes = [0]
+
+        def write():
+            writes[0] += 1
+            qid = writes[0] % args.bank + 1
+            client.put(f"/questions/{qid}", headers=admin, json={
+                "text": f"Question {qid - 1} (rev {writes[0]})?",
+                "options": [f"{qid - 1}-{o}" for o in "abcd"],
+                "correct_answer": f"{qid - 1}-a",
+            }).raise_for_status()
+            client.post("/quiz/result", headers=user, json={"answers": {"1": "0-a", "2": "1-b"}}).raise_for_status()
+
+        endpoints = [
+            ("/questions/{id}", "/questions/1", admin),
+            ("/questions", "/questions", admin),
+            ("/quiz/attempts/{id}", f"/quiz/attempts/{attempt_id}", user),
+            ("/quiz/attempts?limit=20", "/quiz/attempts?limit=20", user),
+        ]
+        rows = []
+        for label, path, headers in endpoints:
+            for mode in ("recompute", "cached", "conditional"):
+                etag = None
+                samples, sent, queries, not_modified = [], 0, 0, 0
+                for i in range(args.polls):
+                    if i and i % args.write_every == 0:
+                        write()
+                    if mode == "recompute":
+                        response_cache.clear()
+                        attempt_cache.clear()
+                    request_headers = dict(headers)
+                    if mode == "conditional" and etag:
+                        request_headers["If-None-Match"] = etag
+                    before = statements[0]
+                    t0 = time.perf_counter()
+                    response = client.get(path, headers=request_headers)
+                    samples.append(time.perf_counter() - t0)
+                    queries += statements[0] - before
+                    assert response.status_code in (200, 304), response.text
+                    not_modified += response.status_code == 304
+                    sent += len(response.content)
+                    etag = response.headers.get("etag")
+                result = common.summarize(samples)
+                rows.append((label, mode, sent / args.polls / 1024, result["p50_ms"], result["p95_ms"],
+                             queries / args.polls, not_modified))
+        client.__exit__(None, None, None)
+        common.print_table(
+            f"{args.polls} polls per client, a question update and a submit every {args.write_every} ({args.bank} questions)",
+            ["endpoint", "client", "KiB/poll", "p50 ms", "p95 ms", "SQL/poll", "304s"],
+            rows,
+        )
+    finally:
+        common.remove_temp_database(tmp)
+
+
+if __name__ == "__main__":
+    main()
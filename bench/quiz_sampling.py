@@ -0,0 +1,60 @@
+"""
+GET /quiz latency as the question bank grows.
+
+Compares the sampler-backed endpoint against the previous implementation
+(load every Question row, then random.sample) at each bank size.
+
+    python -m bench.quiz_sampling [--sizes 100,1000,10000,100000,1000000] [--iterations 200]
+"""
+
+import argparse
+import random
+from bench import common
+
+
+def legacy_get_quiz(session, count):
+    from sqlmodel import select
+    from models import Question
+    questions = session.exec(select(Question)).all()
+    return random.sample(questions, count)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="100,1000,10000,100000,1000000")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--legacy-iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = common.use_temp_database()
+    try:
+        from fastapi.testclient import TestClient
+        from sqlmodel import Session
+        from database import engine
+        from sampling import question_sampler
+        import main as app_main
+
+        _, headers = common.seed_user("bench@example.com")
+        client = TestClient(app_main.app)
+        rows = []
+        seeded = 0
+        for size in sorted(int(s) for s in args.sizes.split(",")):
+            common.seed_questions(size - seeded, start=seeded)
+            seeded = size
+            with Session(engine) as session:
+                question_sampler.load(session)
+            new = common.measure(lambda: client.get("/quiz", headers=headers).raise_for_status(), args.iterations)
+            with Session(engine) as session:
+                old = common.measure(lambda: legacy_get_quiz(session, 2), args.legacy_iterations, warmup=1)
+            rows.append((size, new["p50_ms"], new["p95_ms"], old["p50_ms"], old["p50_ms"] / new["p50_ms"]))
+        common.print_table(
+            "GET /quiz latency (ms)",
+            ["bank size", "sampler p50", "sampler p95", "legacy p50", "speedup"],
+            rows,
+        )
+    finally:
+        common.remove_temp_database(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+POST /quiz/result latency with and without quiz sessions.
+
+Without a session the answer key is looked up per submission (question
+cache version check, then the cache or one IN query when it is cold).
+With a session the submission is graded against the snapshot taken by
+GET /quiz, from the in-memory store or the quizsession table. Quizzes
+are issued outside the timed region; the handler is called directly on a
+sync-mode session, with no HTTP layer. Also reports how many queries
+touch the question table per submission, and what issuing a session
+adds to GET /quiz.
+
+    python -m bench.quiz_sessions [--answers 10,50] [--iterations 300]
+"""
+
+import argparse
+import random
+import time
+from bench import common
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--answers", default="10,50")
+    parser.add_argument("--bank", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=300)
+    args = parser.parse_args()
+
+    tmp = common.use_temp_database()
+    try:
+        from sqlalchemy import event
+        from database import engine, init_db
+        from models import User, QuizSubmission
+        from question_cache import question_cache
+        from routes.quiz import submit_quiz, get_quiz
+        import quiz_sessions
+
+        init_db()
+        common.seed_questions(args.bank)
+        user_id, _ = common.seed_user("bench@example.com")
+
+        question_reads = [0]
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def count(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT") and "FROM question" in statement:
+                question_reads[0] += 1
+
+        def call(handler, *args):
+            session = common.threaded_session()
+            try:
+                user = common.run_async(session.get(User, user_id))
+                return common.run_async(handler(*args, session, user))
+            finally:
+                common.run_async(session.close())
+
+        def issue(n):
+            session = common.threaded_session()
+            try:
+                questions = [{"id": qid, "correct_answer": f"{qid - 1}-a"} for qid in random.sample(range(1, args.bank + 1), n)]
+                return common.run_async(quiz_sessions.issue_quiz(session, user_id, questions)), questions
+            finally:
+                common.run_async(session.close())
+
+        def run(n, store=None, cold=False):
+            if store:
+                quiz_sessions.QUIZ_SESSION_STORE = store
+            elif not cold:
+                call(submit_quiz, QuizSubmission(answers={str(q): "a" for q in range(1, args.bank + 1)}))
+            samples = []
+            reads = 0
+            for i in range(args.iterations + 5):
+                if store:
+                    session_id, questions = issue(n)
+                    answers = {str(q["id"]): random.choice([q["correct_answer"], "x"]) for q in questions}
+                else:
+                    session_id = None
+                    answers = {str(qid): f"{qid - 1}-a" for qid in random.sample(range(1, args.bank + 1), n)}
+                if cold:
+                    question_cache.clear()
+                before = question_reads[0]
+                t0 = time.perf_counter()
+                call(submit_quiz, QuizSubmission(answers=answers, session_id=session_id))
+                if i >= 5:
+                    samples.append(time.perf_counter() - t0)
+                    reads += question_reads[0] - before
+            stats = common.summarize(samples)
+            return stats["p50_ms"], stats["p95_ms"], reads / args.iterations
+
+        rows = []
+        for n in (int(a) for a in args.answers.split(",")):
+            for name, kwargs in [
+                ("no session, cache cold", {"cold": True}),
+                ("no session, cache warm", {}),
+                ("session (memory)", {"store": "memory"}),
+                ("session (sqlite)", {"store": "sqlite"}),
+            ]:
+                rows.append((n, name, *run(n, **kwargs)))
+        common.print_table(
+            f"POST /quiz/result latency (ms, {args.bank} question bank)",
+            ["answers", "path", "p50", "p95", "question reads"],
+            rows,
+        )
+
+        from fastapi import Response
+        rows = []
+        for store in ("memory", "sqlite"):
+            quiz_sessions.QUIZ_SESSION_STORE = store
+            stats = common.measure(lambda: call(get_quiz, Response(), 10), args.iterations)
+            rows.append((store, stats["p50_ms"], stats["p95_ms"]))
+        common.print_table("GET /quiz latency including session issue (ms, 10 questions)", ["store", "p50", "p95"], rows)
+    finally:
+        common.remove_temp_database(tmp)
+
+
+if __name__ == "__main__":
+    main()
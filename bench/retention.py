@@ -0,0 +1,165 @@
+"""
+Database size and history query latency before and after archiving old attempts.
+
+Seeds --answers answers (default 50M) in attempts of --per-attempt answers,
+spread evenly over the last --span-days days across --users users, with
+the legacy result row each submission writes. Then times, with the attempt
+cache cleared for every call: the detail view of a recent attempt and of
+an old one, the first page of a user's history and of the admin list of
+all attempts, a full rebuild-stats and an online backup of the database.
+Archives every attempt older than --days (python manage.py archive), runs
+VACUUM, switches the legacy result table to its view, and times the same
+calls again; the old attempt is now read from the archive.
+
+    python -m bench.retention [--answers 50000000] [--days 90] [--iterations 200]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from bench import common
+
+
+def seed(conn, args, now, batch=20_000):
+    attempts = args.answers // args.per_attempt
+    start = now - timedelta(days=args.span_days)
+    step = timedelta(days=args.span_days) / attempts
+    for lo in range(0, attempts, batch):
+        hi = min(lo + batch, attempts)
+        rows = []
+        answers = []
+        for i in range(lo, hi):
+            user_id = random.randint(1, args.users)
+            at = (start + step * i).strftime("%Y-%m-%d %H:%M:%S.%f")
+            correct = [random.random() < 0.6 for _ in range(args.per_attempt)]
+            rows.append((i + 1, user_id, sum(correct), args.per_attempt, at))
+            answers.extend((i + 1, qid, random.choice("abcd"), ok, at)
+                           for qid, ok in zip(random.sample(range(1, args.bank + 1), args.per_attempt), correct))
+        conn.executemany("INSERT INTO quizattempt (id, user_id, score, total_questions, attempted_at) VALUES (?, ?, ?, ?, ?)", rows)
+        conn.executemany("INSERT INTO attemptanswer (attempt_id, question_id, selected_option, is_correct, attempted_at) VALUES (?, ?, ?, ?, ?)", answers)
+        conn.executemany("INSERT INTO result (user_id, score) VALUES (?, ?)", ((r[1], r[2]) for r in rows))
+        conn.commit()
+    return attempts
+
+
+def sizes(path):
+    archive = path.removesuffix(".db") + "-archive.db"
+    return os.path.getsize(path) / 1e6, (os.path.getsize(archive) / 1e6 if os.path.exists(archive) else 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--answers", type=int, default=50_000_000)
+    parser.add_argument("--per-attempt", type=int, default=10)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--bank", type=int, default=10_000)
+    parser.add_argument("--span-days", type=int, default=730)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    random.seed(1)
+
+    tmp = common.use_temp_database()
+    path = os.environ["DATABASE_URL"].removeprefix("sqlite:///")
+    try:
+        from sqlmodel import Session, select
+        from database import engine, init_db
+        from attempt_cache import attempt_cache, load_attempt_details
+        from models import QuizAttempt, User
+        from pagination import keyset
+        from retention import archive_attempts, apply_result_mode
+        from response_cache import question_versions
+        from stats import rebuild_stats
+
+        init_db()
+        common.seed_questions(args.bank)
+        conn = common.raw_connection()
+        conn.executemany("INSERT INTO user (email, hashed_password, is_admin) VALUES (?, 'x', 0)",
+                         ((f"user{i}@example.com",) for i in range(args.users)))
+        conn.commit()
+        now = datetime.utcnow()
+        t0 = time.perf_counter()
+        attempts = seed(conn, args, now)
+        seeded = time.perf_counter() - t0
+        with Session(engine) as session:
+            rebuild_stats(session)
+            session.commit()
+        conn.execute("VACUUM")
+        conn.close()
+        old_id, recent_id = attempts // 10, attempts - 10
+        user_id = random.randint(1, args.users)
+
+        def measure_all(label):
+            with Session(engine) as session:
+                version = question_versions.sync(session)
+
+                def details(attempt_id):
+                    attempt_cache.clear()
+                    session.expunge_all()
+                    assert load_attempt_details(session, attempt_id, version) is not None
+
+                history = keyset(select(QuizAttempt.id, QuizAttempt.score, QuizAttempt.total_questions, QuizAttempt.attempted_at)
+                                 .where(QuizAttempt.user_id == user_id), QuizAttempt.attempted_at, QuizAttempt.id, None).limit(21)
+                everyone = keyset(select(User.email, QuizAttempt.id, QuizAttempt.score, QuizAttempt.attempted_at)
+                                  .join(User, User.id == QuizAttempt.user_id), QuizAttempt.attempted_at, QuizAttempt.id, None).limit(21)
+                results = {
+                    "recent detail": common.measure(lambda: details(recent_id), args.iterations),
+                    "old detail": common.measure(lambda: details(old_id), args.iterations),
+                    "user history": common.measure(lambda: session.exec(history).all(), args.iterations),
+                    "all attempts": common.measure(lambda: session.exec(everyone).all(), args.iterations),
+                }
+
+                def rebuild():
+                    rebuild_stats(session)
+                    session.commit()
+
+                results["rebuild-stats"] = common.measure(rebuild, 1, warmup=0)
+
+            def backup():
+                target = sqlite3.connect(os.path.join(tmp, "backup.db"))
+                source = sqlite3.connect(path)
+                source.backup(target)
+                source.close()
+                target.close()
+                os.remove(os.path.join(tmp, "backup.db"))
+
+            results["backup"] = common.measure(backup, 1, warmup=0)
+            main_mb, archive_mb = sizes(path)
+            return [(label, name, r["p50_ms"], r["p95_ms"]) for name, r in results.items()], (label, main_mb, archive_mb)
+
+        before, size_before = measure_all("before")
+        t0 = time.perf_counter()
+        moved = archive_attempts(engine, days=args.days, now=now)
+        archived = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as c:
+            apply_result_mode(c, "view")
+            c.exec_driver_sql("VACUUM main")
+        vacuumed = time.perf_counter() - t0
+        engine.dispose()
+        after, size_after = measure_all("after")
+
+        common.print_table(
+            f"Latency in ms ({args.answers} answers in {attempts} attempts; detail and pages cold in the attempt cache)",
+            ["", "query", "p50", "p95"],
+            [row for pair in zip(before, after) for row in pair],
+        )
+        common.print_table(
+            f"Size in MB (attempts older than {args.days} of {args.span_days} days archived)",
+            ["", "quiz.db", "archive"],
+            [size_before, size_after],
+        )
+        common.print_table(
+            "Run time in s",
+            ["seed", "archive", "attempts moved", "vacuum"],
+            [(seeded, archived, moved, vacuumed)],
+        )
+    finally:
+        common.remove_temp_database(tmp)
+
+
+if __name__ == "__main__":
+    main()
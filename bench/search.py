@@ -0,0 +1,129 @@
+"""
+Question search latency: FTS5 index vs. a LIKE '%term%' scan.
+
+Seeds --bank questions (default 1M) of 6-14 words drawn from a
+Zipf-distributed synthetic vocabulary, with the FTS triggers in place,
+then times the first page (--limit rows) of GET /questions/search's
+query, in both orders, against the equivalent LIKE scan over text and
+options, for a common word, a rare word, two words together, a prefix
+and a word that matches nothing. order=rank scores every match before
+the first page is known; order=id and LIKE stop once they have --limit
+rows in id order, so LIKE is only slow when matches are rare. Also reports the index size and what
+the triggers add to inserting the bank.
+
+    python -m bench.search [--bank 1000000] [--iterations 20] [--limit 20]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import string
+import time
+from bench import common
+
+LIKE_SEARCH = (
+    "SELECT id, text, options, correct_answer FROM question "
+    "WHERE {} ORDER BY id LIMIT ?"
+)
+
+
+def vocabulary(n):
+    words = set()
+    while len(words) < n:
+        words.add("".join(random.choices(string.ascii_lowercase, k=random.randint(4, 9))))
+    return sorted(words)
+
+
+def seed_bank(conn, n, words, cum_weights, batch=50_000):
+    # Each batch also goes into a copy of the table without triggers, to time what the index adds
+    conn.execute("CREATE TABLE question_plain AS SELECT * FROM question WHERE 0")
+    plain = indexed = 0.0
+    for lo in range(0, n, batch):
+        rows = []
+        for i in range(lo, min(lo + batch, n)):
+            text = " ".join(random.choices(words, cum_weights=cum_weights, k=random.randint(6, 14))).capitalize() + "?"
+            options = random.choices(words, cum_weights=cum_weights, k=4)
+            rows.append((text, json.dumps(options), options[0]))
+        t0 = time.perf_counter()
+        conn.executemany("INSERT INTO question_plain (text, options, correct_answer) VALUES (?, ?, ?)", rows)
+        conn.commit()
+        t1 = time.perf_counter()
+        conn.executemany("INSERT INTO question (text, options, correct_answer) VALUES (?, ?, ?)", rows)
+        conn.commit()
+        plain += t1 - t0
+        indexed += time.perf_counter() - t1
+    conn.execute("DROP TABLE question_plain")
+    conn.commit()
+    return indexed, plain
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bank", type=int, default=1_000_000)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    random.seed(1)
+
+    tmp = common.use_temp_database()
+    try:
+        from sqlmodel import Session
+        from database import engine, init_db
+        from search import search_questions
+
+        init_db()
+        words = vocabulary(args.vocabulary)
+        cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+
+        conn = common.raw_connection()
+        with_index, without_index = seed_bank(conn, args.bank, words, cum_weights)
+        conn.execute("VACUUM")
+        index_bytes = conn.execute("SELECT sum(length(block)) FROM question_fts_data").fetchone()[0]
+        db_bytes = os.path.getsize(os.environ["DATABASE_URL"].removeprefix("sqlite:///"))
+
+        queries = {
+            "common word": words[0],
+            "rare word": words[len(words) // 2],
+            "two words": f"{words[3]} {words[40]}",
+            "prefix": words[100][:3] + "*",
+            "no match": "zzzzzzzzzz",
+        }
+
+        def fts(q, order):
+            with Session(engine) as session:
+                return search_questions(session, q, args.limit, order=order)
+
+        def like(q):
+            terms = [t.rstrip("*") for t in q.split()]
+            where = " AND ".join("(text LIKE ? OR options LIKE ?)" for _ in terms)
+            params = [p for t in terms for p in (f"%{t}%", f"%{t}%")]
+            return conn.execute(LIKE_SEARCH.format(where), (*params, args.limit + 1)).fetchall()
+
+        rows = []
+        for name, q in queries.items():
+            matches = conn.execute("SELECT count(*) FROM question_fts WHERE question_fts MATCH ?",
+                                   (" ".join(f'"{t[:-1]}"*' if t.endswith("*") else f'"{t}"' for t in q.split()),)).fetchone()[0]
+            ranked = common.measure(lambda: fts(q, "rank"), args.iterations, warmup=2)
+            by_id = common.measure(lambda: fts(q, "id"), args.iterations, warmup=2)
+            scan = common.measure(lambda: like(q), args.iterations, warmup=2)
+            rows.append((name, q, matches, ranked["p50_ms"], ranked["p95_ms"], by_id["p50_ms"], by_id["p95_ms"], scan["p50_ms"], scan["p95_ms"]))
+        conn.close()
+        common.print_table(
+            f"First page of {args.limit} (ms, {args.bank} questions)",
+            ["query", "q", "matches", "rank p50", "rank p95", "id p50", "id p95", "like p50", "like p95"],
+            rows,
+        )
+        common.print_table(
+            "Index cost",
+            ["database MB", "fts index MB", "insert with triggers s", "insert without s"],
+            [(db_bytes / 1e6, index_bytes / 1e6, with_index, without_index)],
+        )
+    finally:
+        common.remove_temp_database(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Mixed concurrent readers and writers under each SQLite profile.
+
+Reader threads run the attempt-history query while writer threads commit
+quiz submissions (attempt + answers + result), straight against the engine
+so the numbers reflect SQLite locking rather than HTTP overhead. Each
+DATABASE_PROFILE runs in its own subprocess.
+
+"wal" vs "wal-durable" isolates the durability trade-off: both let readers
+run during a commit, but "wal" (synchronous=NORMAL) skips the fsync per
+commit, so a power loss can drop commits since the last WAL sync. The
+writes/s gap between the two is what that relaxation buys.
+
+    python -m bench.sqlite_profiles [--readers 8] [--writers 4] [--seconds 5]
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from bench import common
+
+
+def run_profile(args):
+    tmp = common.use_temp_database()
+    try:
+        from sqlalchemy import insert
+        from sqlmodel import Session, select
+        from database import engine, init_db
+        from models import QuizAttempt, AttemptAnswer, Result
+
+        init_db()
+        common.seed_questions(args.bank)
+        reads, writes, errors = [], [], []
+        deadline = time.perf_counter() + args.seconds
+
+        def reader():
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                try:
+                    with Session(engine) as session:
+                        session.exec(
+                            select(QuizAttempt).where(QuizAttempt.user_id == random.randint(1, args.users))
+                            .order_by(QuizAttempt.attempted_at.desc()).limit(50)
+                        ).all()
+                    reads.append(time.perf_counter() - t0)
+                except Exception:
+                    errors.append(1)
+
+        def writer():
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                user_id = random.randint(1, args.users)
+                try:
+                    with Session(engine) as session:
+                        attempt = QuizAttempt(user_id=user_id, score=5, total_questions=10)
+                        session.add(attempt)
+                        session.flush()
+                        session.execute(insert(AttemptAnswer), [
+                            {"attempt_id": attempt.id, "question_id": qid, "selected_option": "a", "is_correct": True}
+                            for qid in random.sample(range(1, args.bank + 1), 10)
+                        ])
+                        session.add(Result(user_id=user_id, score=5))
+                        session.commit()
+                    writes.append(time.perf_counter() - t0)
+                except Exception:
+                    errors.append(1)
+
+        threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+        threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        r, w = common.summarize(reads or [0]), common.summarize(writes or [0])
+        print(json.dumps({"reads_per_s": len(reads) / elapsed, "read_p99": r["p99_ms"],
+                          "writes_per_s": len(writes) / elapsed, "write_p99": w["p99_ms"], "errors": len(errors)}))
+    finally:
+        common.remove_temp_database(tmp)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", default="default,wal,wal-durable")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--bank", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        return run_profile(args)
+
+    rows = []
+    for profile in args.profiles.split(","):
+        r = common.run_isolated(
+            "bench.sqlite_profiles", {"DATABASE_PROFILE": profile},
+            ["--readers", args.readers, "--writers", args.writers, "--seconds", args.seconds,
+             "--bank", args.bank, "--users", args.users],
+        )
+        rows.append((profile, r["reads_per_s"], r["read_p99"], r["writes_per_s"], r["write_p99"], r["errors"]))
+    common.print_table(
+        f"{args.readers} reader / {args.writers} writer threads (p99 in ms)",
+        ["profile", "reads/s", "read p99", "writes/s", "write p99", "errors"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
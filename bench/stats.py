@@ -0,0 +1,109 @@
+"""
+Precomputed statistics vs. computing the same numbers from raw rows.
+
+Seeds --attempts attempts of --answers answers each, then times the
+/stats aggregate lookups (one primary-key read each) against the
+equivalent GROUP BY queries over quizattempt/attemptanswer, run on the
+same sync session. Also reports what keeping the aggregates current adds
+to a submission, and how long `manage.py rebuild-stats` takes.
+
+    python -m bench.stats [--attempts 100000] [--answers 10] [--iterations 200]
+"""
+
+import argparse
+import random
+import time
+from bench import common
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--attempts", type=int, default=100_000)
+    parser.add_argument("--answers", type=int, default=10)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--bank", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    tmp = common.use_temp_database()
+    try:
+        from sqlalchemy import Integer, cast, func
+        from sqlmodel import Session, select
+        from database import engine, init_db
+        from models import QuizAttempt, AttemptAnswer, UserStats, QuestionStats, GlobalStats, QuizSubmission, User
+        from stats import rebuild_stats
+        from routes.quiz import submit_quiz
+        import stats as stats_module
+
+        init_db()
+        common.seed_questions(args.bank)
+        users = [common.seed_user(f"user{i}@example.com")[0] for i in range(min(args.users, 50))]
+        common.seed_attempts(users, args.attempts, args.answers, args.bank)
+
+        with Session(engine) as session:
+            t0 = time.perf_counter()
+            rebuild_stats(session)
+            session.commit()
+            rebuild_s = time.perf_counter() - t0
+
+            def pick_user():
+                return random.choice(users)
+
+            def pick_question():
+                return random.randint(1, args.bank)
+
+            cases = [
+                ("user",
+                 lambda: session.get(UserStats, pick_user()),
+                 lambda: session.exec(select(func.count(), func.avg(QuizAttempt.score), func.max(QuizAttempt.score))
+                                      .where(QuizAttempt.user_id == pick_user())).one()),
+                ("question",
+                 lambda: session.get(QuestionStats, pick_question()),
+                 lambda: session.exec(select(func.count(), func.sum(cast(AttemptAnswer.is_correct, Integer)))
+                                      .where(AttemptAnswer.question_id == pick_question())).one()),
+                ("global",
+                 lambda: session.get(GlobalStats, 1),
+                 lambda: session.exec(select(func.count(), func.avg(QuizAttempt.score), func.max(QuizAttempt.score))).one()),
+            ]
+            rows = []
+            for name, aggregate, raw in cases:
+                def fresh(fn):
+                    # Empty identity map, so session.get really reads the row
+                    return lambda: (session.expunge_all(), fn())
+                agg = common.measure(fresh(aggregate), args.iterations)
+                raw_ = common.measure(fresh(raw), max(args.iterations // 10, 5), warmup=1)
+                rows.append((name, agg["p50_ms"], raw_["p50_ms"], raw_["p50_ms"] / agg["p50_ms"]))
+        common.print_table(
+            f"Statistics lookups over {args.attempts} attempts x {args.answers} answers (p50 ms)",
+            ["stat", "aggregate", "raw rows", "speedup"],
+            rows,
+        )
+
+        import routes.quiz as quiz_routes
+        user_id = users[0]
+
+        def submit():
+            session = common.threaded_session()
+            try:
+                user = common.run_async(session.get(User, user_id))
+                answers = {str(q): f"{q - 1}-a" for q in random.sample(range(1, args.bank + 1), args.answers)}
+                common.run_async(submit_quiz(QuizSubmission(answers=answers), session, user))
+            finally:
+                common.run_async(session.close())
+
+        with_stats = common.measure(submit, args.iterations)
+        quiz_routes.record_attempt = lambda *a: (0, 0, 0)
+        without = common.measure(submit, args.iterations)
+        quiz_routes.record_attempt = stats_module.record_attempt
+        common.print_table(
+            "POST /quiz/result cost of maintaining the aggregates (ms)",
+            ["path", "p50", "p95"],
+            [("without stats", without["p50_ms"], without["p95_ms"]), ("with stats", with_stats["p50_ms"], with_stats["p95_ms"])],
+        )
+        print(f"\nrebuild-stats over {args.attempts} attempts: {rebuild_s:.2f} s")
+    finally:
+        common.remove_temp_database(tmp)
+
+
+if __name__ == "__main__":
+    main()
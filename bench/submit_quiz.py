@@ -0,0 +1,106 @@
+"""
+POST /quiz/result throughput for different submission sizes.
+
+Compares the batched path (one IN query, one bulk insert, one commit)
+against the previous per-answer implementation (one session.get per answer
+and three commits). Both are called directly with their own (sync-mode) session,
+with no HTTP layer, so the numbers isolate the grading and write cost.
+
+    python -m bench.submit_quiz [--answers 2,50,500] [--seconds 3] [--concurrency 4]
+"""
+
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from bench import common
+
+
+def legacy_submit(session, user_id, answers):
+    from models import Question, QuizAttempt, AttemptAnswer, Result
+    score = 0
+    attempt = QuizAttempt(user_id=user_id, score=0, total_questions=len(answers))
+    session.add(attempt)
+    session.commit()
+    session.refresh(attempt)
+    for qid, ans in answers.items():
+        q = session.get(Question, int(qid))
+        if q:
+            is_correct = ans == q.correct_answer
+            if is_correct:
+                score += 1
+            session.add(AttemptAnswer(attempt_id=attempt.id, question_id=int(qid), selected_option=ans, is_correct=is_correct))
+    attempt.score = score
+    session.add(attempt)
+    session.commit()
+    session.add(Result(user_id=user_id, score=score))
+    session.commit()
+
+
+def throughput(submit, seconds, concurrency):
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        done = 0
+        while time.perf_counter() < deadline:
+            submit()
+            done += 1
+        return done
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        total = sum(f.result() for f in [pool.submit(worker) for _ in range(concurrency)])
+    return total / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--answers", default="2,50,500")
+    parser.add_argument("--bank", type=int, default=10_000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    tmp = common.use_temp_database()
+    try:
+        from sqlmodel import Session
+        from database import engine, init_db
+        from models import User, QuizSubmission
+        from routes.quiz import submit_quiz
+
+        init_db()
+        common.seed_questions(args.bank)
+        user_id, _ = common.seed_user("bench@example.com")
+
+        def payload(n):
+            return {str(qid): f"{qid - 1}-{random.choice('ab')}" for qid in random.sample(range(1, args.bank + 1), n)}
+
+        def new_path(n):
+            session = common.threaded_session()
+            try:
+                user = common.run_async(session.get(User, user_id))
+                common.run_async(submit_quiz(QuizSubmission(answers=payload(n)), session, user))
+            finally:
+                common.run_async(session.close())
+
+        def old_path(n):
+            with Session(engine) as session:
+                session.get(User, user_id)
+                legacy_submit(session, user_id, payload(n))
+
+        rows = []
+        for n in (int(a) for a in args.answers.split(",")):
+            new = throughput(lambda: new_path(n), args.seconds, args.concurrency)
+            old = throughput(lambda: old_path(n), args.seconds, args.concurrency)
+            rows.append((n, new, old, new / old))
+        common.print_table(
+            f"Submissions/sec ({args.concurrency} concurrent clients, {args.bank} question bank)",
+            ["answers", "batched", "legacy", "speedup"],
+            rows,
+        )
+    finally:
+        common.remove_temp_database(tmp)
+
+
+if __name__ == "__main__":
+    main()
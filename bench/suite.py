@@ -0,0 +1,242 @@
+"""
+End-to-end load scenarios with per-endpoint latency and a regression check.
+
+Seeds a synthetic dataset (--users, --questions, --attempts), then runs
+each scenario for --seconds with --clients concurrent clients against
+the app in-process (httpx ASGI transport), or against `python main.py`
+started with --workers N over TCP:
+
+    quiz_start   GET /quiz
+    submit       GET /quiz, then POST /quiz/result with its session
+    history      GET /quiz/attempts (two pages), GET /quiz/attempts/{id}
+    admin        GET /quiz/attempts/all, GET /questions, GET /stats/global, GET /leaderboard
+    login_storm  POST /login (bcrypt at BCRYPT_ROUNDS; 503s are load shedding)
+
+Reports req/s and p50/p95/p99 per scenario and endpoint. With a stored
+baseline (--baseline, written by --save-baseline on the same machine and
+settings), the run fails (exit 1) when any endpoint's p95 grows, or its
+req/s drops, by more than --threshold.
+
+    python -m bench.suite [--scenarios submit,history] [--seconds 10] [--clients 16]
+    python -m bench.suite --save-baseline
+    python -m bench.suite --threshold 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from bench import common
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, client, method, url, route=None, **kwargs):
+        # route: the template to report under, so ids and cursors do not each get a row
+        t0 = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        key = f"{method} {route or url}"
+        if response.status_code < 400:
+            self.latencies[key].append(time.perf_counter() - t0)
+        else:
+            self.errors[key] += 1
+        return response
+
+
+async def quiz_start(rec, client, ctx):
+    await rec.call(client, "GET", "/quiz?count=10", route="/quiz", headers=random.choice(ctx["users"]))
+
+
+async def submit(rec, client, ctx):
+    headers = random.choice(ctx["users"])
+    r = await rec.call(client, "GET", "/quiz?count=10", route="/quiz", headers=headers)
+    if r.status_code != 200:
+        return
+    answers = {str(q["id"]): random.choice(q["options"]) for q in r.json()}
+    body = {"answers": answers, "session_id": r.headers.get("X-Quiz-Session")}
+    await rec.call(client, "POST", "/quiz/result", json=body, headers=headers)
+
+
+async def history(rec, client, ctx):
+    headers = random.choice(ctx["users"])
+    r = await rec.call(client, "GET", "/quiz/attempts?limit=20", route="/quiz/attempts?limit=20", headers=headers)
+    if r.status_code != 200 or not r.json():
+        return
+    cursor = r.headers.get("X-Next-Cursor")
+    if cursor:
+        await rec.call(client, "GET", f"/quiz/attempts?limit=20&cursor={cursor}", route="/quiz/attempts?limit=20&cursor=", headers=headers)
+    attempt_id = random.choice(r.json())["attempt_id"]
+    await rec.call(client, "GET", f"/quiz/attempts/{attempt_id}", route="/quiz/attempts/{id}", headers=headers)
+
+
+async def admin(rec, client, ctx):
+    headers = ctx["admin"]
+    r = await rec.call(client, "GET", "/quiz/attempts/all?limit=50", route="/quiz/attempts/all?limit=50", headers=headers)
+    cursor = r.headers.get("X-Next-Cursor")
+    if cursor:
+        await rec.call(client, "GET", f"/quiz/attempts/all?limit=50&cursor={cursor}", route="/quiz/attempts/all?limit=50&cursor=", headers=headers)
+    await rec.call(client, "GET", "/questions", headers=headers)
+    await rec.call(client, "GET", "/stats/global", headers=headers)
+    await rec.call(client, "GET", "/leaderboard?limit=50", route="/leaderboard", headers=headers)
+
+
+async def login_storm(rec, client, ctx):
+    email = random.choice(ctx["emails"])
+    await rec.call(client, "POST", "/login", data={"username": email, "password": common.BENCH_PASSWORD})
+
+
+SCENARIOS = {
+    "quiz_start": quiz_start,
+    "submit": submit,
+    "history": history,
+    "admin": admin,
+    "login_storm": login_storm,
+}
+
+
+async def run_scenario(client, step, ctx, clients, seconds):
+    rec = Recorder()
+    deadline = time.perf_counter() + seconds
+
+    async def client_loop():
+        while time.perf_counter() < deadline:
+            await step(rec, client, ctx)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(clients)))
+    elapsed = time.perf_counter() - t0
+    results = {}
+    for key in sorted(set(rec.latencies) | set(rec.errors)):
+        samples = rec.latencies.get(key, [])
+        stats = common.summarize(samples) if samples else {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+        results[key] = {
+            "rps": len(samples) / elapsed,
+            "p50_ms": stats["p50_ms"],
+            "p95_ms": stats["p95_ms"],
+            "p99_ms": stats["p99_ms"],
+            "errors": rec.errors.get(key, 0),
+        }
+    return results
+
+
+async def run_all(base_url, app, ctx, args):
+    import httpx
+    if app is not None:
+        client = httpx.AsyncClient(app=app, base_url=base_url, timeout=120)
+    else:
+        client = httpx.AsyncClient(base_url=base_url, timeout=120, limits=httpx.Limits(max_connections=args.clients))
+    results = {}
+    async with client:
+        for name in args.scenarios.split(","):
+            clients = args.login_clients if name == "login_storm" else args.clients
+            for key, value in (await run_scenario(client, SCENARIOS[name], ctx, clients, args.seconds)).items():
+                results[f"{name} {key}"] = value
+    return results
+
+
+def compare(results, baseline, threshold):
+    rows = []
+    regressions = []
+    for key, cur in results.items():
+        base = baseline.get(key)
+        if base is None:
+            rows.append((key, cur["rps"], cur["p95_ms"], "-", "-", "new"))
+            continue
+        p95_change = cur["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        rps_change = cur["rps"] / base["rps"] - 1 if base["rps"] else 0.0
+        failed = p95_change > threshold or rps_change < -threshold
+        if failed:
+            regressions.append(key)
+        rows.append((key, cur["rps"], cur["p95_ms"], f"{rps_change:+.0%}", f"{p95_change:+.0%}", "REGRESSED" if failed else "ok"))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=2000)
+    parser.add_argument("--attempts", type=int, default=20_000)
+    parser.add_argument("--answers", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--login-clients", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=0, help="run `python main.py` with this many workers instead of in-process")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed p95 growth / req/s drop, as a fraction")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    random.seed(args.seed)
+
+    tmp = common.use_temp_database()
+    try:
+        from database import init_db
+        from sqlmodel import Session
+        from database import engine
+        from stats import rebuild_stats
+        init_db()
+        common.seed_questions(args.questions)
+        users = common.seed_users(args.users)
+        common.seed_attempts([u[0] for u in users], args.attempts, args.answers, args.questions)
+        with Session(engine) as session:
+            rebuild_stats(session)
+            session.commit()
+        _, admin_headers = common.seed_user("admin@example.com", is_admin=True)
+        ctx = {"users": [u[2] for u in users], "emails": [u[1] for u in users], "admin": admin_headers}
+
+        if args.workers:
+            from bench.worker_scaling import start_server, PORT
+            server = start_server(args.workers, {"DATABASE_URL": os.environ["DATABASE_URL"]}, os.path.join(tmp, "server.log"))
+            try:
+                results = asyncio.run(run_all(f"http://127.0.0.1:{PORT}", None, ctx, args))
+            finally:
+                server.terminate()
+                server.wait()
+        else:
+            import main as app_main
+            results = asyncio.run(run_all("http://bench", app_main.app, ctx, args))
+    finally:
+        common.remove_temp_database(tmp)
+
+    common.print_table(
+        f"Scenarios ({args.clients} clients, {args.seconds:g}s each; {args.users} users, {args.questions} questions, {args.attempts} attempts)",
+        ["scenario / endpoint", "req/s", "p50", "p95", "p99", "errors"],
+        [(key, r["rps"], r["p50_ms"], r["p95_ms"], r["p99_ms"], r["errors"]) for key, r in results.items()],
+    )
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows, regressions = compare(results, baseline, args.threshold)
+    common.print_table(
+        f"Against {args.baseline} (threshold {args.threshold:.0%})",
+        ["scenario / endpoint", "req/s", "p95", "req/s change", "p95 change", "status"],
+        rows,
+    )
+    if regressions:
+        print(f"\n{len(regressions)} endpoint(s) regressed beyond {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
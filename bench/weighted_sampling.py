@@ -0,0 +1,72 @@
+"""
+Cost of drawing a quiz from the weighted sampler as the bank grows.
+
+Fills the sampler in memory (no database) with --sizes questions and
+random answer histories, then times drawing --count questions:
+uniformly (random.sample over the id array, QUIZ_SELECTION=uniform),
+weighted from the Fenwick tree, and weighted while excluding a user's
+correctly answered questions (10% and 90% of the bank). For comparison,
+a draw that rebuilds the weights over the whole bank (random.choices,
+what a per-request weighted draw costs without a precomputed table).
+Also times updating the weights for one graded 10-answer submission
+and building the tree at load.
+
+    python -m bench.weighted_sampling [--sizes 1000,10000,100000,1000000] [--count 10] [--iterations 2000]
+"""
+
+import argparse
+import random
+import time
+from bench import common
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--naive-iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    from sampling import QuestionSampler, question_weight
+
+    rows = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        ids = list(range(1, size + 1))
+        answered = [random.randint(0, 50) for _ in ids]
+        correct = [random.randint(0, a) for a in answered]
+        uniform = QuestionSampler(weighted=False)
+        uniform.replace(ids, answered, correct)
+        weighted = QuestionSampler(weighted=True)
+        t0 = time.perf_counter()
+        weighted.replace(ids, answered, correct)
+        build = time.perf_counter() - t0
+        weighted._loaded_attempts = 0
+
+        def naive():
+            weights = [question_weight(a, c) for a, c in zip(answered, correct)]
+            picked = set()
+            while len(picked) < args.count:
+                picked.add(random.choices(ids, weights)[0])
+
+        answers = [{"question_id": random.choice(ids), "is_correct": random.random() < 0.5} for _ in range(10)]
+        mastered_10 = set(random.sample(ids, size // 10))
+        mastered_90 = set(random.sample(ids, size * 9 // 10))
+        results = {
+            "uniform": common.measure(lambda: uniform.sample(args.count), args.iterations),
+            "weighted": common.measure(lambda: weighted.sample(args.count), args.iterations),
+            "excl 10%": common.measure(lambda: weighted.sample(args.count, mastered_10), args.iterations),
+            "excl 90%": common.measure(lambda: weighted.sample(args.count, mastered_90), args.iterations),
+            "rebuild weights": common.measure(naive, args.naive_iterations, warmup=1),
+            "record": common.measure(lambda: weighted.record(1, answers, attempts=1), args.iterations),
+        }
+        rows.append((size, *(results[name]["p50_ms"] * 1000 for name in results), build * 1000))
+    common.print_table(
+        f"Sampler cost (p50 us; draws of {args.count}, record = one 10-answer submission; build ms)",
+        ["bank size", "uniform", "weighted", "excl 10%", "excl 90%", "rebuild weights", "record", "build ms"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
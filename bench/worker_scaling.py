@@ -0,0 +1,127 @@
+"""
+Throughput of `python main.py` at 1/2/4/8 worker processes.
+
+Starts the real launcher (WORKERS=N, uvicorn over TCP) against a seeded
+throwaway database in the WAL profile, then drives it from --drivers
+client processes, each running --clients concurrent connections of the
+quiz workload: GET /quiz, submit it with its session, read the history.
+Scaling is bounded by the cores shared between server and drivers (and,
+for the writes, by SQLite's single writer), so the CPU count is printed
+with the results.
+
+    python -m bench.worker_scaling [--workers 1,2,4,8] [--seconds 10] [--drivers 2] [--clients 16]
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from bench import common
+
+PORT = 8765
+
+
+def start_server(workers, env, log_path):
+    log = open(log_path, "w")
+    server = subprocess.Popen(
+        [sys.executable, "main.py"],
+        env={**os.environ, **env, "WORKERS": str(workers), "PORT": str(PORT)},
+        stdout=log, stderr=subprocess.STDOUT,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        with open(log_path) as f:
+            if f.read().count("Application startup complete") >= workers:
+                return server
+        if server.poll() is not None:
+            break
+        time.sleep(0.2)
+    server.terminate()
+    with open(log_path) as f:
+        raise RuntimeError(f"server did not start:\n{f.read()}")
+
+
+async def drive(headers, clients, seconds):
+    import httpx
+    done = failed = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client_loop(client):
+        nonlocal done, failed
+        while time.perf_counter() < deadline:
+            # A failure (e.g. a writer that outwaited busy_timeout) is counted and the round abandoned
+            try:
+                r = await client.get("/quiz", headers=headers)
+                if r.status_code == 200:
+                    answers = {str(q["id"]): q["options"][0] for q in r.json()}
+                    submission = {"answers": answers, "session_id": r.headers["X-Quiz-Session"]}
+                    r = await client.post("/quiz/result", json=submission, headers=headers)
+                if r.status_code == 200:
+                    r = await client.get("/quiz/attempts?limit=10", headers=headers)
+                ok = r.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                done += 3
+            else:
+                failed += 1
+
+    limits = httpx.Limits(max_connections=clients)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=60) as client:
+        await asyncio.gather(*(client_loop(client) for _ in range(clients)))
+    return done, failed
+
+
+def run_driver(headers, clients, seconds):
+    return asyncio.run(drive(headers, clients, seconds))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--drivers", type=int, default=2)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--bank", type=int, default=10_000)
+    args = parser.parse_args()
+
+    tmp = common.use_temp_database()
+    # Sessions in the table at every worker count, so only the process count changes
+    env = {"DATABASE_URL": os.environ["DATABASE_URL"], "DATABASE_PROFILE": "wal", "QUIZ_SESSION_STORE": "sqlite"}
+    os.environ.update(env)
+    try:
+        from database import init_db
+        init_db()
+        common.seed_questions(args.bank)
+        _, headers = common.seed_user("bench@example.com")
+
+        rows = []
+        base = None
+        for workers in (int(w) for w in args.workers.split(",")):
+            server = start_server(workers, env, os.path.join(tmp, f"server-{workers}.log"))
+            try:
+                with ProcessPoolExecutor(args.drivers) as pool:
+                    t0 = time.perf_counter()
+                    futures = [pool.submit(run_driver, headers, args.clients, args.seconds) for _ in range(args.drivers)]
+                    results = [f.result() for f in futures]
+                    rps = sum(done for done, _ in results) / (time.perf_counter() - t0)
+                    failed = sum(failed for _, failed in results)
+            finally:
+                server.terminate()
+                server.wait()
+            base = base or rps
+            rows.append((workers, rps, rps / base, failed))
+        common.print_table(
+            f"Requests/sec, quiz workload ({os.cpu_count()} CPUs, {args.drivers}x{args.clients} clients)",
+            ["workers", "req/s", "vs 1", "failed"],
+            rows,
+        )
+    finally:
+        common.remove_temp_database(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Peak POST /quiz/result throughput, synchronous vs. write-behind.
+
+--clients concurrent clients submit 10-answer quizzes (no session, warm
+answer key) for --seconds through the ASGI app in-process, once per
+configuration and SQLite profile, each in its own subprocess. "sync" is
+the default path: one transaction per submission. "write-behind" sets
+WRITE_BEHIND=1, so a submission is answered once it is fsynced to the
+spool and the writer commits WRITE_BEHIND_BATCH at a time. Reports
+accepted submissions/sec with their latency, then the shutdown flush
+time, committed/sec including it, and checks that every accepted
+submission has exactly one quizattempt row.
+
+    python -m bench.write_behind [--profiles default,wal] [--clients 32] [--seconds 5] [--batch 200] [--interval-ms 50]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from bench import common
+
+CONFIGS = {
+    "sync": {},
+    "write-behind": {"WRITE_BEHIND": "1"},
+}
+
+
+async def drive(app, users, args):
+    import httpx
+    latencies, rejected = [], []
+    deadline = time.perf_counter() + args.seconds
+
+    async def client_loop(client):
+        while time.perf_counter() < deadline:
+            qids = random.sample(range(1, args.bank + 1), 10)
+            answers = {str(q): random.choice([f"{q - 1}-a", "x"]) for q in qids}
+            t0 = time.perf_counter()
+            r = await client.post("/quiz/result", json={"answers": answers}, headers=random.choice(users))
+            if r.status_code == 503:
+                rejected.append(1)
+                await asyncio.sleep(0.05)
+            else:
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - t0)
+
+    await app.router.startup()
+    async with httpx.AsyncClient(app=app, base_url="http://bench", timeout=None) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(args.clients)))
+        elapsed = time.perf_counter() - t0
+    # The write-behind queue drains here
+    t1 = time.perf_counter()
+    await app.router.shutdown()
+    flush = time.perf_counter() - t1
+    return {
+        "accepted": len(latencies), "per_s": len(latencies) / elapsed, "rejected": len(rejected),
+        "flush_ms": flush * 1000, "committed_per_s": len(latencies) / (elapsed + flush),
+        **common.summarize(latencies or [0]),
+    }
+
+
+def run_config(args):
+    tmp = common.use_temp_database()
+    try:
+        import main as app_main
+        from database import init_db
+        init_db()
+        common.seed_questions(args.bank)
+        users = [u[2] for u in common.seed_users(args.users)]
+        r = asyncio.run(drive(app_main.app, users, args))
+        conn = common.raw_connection()
+        try:
+            r["rows"] = conn.execute("SELECT count(*) FROM quizattempt").fetchone()[0]
+        finally:
+            conn.close()
+        print(json.dumps(r))
+    finally:
+        common.remove_temp_database(tmp)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--configs", default="sync,write-behind")
+    parser.add_argument("--profiles", default="default,wal")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--bank", type=int, default=1000)
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--interval-ms", type=int, default=50)
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        return run_config(args)
+
+    rows = []
+    for profile in args.profiles.split(","):
+        for name in args.configs.split(","):
+            env = {**CONFIGS[name], "DATABASE_PROFILE": profile,
+                   "WRITE_BEHIND_BATCH": str(args.batch), "WRITE_BEHIND_INTERVAL_MS": str(args.interval_ms)}
+            argv = ["--clients", args.clients, "--seconds", args.seconds, "--users", args.users, "--bank", args.bank]
+            r = common.run_isolated("bench.write_behind", env, argv)
+            rows.append((profile, name, r["per_s"], r["p50_ms"], r["p95_ms"], r["rejected"], r["flush_ms"],
+                         r["committed_per_s"], "ok" if r["rows"] == r["accepted"] else f"{r['rows']} rows"))
+    common.print_table(
+        f"POST /quiz/result, {args.clients} clients for {args.seconds:g}s "
+        f"(write-behind batch {args.batch}, {args.interval_ms} ms)",
+        ["profile", "config", "accepted/s", "p50", "p95", "503s", "flush ms", "committed/s", "rows"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import os
+import io
+import csv
+import json
+import codecs
+from typing import AsyncIterator, Tuple
+from fastapi import HTTPException
+from pydantic import ValidationError
+from models import QuestionCreate
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "100"))
+IMPORT_MAX_LINE = int(os.getenv("IMPORT_MAX_LINE", str(1024 * 1024)))
+
+CSV_COLUMNS = ["text", "options", "correct_answer"]
+
+
+async def read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    # Decodes the body as it arrives and yields (line number, line) without holding more than one line
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    line_no = 0
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            line_no += 1
+            yield line_no, line.rstrip("\r")
+        if len(buffer) > IMPORT_MAX_LINE:
+            raise HTTPException(status_code=400, detail=f"Line {line_no + 1} is longer than {IMPORT_MAX_LINE} characters")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield line_no + 1, buffer.rstrip("\r")
+
+
+async def ndjson_records(lines):
+    async for line_no, line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as e:
+            yield line_no, e
+
+
+async def csv_records(lines):
+    # A record ends at a newline outside quotes; quotes inside fields are doubled,
+    # so an odd running count of '"' means the field continues on the next line
+    header = None
+    record, start = [], None
+    async for line_no, line in lines:
+        if not record:
+            if not line.strip():
+                continue
+            start = line_no
+        record.append(line)
+        if sum(part.count('"') for part in record) % 2:
+            continue
+        row = next(csv.reader(["\n".join(record)]))
+        record = []
+        if header is None:
+            header = row
+            missing = set(CSV_COLUMNS) - set(header)
+            if missing:
+                raise HTTPException(status_code=400, detail=f"CSV header is missing columns: {', '.join(sorted(missing))}")
+            continue
+        if len(row) != len(header):
+            yield start, ValueError(f"Expected {len(header)} fields, got {len(row)}")
+            continue
+        data = dict(zip(header, row))
+        try:
+            # options is a JSON array, as written by the export
+            data["options"] = json.loads(data["options"])
+        except ValueError as e:
+            yield start, e
+            continue
+        yield start, data
+    if record:
+        yield start, ValueError("Unterminated quoted field")
+
+
+def validate(record) -> QuestionCreate:
+    if isinstance(record, Exception):
+        raise record
+    return QuestionCreate.model_validate(record)
+
+
+def error_message(e: Exception) -> str:
+    if isinstance(e, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+    return str(e)
+
+
+def csv_lines(rows) -> str:
+    out = io.StringIO()
+    csv.writer(out, lineterminator="\n").writerows(rows)
+    return out.getvalue()
@@ -0,0 +1,176 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from sqlalchemy import update, insert
+from sqlmodel import Session, select
+from models import CacheVersion
+
+CACHE_VERSION_POLL_SECONDS = float(os.getenv("CACHE_VERSION_POLL_SECONDS", "0"))
+
+caches = {}
+
+
+class LRUCache:
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        caches[name] = self
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            return self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# LRU whose entries also carry an absolute expiry time (epoch seconds)
+class TTLCache(LRUCache):
+    def __init__(self, name: str, maxsize: int):
+        super().__init__(name, maxsize)
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] <= time.time():
+                del self._data[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, expires_at: float):
+        super().put(key, (value, expires_at))
+
+    def pop(self, key):
+        entry = super().pop(key)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry[0]
+
+    def stats(self):
+        return {**super().stats(), "expirations": self.expirations}
+
+
+def read_version(session: Session, name: str) -> int:
+    version = session.exec(select(CacheVersion.version).where(CacheVersion.name == name)).first()
+    return version or 0
+
+
+def bump_version(session: Session, name: str) -> int:
+    # Runs inside the caller's transaction, so the bump commits with the change it announces.
+    # Returns the new version.
+    version = session.execute(
+        update(CacheVersion).where(CacheVersion.name == name).values(version=CacheVersion.version + 1).returning(CacheVersion.version)
+    ).scalar()
+    if version is None:
+        session.execute(insert(CacheVersion).values(name=name, version=1))
+        version = 1
+    return version
+
+
+# Follows one row of the cacheversion table, which is how worker processes tell each
+# other that shared data changed: writers bump the row in their transaction and every
+# process polls it (a primary-key read, at most every CACHE_VERSION_POLL_SECONDS).
+class VersionWatch:
+    def __init__(self, name: str, poll_seconds: float = None):
+        self.name = name
+        self.version = None
+        self.poll_seconds = CACHE_VERSION_POLL_SECONDS if poll_seconds is None else poll_seconds
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def due(self) -> bool:
+        # Whether the next poll() will read the row
+        return self.version is None or time.monotonic() - self._checked_at >= self.poll_seconds
+
+    def poll(self, session: Session, force: bool = False) -> bool:
+        # True when the version moved since the last poll, and on the first one
+        now = time.monotonic()
+        if not force and self.version is not None and now - self._checked_at < self.poll_seconds:
+            return False
+        version = read_version(session, self.name)
+        with self._lock:
+            self._checked_at = now
+            if version == self.version:
+                return False
+            self.version = version
+            return True
+
+    def applied(self, version: int):
+        # This process bumped to `version` and already applied its own change; skip the
+        # reload unless another process bumped in between
+        with self._lock:
+            if self.version is not None and version == self.version + 1:
+                self.version = version
+
+    def advance(self, version: int):
+        # For data keyed by the version number itself (ETags, rendered responses), where
+        # passing over another process's bump is harmless: the new number misses every key
+        with self._lock:
+            if self.version is None or version > self.version:
+                self.version = version
+
+
+# LRU whose contents are dropped whenever another request (in any worker)
+# bumps its row in the cacheversion table.
+class VersionedCache(LRUCache):
+    def __init__(self, name: str, maxsize: int):
+        super().__init__(name, maxsize)
+        self._watch = VersionWatch(name)
+
+    def sync(self, session: Session):
+        if self._watch.poll(session):
+            self.clear()
+
+    @property
+    def version(self):
+        # Version seen by the last sync(); caches derived from this one key on it
+        return self._watch.version
+
+    def invalidate(self, session: Session, key):
+        bump_version(session, self.name)
+        self.pop(key)
@@ -0,0 +1,53 @@
+"""
+Shared database setup for the test modules.
+
+The app binds its engine once, when the first module imports it, so every
+module runs against the same throwaway SQLite file, chosen here before any
+of them is imported. It is emptied before each module, along with the
+in-process caches, so a module sees only the rows it seeds itself.
+"""
+
+import os
+import sys
+import tempfile
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+
+import pytest
+
+
+def empty_database():
+    from sqlmodel import SQLModel
+    from database import engine
+    from cache import caches
+    import auth
+
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        views = {name for (name,) in cur.execute("SELECT name FROM sqlite_master WHERE type = 'view'")}
+        for table in reversed(SQLModel.metadata.sorted_tables):
+            if table.name not in views and table.name != "cacheversion":
+                cur.execute(f'DELETE FROM "{table.name}"')
+        if cur.execute("SELECT 1 FROM pragma_table_list WHERE schema = 'archive' AND name = 'archivedattempt'").fetchone():
+            cur.execute("DELETE FROM archive.archivedattempt")
+        # Bumped rather than reset: versions only move forward, so everything that follows a
+        # row (the sampler, ETags) sees a change instead of an old number coming round again
+        cur.execute("UPDATE cacheversion SET version = version + 1")
+        # Ids start from 1 again in every module
+        if cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone():
+            cur.execute("DELETE FROM sqlite_sequence")
+        raw.commit()
+    finally:
+        raw.close()
+    for cache in caches.values():
+        cache.clear()
+    auth.revocations.clear()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def clean_database():
+    # Modules that never load the app (test_sampling) have nothing to clean
+    if "database" in sys.modules:
+        empty_database()
+    yield
@@ -1,11 +1,263 @@
+import os
+import asyncio
+from contextlib import contextmanager
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from migrations import migrate
+from search import create_search_index
+from retention import create_archive_schema, apply_result_mode
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single worker is assumed
+    fcntl = None
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./quiz.db")
+# "sync": blocking engine, each DB call hops to the threadpool; "async": AsyncSession over an async driver
+DATABASE_MODE = os.getenv("DATABASE_MODE", "sync")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "default")
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+
+
+def default_archive_database(url: str) -> str:
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return ""
+    return os.path.splitext(url.database)[0] + "-archive.db"
+
+
+# Attempts moved out by `python manage.py archive` (see retention.py). The file is attached to
+# every SQLite connection as schema "archive", so archived attempts are read in the same
+# session as live ones. Empty disables archiving.
+ARCHIVE_DATABASE = os.getenv("ARCHIVE_DATABASE", default_archive_database(DATABASE_URL))
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+# PRAGMAs applied to every new SQLite connection. All profiles enforce foreign keys.
+# "wal" lets readers proceed while a writer commits; with synchronous=NORMAL a power loss
+# (not a process crash) can drop the most recent commits. "wal-durable" keeps WAL but
+# fsyncs every commit.
+SQLITE_PROFILES = {
+    "default": {"foreign_keys": "ON"},
+    "wal": {
+        "foreign_keys": "ON",
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -65536,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+    },
+}
+SQLITE_PROFILES["wal-durable"] = {**SQLITE_PROFILES["wal"], "synchronous": "FULL"}
+
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    url = make_url(url)
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if url.get_backend_name() == "sqlite":
+        # Sessions are used from whichever threadpool thread runs the current await
+        options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            return options
+        if is_async:
+            # aiosqlite defaults to NullPool, which opens a new connection per session
+            options["poolclass"] = AsyncAdaptedQueuePool
+    options["pool_size"] = DB_POOL_SIZE
+    options["max_overflow"] = DB_MAX_OVERFLOW
+    return options
+
+
+def async_url(url: str) -> str:
+    url = make_url(url)
+    if url.drivername in ASYNC_DRIVERS:
+        url = url.set(drivername=ASYNC_DRIVERS[url.drivername])
+    return url.render_as_string(hide_password=False)
+
+
+# The sync engine always exists: schema setup and scripts use it in both modes
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+async_engine = None
+if DATABASE_MODE == "async":
+    async_engine = create_async_engine(async_url(DATABASE_URL), **engine_options(DATABASE_URL, is_async=True))
+
+
+# Gives a sync Session the awaitable interface of AsyncSession, so routes are
+# written once and run in either mode.
+class ThreadedSession:
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    def expunge(self, instance):
+        self.sync_session.expunge(instance)
+
+    async def exec(self, statement, **kwargs):
+        # Buffer rows in the worker thread, as AsyncSession does, so callers never fetch on the event loop
+        kwargs["execution_options"] = {**kwargs.get("execution_options", {}), "prebuffer_rows": True}
+        return await run_in_threadpool(self.sync_session.exec, statement, **kwargs)
+
+    async def execute(self, statement, *args, **kwargs):
+        kwargs["execution_options"] = {**kwargs.get("execution_options", {}), "prebuffer_rows": True}
+        return await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def refresh(self, instance, *args, **kwargs):
+        await run_in_threadpool(self.sync_session.refresh, instance, *args, **kwargs)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        # A session that never touched the database (e.g. every lookup was cached) closes without a thread hop
+        if self.sync_session.in_transaction():
+            await run_in_threadpool(self.sync_session.close)
+        else:
+            self.sync_session.close()
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+
+def apply_sqlite_profile(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma, value in SQLITE_PROFILES[DATABASE_PROFILE].items():
+        cursor.execute(f"PRAGMA {pragma}={value}")
+    cursor.close()
+
+
+def attach_archive(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("ATTACH DATABASE ? AS archive", (ARCHIVE_DATABASE,))
+    cursor.close()
+
+
+def install_profile(target):
+    if target.dialect.name != "sqlite":
+        return
+    if not event.contains(target, "connect", apply_sqlite_profile):
+        event.listen(target, "connect", apply_sqlite_profile)
+        if ARCHIVE_DATABASE:
+            event.listen(target, "connect", attach_archive)
+        # Connections opened before the listener existed would miss the pragmas
+        target.dispose()
+
+
+@contextmanager
+def init_lock():
+    # Every worker imports the app and runs init_db(); the first to get the lock does the
+    # work, the rest then find the schema current. Held on a file next to the database.
+    url = make_url(DATABASE_URL)
+    if fcntl is None or url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        yield
+        return
+    with open(url.database + ".init.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
 
-DATABASE_URL = "sqlite:///./quiz.db"
-engine = create_engine(DATABASE_URL)
 
 def init_db():
-    SQLModel.metadata.create_all(engine)
+    install_profile(engine)
+    if async_engine is not None:
+        install_profile(async_engine.sync_engine)
+    with init_lock():
+        migrate(engine)
+        SQLModel.metadata.create_all(engine)
+        # create_all skips tables that already exist, so add indexes declared since
+        # (not on result once it is a view: its index stayed with the renamed table)
+        views = set(inspect(engine).get_view_names())
+        for table in SQLModel.metadata.sorted_tables:
+            if table.name in views:
+                continue
+            for index in table.indexes:
+                index.create(engine, checkfirst=True)
+        # FTS5 table and its triggers, the archive table and the legacy result view,
+        # which create_all does not know about
+        with engine.begin() as conn:
+            create_search_index(conn)
+            create_archive_schema(conn)
+            apply_result_mode(conn)
+
+
+async def stream_partitions(session, statement, size: int = STREAM_BATCH_SIZE):
+    # Server-side cursor: only `size` rows are held in memory at a time, in either mode
+    statement = statement.execution_options(yield_per=size)
+    if isinstance(session, ThreadedSession):
+        result = await run_in_threadpool(session.sync_session.execute, statement)
+        while True:
+            rows = await run_in_threadpool(result.fetchmany, size)
+            if not rows:
+                break
+            yield rows
+    else:
+        result = await session.stream(statement)
+        async for rows in result.partitions(size):
+            yield rows
+
+
+_first_connect_done = False
+_first_connect_lock = None
+
+
+async def first_connect():
+    # SQLAlchemy runs the pool's first "connect" event (dialect setup, profile pragmas) under a
+    # threading lock; two coroutines hitting it at once would deadlock the event loop
+    global _first_connect_done, _first_connect_lock
+    if _first_connect_lock is None:
+        _first_connect_lock = asyncio.Lock()
+    async with _first_connect_lock:
+        if not _first_connect_done:
+            async with async_engine.connect():
+                pass
+            _first_connect_done = True
+
+
+async def close_db():
+    # aiosqlite runs each connection on its own thread, which keeps the process alive until disposed
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
+
 
-def get_session():
-    with Session(engine) as session:
-        yield session
\ No newline at end of file
+async def get_session():
+    if async_engine is not None:
+        if not _first_connect_done:
+            await first_connect()
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+    else:
+        session = ThreadedSession(Session(engine, expire_on_commit=False))
+        try:
+            yield session
+        finally:
+            await session.close()
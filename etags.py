@@ -0,0 +1,7 @@
+def etag_matches(if_none_match, etag: str) -> bool:
+    # If-None-Match may list several tags, or "*"; weak tags compare equal to strong ones (RFC 9110 13.1.2)
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Set, Tuple
+from fastapi import HTTPException
+from sqlmodel import Session, select
+from models import Question
+from question_cache import load_questions
+
+
+def parse_answers(answers: dict) -> Dict[int, str]:
+    try:
+        return {int(qid): ans for qid, ans in answers.items()}
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid question id")
+
+
+def load_answer_key(session: Session, question_ids: Iterable[int]) -> Dict[int, str]:
+    return {qid: q["correct_answer"] for qid, q in load_questions(session, question_ids).items()}
+
+
+def grade(answers: Dict[int, str], key: Dict[int, str], now: datetime) -> Tuple[int, Dict[str, str], List[dict]]:
+    # Answers to questions missing from the key are left out
+    score = 0
+    correct_answers = {}
+    rows = []
+    for qid, ans in answers.items():
+        correct = key.get(qid)
+        if correct is None:
+            continue
+        correct_answers[str(qid)] = correct
+        is_correct = ans == correct
+        if is_correct:
+            score += 1
+        rows.append({"question_id": qid, "selected_option": ans, "is_correct": is_correct, "attempted_at": now})
+    return score, correct_answers, rows
+
+
+def existing_questions(session: Session, question_ids: Iterable[int]) -> Set[int]:
+    question_ids = list(question_ids)
+    if not question_ids:
+        return set()
+    return set(session.exec(select(Question.id).where(Question.id.in_(question_ids))).all())
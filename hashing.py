@@ -0,0 +1,104 @@
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+# bcrypt work factor. Changing it takes effect for new hashes, and existing users
+# are rehashed the next time they log in.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# "thread" (bcrypt releases the GIL) or "process"
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hashes running or waiting; beyond this /register and /login answer 503 at once
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "64"))
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    # The new hash is only returned when the stored one used a different work factor
+    return pwd_context.verify_and_update(password, hashed)
+
+
+# Runs bcrypt on its own small pool, so a login storm cannot take every thread of
+# the shared threadpool that the database calls of all other endpoints rely on.
+class PasswordHasher:
+    def __init__(self, kind: str, workers: int, max_pending: int):
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.seconds = 0.0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Created on first use, so importing the app never forks
+                pool = ProcessPoolExecutor if self.kind == "process" else ThreadPoolExecutor
+                self._executor = pool(max_workers=self.workers)
+            return self._executor
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503, detail="Server busy, try again shortly",
+                    headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)},
+                )
+            self.pending += 1
+        t0 = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor(), fn, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+                self.seconds += time.perf_counter() - t0
+
+    async def hash(self, password: str) -> str:
+        return await self.run(hash_password, password)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        verified, new_hash = await self.run(verify_and_update, password, hashed)
+        if new_hash:
+            with self._lock:
+                self.rehashed += 1
+        return verified, new_hash
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self):
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "rounds": BCRYPT_ROUNDS,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            # Includes time spent queued for a worker
+            "mean_ms": self.seconds / self.completed * 1000 if self.completed else 0.0,
+        }
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE)
@@ -0,0 +1,148 @@
+import os
+import time
+import threading
+from array import array
+from bisect import bisect_left, insort
+from typing import List, Optional, Tuple
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+from database import engine
+from models import UserStats, GlobalStats
+
+# How often a worker may reload when other workers have written submissions it has not seen
+LEADERBOARD_RELOAD_SECONDS = float(os.getenv("LEADERBOARD_RELOAD_SECONDS", "5"))
+BOARDS = ("best", "total")
+
+USER_BITS = 32
+USER_MASK = (1 << USER_BITS) - 1
+
+
+def encode(score: int, user_id: int) -> int:
+    # Ascending keys order by score descending, then user id, and fit a signed 64-bit array
+    return (-score << USER_BITS) | user_id
+
+
+def decode(key: int) -> Tuple[int, int]:
+    return -(key >> USER_BITS), key & USER_MASK
+
+
+# Sorted array of encoded keys plus each user's current score indexed by user id
+# (-1 = not ranked): rank lookups are a bisect, updates a bisect and one memmove.
+class RankedBoard:
+    def __init__(self):
+        self._keys = array("q")
+        self._scores = array("q")
+
+    def __len__(self):
+        return len(self._keys)
+
+    def load(self, user_ids, scores):
+        by_user = array("q", [-1]) * (max(user_ids, default=0) + 1)
+        for user_id, score in zip(user_ids, scores):
+            by_user[user_id] = score
+        self._keys = array("q", sorted(map(encode, scores, user_ids)))
+        self._scores = by_user
+
+    def score(self, user_id: int) -> int:
+        return self._scores[user_id] if user_id < len(self._scores) else -1
+
+    def set(self, user_id: int, score: int):
+        current = self.score(user_id)
+        # Both boards only ever grow, so a late or repeated update never moves a user down
+        if score <= current:
+            return
+        if current >= 0:
+            del self._keys[bisect_left(self._keys, encode(current, user_id))]
+        elif user_id >= len(self._scores):
+            self._scores.extend([-1] * (user_id + 1 - len(self._scores)))
+        self._scores[user_id] = score
+        insort(self._keys, encode(score, user_id))
+
+    def rank_of_score(self, score: int) -> int:
+        # Competition ranking: ties share the rank of the first user with that score
+        return bisect_left(self._keys, encode(score, 0)) + 1
+
+    def rank(self, user_id: int) -> Optional[Tuple[int, int]]:
+        score = self.score(user_id)
+        if score < 0:
+            return None
+        return self.rank_of_score(score), score
+
+    def page(self, offset: int, limit: int) -> List[Tuple[int, int, int]]:
+        entries = []
+        for key in self._keys[offset:offset + limit]:
+            score, user_id = decode(key)
+            entries.append((self.rank_of_score(score), user_id, score))
+        return entries
+
+
+class Leaderboard:
+    def __init__(self):
+        self.boards = {name: RankedBoard() for name in BOARDS}
+        self._loaded = False
+        self._loaded_attempts = 0
+        self._applied = 0
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def load(self, session: Session):
+        attempts = session.exec(select(GlobalStats.attempts).where(GlobalStats.id == 1)).first() or 0
+        # Core execution on the session's connection: skips the ORM result layer, a third of the load time at 1M rows
+        rows = session.connection().execute(select(UserStats.user_id, UserStats.best_score, UserStats.total_score)).all()
+        user_ids, best, total = zip(*rows) if rows else ((), (), ())
+        boards = {name: RankedBoard() for name in BOARDS}
+        boards["best"].load(user_ids, best)
+        boards["total"].load(user_ids, total)
+        with self._lock:
+            self.boards = boards
+            self._loaded_attempts = attempts
+            self._applied = 0
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+
+    def ensure_loaded(self, session: Session):
+        if not self._loaded:
+            self.load(session)
+
+    def sync(self, session: Session):
+        # Every submission bumps globalstats.attempts; a count this worker has not
+        # recorded means another worker wrote, so reload (at most every few seconds)
+        if not self._loaded:
+            return self.load(session)
+        if time.monotonic() - self._loaded_at < LEADERBOARD_RELOAD_SECONDS:
+            return
+        attempts = session.exec(select(GlobalStats.attempts).where(GlobalStats.id == 1)).first() or 0
+        if attempts != self._loaded_attempts + self._applied:
+            self.load(session)
+
+    def record(self, user_id: int, best_score: int, total_score: int, attempts: int):
+        # attempts is globalstats.attempts right after this submission; one that committed
+        # before the last load is already in the snapshot and is not counted again
+        with self._lock:
+            if not self._loaded:
+                return
+            self.boards["best"].set(user_id, best_score)
+            self.boards["total"].set(user_id, total_score)
+            if attempts > self._loaded_attempts:
+                self._applied += 1
+
+    def rank(self, board: str, user_id: int) -> Optional[Tuple[int, int]]:
+        with self._lock:
+            return self.boards[board].rank(user_id)
+
+    def page(self, board: str, offset: int, limit: int):
+        with self._lock:
+            return len(self.boards[board]), self.boards[board].page(offset, limit)
+
+
+leaderboard = Leaderboard()
+
+
+def load_leaderboard():
+    with Session(engine) as session:
+        leaderboard.ensure_loaded(session)
+
+
+async def seed_leaderboard():
+    # At startup, so the first leaderboard request does not pay for the load
+    await run_in_threadpool(load_leaderboard)
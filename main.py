@@ -1,18 +1,45 @@
+import os
 from fastapi import FastAPI
-from database import init_db
-from routes import users, questions, quiz
+from database import init_db, close_db
+from hashing import password_hasher
+from leaderboard import seed_leaderboard
+from write_behind import write_behind, start_write_behind
+from metrics import MetricsMiddleware, TimedORJSONResponse
+from routes import users, questions, quiz, admin, stats, leaderboard, metrics
 
-app = FastAPI()
+# orjson renders responses; the big list endpoints also skip jsonable_encoder by returning it directly
+app = FastAPI(default_response_class=TimedORJSONResponse)
+app.add_middleware(MetricsMiddleware)
 
 init_db()
 
 app.include_router(users.router)
 app.include_router(questions.router)
 app.include_router(quiz.router)
+app.include_router(admin.router)
+app.include_router(stats.router)
+app.include_router(leaderboard.router)
+app.include_router(metrics.router)
+
+# Spooled submissions from a previous run are written before the leaderboard is seeded
+app.add_event_handler("startup", start_write_behind)
+app.add_event_handler("startup", seed_leaderboard)
+app.add_event_handler("shutdown", write_behind.stop)
+app.add_event_handler("shutdown", close_db)
+app.add_event_handler("shutdown", password_hasher.shutdown)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    host = os.getenv("HOST", "127.0.0.1")
+    port = int(os.getenv("PORT", "8000"))
+    workers = int(os.getenv("WORKERS", "1"))
+    if workers > 1:
+        # Quizzes issued by one worker may be submitted to another
+        os.environ.setdefault("QUIZ_SESSION_STORE", "sqlite")
+        # Each worker process imports the app by name and runs init_db() under the file lock
+        uvicorn.run("main:app", host=host, port=port, workers=workers)
+    else:
+        uvicorn.run(app, host=host, port=port)
 
 
 
@@ -0,0 +1,60 @@
+"""
+Maintenance commands, run from the repository root against DATABASE_URL:
+
+    python manage.py rebuild-stats
+    python manage.py rebuild-search
+    python manage.py archive [--days N] [--keep-last N] [--vacuum]
+"""
+
+import argparse
+from sqlmodel import Session
+from database import engine, init_db, ARCHIVE_DATABASE
+from retention import RETENTION_DAYS, RETENTION_KEEP_LAST, RETENTION_BATCH, archive_attempts
+
+
+def rebuild_stats_command(args):
+    from stats import rebuild_stats
+    with Session(engine) as session:
+        rebuild_stats(session)
+        session.commit()
+    print("Statistics rebuilt from quiz attempts")
+
+
+def rebuild_search_command(args):
+    from search import rebuild_search_index
+    if engine.dialect.name != "sqlite":
+        raise SystemExit("The search index is SQLite only")
+    with engine.begin() as conn:
+        rebuild_search_index(conn)
+        count = conn.exec_driver_sql("SELECT count(*) FROM question").scalar()
+    print(f"Search index rebuilt from {count} questions")
+
+
+def archive_command(args):
+    moved = archive_attempts(engine, days=args.days, keep_last=args.keep_last, batch=args.batch)
+    print(f"Archived {moved} attempts older than {args.days} days to {ARCHIVE_DATABASE}")
+    if args.vacuum:
+        # Deleted rows only free pages inside the file; VACUUM rewrites it (and needs as much free space again)
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("VACUUM main")
+        print("Database compacted")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quiz backend maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild-stats", help="Recompute user/question/global statistics from stored attempts").set_defaults(run=rebuild_stats_command)
+    commands.add_parser("rebuild-search", help="Recreate the question full-text index from the question table").set_defaults(run=rebuild_search_command)
+    archive = commands.add_parser("archive", help="Move old attempts and their answers to the archive database")
+    archive.add_argument("--days", type=int, default=RETENTION_DAYS, help="Archive attempts older than this")
+    archive.add_argument("--keep-last", type=int, default=RETENTION_KEEP_LAST, help="Keep each user's most recent attempts live")
+    archive.add_argument("--batch", type=int, default=RETENTION_BATCH, help="Attempts moved per transaction")
+    archive.add_argument("--vacuum", action="store_true", help="Shrink the database file afterwards")
+    archive.set_defaults(run=archive_command)
+    args = parser.parse_args()
+    init_db()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
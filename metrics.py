@@ -0,0 +1,200 @@
+import os
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Log every request that ran more than this many queries (0 = off), so an N+1 shows up at once
+METRICS_LOG_QUERIES_OVER = int(os.getenv("METRICS_LOG_QUERIES_OVER", "0"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+RENDER_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1)
+
+logger = logging.getLogger("metrics")
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, value: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def render(self, kind: str = "counter"):
+        with self._lock:
+            return sample_lines(self.name, kind, self.help, self.labels, self._values)
+
+
+class Gauge(Counter):
+    def dec(self, *labels: str):
+        self.inc(*labels, value=-1)
+
+    def render(self):
+        return super().render("gauge")
+
+
+# Cumulative buckets are only summed up when rendered; observing is a bisect and two adds
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                # One slot per bucket plus +Inf, then the sum
+                counts = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, counts in sorted(self._values.items()):
+                total = 0
+                for bound, count in zip((*self.buckets, "+Inf"), counts):
+                    total += count
+                    le = bound if bound == "+Inf" else repr(float(bound))
+                    lines.append(f"{self.name}_bucket{label_set((*self.labels, 'le'), (*labels, le))} {total}")
+                lines.append(f"{self.name}_sum{label_set(self.labels, labels)} {counts[-1]}")
+                lines.append(f"{self.name}_count{label_set(self.labels, labels)} {total}")
+        return lines
+
+
+def sample_lines(name: str, kind: str, help: str, labels: Sequence[str], samples: Dict[tuple, float]):
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for values, value in sorted(samples.items()):
+        lines.append(f"{name}{label_set(labels, values)} {value}")
+    return lines
+
+
+def label_set(names, values) -> str:
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+requests_total = Counter("http_requests_total", "Requests handled", ("method", "route", "status"))
+requests_in_flight = Gauge("http_requests_in_flight", "Requests being handled")
+request_seconds = Histogram("http_request_duration_seconds", "Time from request to last body byte", LATENCY_BUCKETS, ("method", "route"))
+request_queries = Histogram("http_request_db_queries", "Database queries per request", QUERY_BUCKETS, ("method", "route"))
+request_db_seconds = Histogram("http_request_db_seconds", "Time spent in database queries per request", LATENCY_BUCKETS, ("method", "route"))
+request_render_seconds = Histogram("http_request_render_seconds", "Time spent rendering JSON bodies per request", RENDER_BUCKETS, ("method", "route"))
+METRICS = [requests_total, requests_in_flight, request_seconds, request_queries, request_db_seconds, request_render_seconds]
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "render_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+
+
+# Set by the middleware; threadpool calls (sync DB mode) run in a copy of the request's context
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and current_request.get() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    stats = current_request.get()
+    if started is not None and stats is not None:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+# ORJSONResponse that charges its rendering to the current request
+class TimedORJSONResponse(ORJSONResponse):
+    def render(self, content) -> bytes:
+        started = time.perf_counter()
+        body = super().render(content)
+        stats = current_request.get()
+        if stats is not None:
+            stats.render_seconds += time.perf_counter() - started
+        return body
+
+
+_route_names = {}
+
+
+def route_name(scope) -> str:
+    # The route template, not the raw path, so ids do not each become a label
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    name = _route_names.get(endpoint)
+    if name is None:
+        paths = [route.path for route in scope["app"].routes if getattr(route, "endpoint", None) is endpoint]
+        name = _route_names[endpoint] = paths[0] if paths else "unmatched"
+    return name
+
+
+# Plain ASGI middleware (no BaseHTTPMiddleware task per request); streamed
+# bodies are timed until their last chunk.
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            requests_in_flight.dec()
+            current_request.reset(token)
+            method, route = scope["method"], route_name(scope)
+            requests_total.inc(method, route, str(status))
+            request_seconds.observe(elapsed, method, route)
+            request_queries.observe(stats.queries, method, route)
+            request_db_seconds.observe(stats.db_seconds, method, route)
+            request_render_seconds.observe(stats.render_seconds, method, route)
+            if METRICS_LOG_QUERIES_OVER and stats.queries > METRICS_LOG_QUERIES_OVER:
+                logger.warning("%s %s ran %d queries (%.1f ms in the database)", method, scope["path"], stats.queries, stats.db_seconds * 1000)
+
+
+def render_metrics(extra=()) -> str:
+    # extra: further lines, e.g. from sample_lines()
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    lines.extend(extra)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,148 @@
+import json
+from sqlalchemy import inspect
+from models import User, Question, QuizAttempt, AttemptAnswer, Result, UserStats, QuestionStats, GlobalStats
+from stats import rebuild_stats
+from search import SEARCH_TRIGGERS, create_search_index, rebuild_search_index
+from retention import has_archive
+
+# init_db only runs create_all, which never alters a table that already exists.
+# Each step below upgrades an existing SQLite file by one schema version; the
+# applied version is kept in PRAGMA user_version. Fresh databases are created
+# at the latest schema by create_all and just stamped.
+
+
+def rebuild_table(conn, table):
+    # SQLite cannot add constraints to an existing table: recreate it from the
+    # model and copy the rows over, keeping the columns both versions share
+    name = table.name
+    existing = {c["name"] for c in inspect(conn).get_columns(name)}
+    for index in inspect(conn).get_indexes(name):
+        conn.exec_driver_sql(f'DROP INDEX "{index["name"]}"')
+    conn.exec_driver_sql(f'ALTER TABLE "{name}" RENAME TO "_old_{name}"')
+    table.create(conn)
+    columns = ", ".join(f'"{c.name}"' for c in table.columns if c.name in existing)
+    conn.exec_driver_sql(f'INSERT INTO "{name}" ({columns}) SELECT {columns} FROM "_old_{name}"')
+    conn.exec_driver_sql(f'DROP TABLE "_old_{name}"')
+
+
+def add_indexes_and_foreign_keys(conn):
+    tables = set(inspect(conn).get_table_names())
+    if "user" in tables:
+        duplicates = conn.exec_driver_sql('SELECT email FROM "user" GROUP BY email HAVING count(*) > 1').scalars().all()
+        if duplicates:
+            raise RuntimeError(f"Cannot make user.email unique, duplicated emails: {', '.join(duplicates)}")
+    for model in (User, QuizAttempt, AttemptAnswer, Result):
+        if model.__tablename__ in tables:
+            rebuild_table(conn, model.__table__)
+    if "attemptanswer" in tables and "question" in tables:
+        # Answers to deleted questions become NULL, as ON DELETE SET NULL now does
+        conn.exec_driver_sql("UPDATE attemptanswer SET question_id = NULL WHERE question_id NOT IN (SELECT id FROM question)")
+
+
+def canonicalize_question_options(conn):
+    # Responses splice the stored options text into JSON as-is, so every row must
+    # hold a JSON array of strings in the form json.dumps writes it
+    if "question" not in inspect(conn).get_table_names():
+        return
+    invalid = []
+    for id, options in conn.exec_driver_sql("SELECT id, options FROM question").all():
+        try:
+            parsed = json.loads(options)
+        except (TypeError, ValueError):
+            parsed = None
+        if not isinstance(parsed, list) or not all(isinstance(o, str) for o in parsed):
+            invalid.append(id)
+            continue
+        canonical = json.dumps(parsed)
+        if canonical != options:
+            conn.exec_driver_sql("UPDATE question SET options = ? WHERE id = ?", (canonical, id))
+    if invalid:
+        raise RuntimeError(f"Questions with options that are not a JSON array of strings: {invalid[:20]}")
+
+
+def backfill_stats(conn):
+    for model in (UserStats, QuestionStats, GlobalStats):
+        model.__table__.create(conn, checkfirst=True)
+    if "quizattempt" in inspect(conn).get_table_names():
+        rebuild_stats(conn)
+
+
+def add_search_index(conn):
+    if "question" not in inspect(conn).get_table_names():
+        return
+    create_search_index(conn)
+    rebuild_search_index(conn)
+
+
+def index_option_words(conn):
+    # Version 4's triggers indexed options as stored, where non-ASCII letters are \u escapes
+    if "question" not in inspect(conn).get_table_names():
+        return
+    for trigger in SEARCH_TRIGGERS:
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+    create_search_index(conn)
+    rebuild_search_index(conn)
+
+
+def never_reuse_question_ids(conn):
+    # Archived answers keep a bare question id; without AUTOINCREMENT SQLite hands a deleted
+    # highest id to the next question, and the archive would then point at it
+    if "question" not in inspect(conn).get_table_names():
+        return
+    rebuild_table(conn, Question.__table__)
+    # The search triggers went with the old table
+    create_search_index(conn)
+    # Start past every id an answer still refers to, including questions already deleted
+    highest = [
+        conn.exec_driver_sql("SELECT coalesce(max(id), 0) FROM question").scalar(),
+        conn.exec_driver_sql("SELECT coalesce(max(question_id), 0) FROM attemptanswer").scalar()
+        if "attemptanswer" in inspect(conn).get_table_names() else 0,
+    ]
+    if has_archive(conn):
+        highest.append(conn.exec_driver_sql(
+            "SELECT coalesce(max(json_extract(answer.value, '$[0]')), 0) "
+            "FROM archive.archivedattempt AS a, json_each(a.answers) AS answer"
+        ).scalar())
+    conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'question'")
+    conn.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES ('question', ?)", (max(highest),))
+
+
+MIGRATIONS = [
+    add_indexes_and_foreign_keys,
+    canonicalize_question_options,
+    backfill_stats,
+    add_search_index,
+    index_option_words,
+    never_reuse_question_ids,
+]
+
+
+def migrate(engine):
+    if engine.dialect.name != "sqlite":
+        return
+    # AUTOCOMMIT hands transaction control to the explicit BEGIN below, so the
+    # DDL runs inside it (pysqlite would otherwise commit around each statement)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+        if version >= len(MIGRATIONS):
+            return
+        fresh = not inspect(conn).get_table_names()
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        conn.exec_driver_sql("PRAGMA legacy_alter_table=ON")
+        try:
+            conn.exec_driver_sql("BEGIN")
+            try:
+                if not fresh:
+                    for step in MIGRATIONS[version:]:
+                        step(conn)
+                    violations = conn.exec_driver_sql("PRAGMA foreign_key_check").all()
+                    if violations:
+                        raise RuntimeError(f"Foreign key violations after migration: {violations[:10]}")
+                conn.exec_driver_sql(f"PRAGMA user_version = {len(MIGRATIONS)}")
+                conn.exec_driver_sql("COMMIT")
+            except BaseException:
+                conn.exec_driver_sql("ROLLBACK")
+                raise
+        finally:
+            conn.exec_driver_sql("PRAGMA legacy_alter_table=OFF")
+            conn.exec_driver_sql("PRAGMA foreign_keys=ON")
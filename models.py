@@ -1,39 +1,94 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import ForeignKey, Index
 from typing import Optional, List
 from pydantic import BaseModel
 from datetime import datetime
 
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    email: str
+    email: str = Field(index=True, unique=True)
     hashed_password: str
     is_admin: bool = False
 
 class Question(SQLModel, table=True):
+    # AUTOINCREMENT: a deleted question's id is never handed out again, since archived
+    # answers still refer to it
+    __table_args__ = {"sqlite_autoincrement": True}
     id: Optional[int] = Field(default=None, primary_key=True)
     text: str
     options: str
     correct_answer: str
 
 class QuizAttempt(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_quizattempt_user_id_attempted_at", "user_id", "attempted_at"),
+        Index("ix_quizattempt_attempted_at", "attempted_at"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: int
+    user_id: int = Field(foreign_key="user.id")
     score: int
     total_questions: int
     attempted_at: datetime = Field(default_factory=datetime.utcnow)
 
 class AttemptAnswer(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_attemptanswer_attempt_id_question_id", "attempt_id", "question_id"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
-    attempt_id: int
-    question_id: int
+    attempt_id: int = Field(sa_column_args=[ForeignKey("quizattempt.id", ondelete="CASCADE")])
+    # Kept (as NULL) when the question is deleted, so past attempts still list the answer
+    question_id: Optional[int] = Field(default=None, index=True, sa_column_args=[ForeignKey("question.id", ondelete="SET NULL")])
     selected_option: str
     is_correct: bool
     attempted_at: datetime = Field(default_factory=datetime.utcnow)
+
 class Result(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: int
+    user_id: int = Field(foreign_key="user.id", index=True)
     score: int
 
+# Aggregates kept up to date by submit_quiz (see stats.py); rebuilt with `python manage.py rebuild-stats`
+class UserStats(SQLModel, table=True):
+    user_id: int = Field(primary_key=True, foreign_key="user.id")
+    attempts: int = 0
+    total_score: int = 0
+    best_score: int = 0
+    total_questions: int = 0
+
+class QuestionStats(SQLModel, table=True):
+    question_id: int = Field(primary_key=True, sa_column_args=[ForeignKey("question.id", ondelete="CASCADE")])
+    answered: int = 0
+    correct: int = 0
+
+class GlobalStats(SQLModel, table=True):
+    id: int = Field(default=1, primary_key=True)
+    attempts: int = 0
+    total_score: int = 0
+    best_score: int = 0
+    total_questions: int = 0
+
+# Quizzes handed out by GET /quiz, for QUIZ_SESSION_STORE=sqlite (see quiz_sessions.py)
+class QuizSession(SQLModel, table=True):
+    id: str = Field(primary_key=True)
+    user_id: int = Field(foreign_key="user.id")
+    # JSON [[question_id, correct_answer], ...] in the order the questions were issued
+    answer_key: str
+    expires_at: float = Field(index=True)
+
+# Last spooled submission each write-behind slot has committed (see write_behind.py)
+class WriteBehindCheckpoint(SQLModel, table=True):
+    slot: int = Field(primary_key=True)
+    seq: int = 0
+
+# Users whose tokens issued up to revoked_at are refused (see auth.revoke_tokens)
+class TokenRevocation(SQLModel, table=True):
+    user_id: int = Field(primary_key=True)
+    revoked_at: float = Field(index=True)
+
+class CacheVersion(SQLModel, table=True):
+    name: str = Field(primary_key=True)
+    version: int = 0
+
 class UserRegister(BaseModel):
     email: str
     password: str
@@ -48,4 +103,23 @@ class QuestionCreate(BaseModel):
     correct_answer: str
 
 class QuizSubmission(BaseModel):
-    answers: dict
\ No newline at end of file
+    answers: dict
+    session_id: Optional[str] = None
+
+class QuestionOut(BaseModel):
+    id: int
+    text: str
+    options: List[str]
+    correct_answer: str
+
+class AttemptSummary(BaseModel):
+    attempt_id: int
+    score: int
+    total_questions: int
+    attempted_at: datetime
+
+class AdminAttemptSummary(BaseModel):
+    user_email: str
+    attempt_id: int
+    score: int
+    attempted_at: datetime
\ No newline at end of file
@@ -0,0 +1,50 @@
+import os
+import orjson
+import base64
+from datetime import datetime
+from typing import Callable, Optional
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from metrics import TimedORJSONResponse
+from sqlalchemy import tuple_
+from database import stream_partitions
+
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+
+def encode_cursor(attempted_at: datetime, id: int) -> str:
+    return base64.urlsafe_b64encode(f"{attempted_at.isoformat()}|{id}".encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        attempted_at, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(attempted_at), int(id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# Keyset pagination over (attempted_at, id): each page resumes strictly after the
+# last row of the previous one, so deep pages cost the same as the first.
+def keyset(statement, attempted_at_col, id_col, cursor: Optional[str]):
+    statement = statement.order_by(attempted_at_col, id_col)
+    if cursor:
+        statement = statement.where(tuple_(attempted_at_col, id_col) > tuple_(*decode_cursor(cursor)))
+    return statement
+
+
+def paginate(rows, limit: Optional[int], to_dict: Callable) -> TimedORJSONResponse:
+    # Returned as a response so FastAPI neither validates against the response_model nor runs jsonable_encoder
+    headers = {}
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last.attempted_at, last.id)
+    return TimedORJSONResponse([to_dict(row) for row in rows], headers=headers)
+
+
+def ndjson_response(session, statement, to_dict: Callable):
+    async def body():
+        async for rows in stream_partitions(session, statement):
+            yield b"".join(orjson.dumps(to_dict(row)) + b"\n" for row in rows)
+    return StreamingResponse(body(), media_type="application/x-ndjson")
@@ -0,0 +1,37 @@
+import os
+import json
+from typing import Dict, Iterable
+from sqlmodel import Session, select
+from cache import VersionedCache
+from models import Question
+
+QUESTION_CACHE_SIZE = int(os.getenv("QUESTION_CACHE_SIZE", "10000"))
+
+question_cache = VersionedCache("questions", QUESTION_CACHE_SIZE)
+
+
+def question_payload(q: Question) -> dict:
+    return {"id": q.id, "text": q.text, "options": json.loads(q.options), "correct_answer": q.correct_answer}
+
+
+def question_json(id: int, text: str, options: str, correct_answer: str) -> str:
+    # options is stored as a JSON array already (see migrations), so it is spliced in without a parse
+    return f'{{"id": {id}, "text": {json.dumps(text)}, "options": {options}, "correct_answer": {json.dumps(correct_answer)}}}'
+
+
+def load_questions(session: Session, question_ids: Iterable[int]) -> Dict[int, dict]:
+    question_cache.sync(session)
+    found = {}
+    missing = []
+    for qid in question_ids:
+        payload = question_cache.get(qid)
+        if payload is None:
+            missing.append(qid)
+        else:
+            found[qid] = payload
+    if missing:
+        for q in session.exec(select(Question).where(Question.id.in_(missing))).all():
+            payload = question_payload(q)
+            question_cache.put(q.id, payload)
+            found[q.id] = payload
+    return found
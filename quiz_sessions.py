@@ -0,0 +1,90 @@
+import os
+import json
+import time
+import secrets
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import delete, insert
+from sqlmodel import Session
+from cache import TTLCache
+from models import QuizSession
+
+QUIZ_SESSION_TTL = int(os.getenv("QUIZ_SESSION_TTL", "3600"))
+QUIZ_SESSION_MAX = int(os.getenv("QUIZ_SESSION_MAX", "100000"))
+# "memory" keeps sessions in this process; "sqlite" stores them in the quizsession
+# table so a quiz issued by one worker can be submitted to another
+QUIZ_SESSION_STORE = os.getenv("QUIZ_SESSION_STORE", "memory")
+# When on, POST /quiz/result refuses submissions without a session_id, so only
+# questions that were actually issued can ever be graded
+QUIZ_SESSION_REQUIRED = os.getenv("QUIZ_SESSION_REQUIRED", "false").lower() in ("1", "true", "yes")
+
+
+# What GET /quiz handed out: question ids and their answers, as parallel tuples
+class IssuedQuiz(NamedTuple):
+    user_id: int
+    question_ids: Tuple[int, ...]
+    answers: Tuple[str, ...]
+
+    def answer_key(self) -> Dict[int, str]:
+        return dict(zip(self.question_ids, self.answers))
+
+
+quiz_sessions = TTLCache("quiz_sessions", QUIZ_SESSION_MAX)
+
+
+def store_session(session: Session, session_id: str, quiz: IssuedQuiz, expires_at: float):
+    # Expired rows are dropped as new ones arrive (an index range on expires_at)
+    session.execute(delete(QuizSession).where(QuizSession.expires_at <= time.time()))
+    session.execute(insert(QuizSession).values(
+        id=session_id, user_id=quiz.user_id, expires_at=expires_at,
+        answer_key=json.dumps(list(zip(quiz.question_ids, quiz.answers))),
+    ))
+
+
+def take_session(session: Session, session_id: str) -> Optional[IssuedQuiz]:
+    # Deleted in the submission's transaction: a second submit of the same quiz
+    # finds nothing, and a failed one leaves the session in place
+    row = session.execute(
+        delete(QuizSession)
+        .where(QuizSession.id == session_id, QuizSession.expires_at > time.time())
+        .returning(QuizSession.user_id, QuizSession.answer_key)
+    ).first()
+    if row is None:
+        return None
+    key = json.loads(row.answer_key)
+    return IssuedQuiz(row.user_id, tuple(qid for qid, _ in key), tuple(ans for _, ans in key))
+
+
+async def issue_quiz(session, user_id: int, questions: List[dict]) -> str:
+    session_id = secrets.token_urlsafe(16)
+    quiz = IssuedQuiz(user_id, tuple(q["id"] for q in questions), tuple(q["correct_answer"] for q in questions))
+    expires_at = time.time() + QUIZ_SESSION_TTL
+    if QUIZ_SESSION_STORE == "sqlite":
+        await session.run_sync(store_session, session_id, quiz, expires_at)
+        await session.commit()
+    else:
+        quiz_sessions.put(session_id, quiz, expires_at)
+    return session_id
+
+
+def check_answers(quiz: Optional[IssuedQuiz], user_id: int, question_ids: Iterable[int]) -> IssuedQuiz:
+    if quiz is None or quiz.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Quiz session not found or expired")
+    unknown = set(question_ids).difference(quiz.question_ids)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Questions not in this quiz: {sorted(unknown)}")
+    return quiz
+
+
+async def claim_quiz(session, session_id: str, user_id: int, question_ids: Iterable[int]) -> IssuedQuiz:
+    # Single use, and checked before it is used up: a submission naming questions
+    # that were not issued is refused and the quiz can still be submitted
+    if QUIZ_SESSION_STORE == "sqlite":
+        # A refusal rolls the delete back with the rest of the request
+        return check_answers(await session.run_sync(take_session, session_id), user_id, question_ids)
+    check_answers(quiz_sessions.get(session_id), user_id, question_ids)
+    quiz = quiz_sessions.pop(session_id)
+    if quiz is None:
+        # Submitted concurrently and the other request got it
+        raise HTTPException(status_code=404, detail="Quiz session not found or expired")
+    return quiz
@@ -0,0 +1,83 @@
+import os
+import hashlib
+from typing import Awaitable, Callable, Dict, Tuple
+from fastapi import Request, Response
+from sqlmodel import Session
+from cache import LRUCache, VersionWatch, bump_version
+from etags import etag_matches
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+# Larger bodies (e.g. GET /questions over a big bank) are rendered each time, but still get 304s
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(1 << 20)))
+# How long this worker trusts its copy of a table's version before re-reading the row.
+# Inside that window a conditional request is answered without touching the database; a
+# write in another worker shows up after at most this long, one in this worker at once.
+TABLE_VERSION_POLL_SECONDS = float(os.getenv("TABLE_VERSION_POLL_SECONDS", "1"))
+
+# Rendered bodies keyed by (representation, table version); an old version's entries are
+# never asked for again and age out of the LRU
+response_cache = LRUCache("responses", RESPONSE_CACHE_SIZE)
+
+
+# One cacheversion row per table ("table:question"), bumped in the transaction of every
+# write to the table. ETags are built from it, so a conditional request is checked
+# against the version alone, without loading or rendering anything.
+class TableVersion:
+    def __init__(self, table: str):
+        self._watch = VersionWatch(f"table:{table}", TABLE_VERSION_POLL_SECONDS)
+
+    def sync(self, session: Session) -> int:
+        self._watch.poll(session)
+        return self._watch.version
+
+    async def current(self, session) -> int:
+        # No thread hop (or read) while the last poll is recent enough
+        if self._watch.due():
+            await session.run_sync(self._watch.poll)
+        return self._watch.version
+
+    def bump(self, session: Session) -> int:
+        # In the writer's transaction; pass the result to applied() after commit
+        return bump_version(session, self._watch.name)
+
+    def applied(self, version: int):
+        self._watch.advance(version)
+
+
+question_versions = TableVersion("question")
+attempt_versions = TableVersion("quizattempt")
+
+
+def query_key(request: Request) -> str:
+    # Short and quote-free, to go inside an ETag
+    return hashlib.blake2b(request.url.query.encode(), digest_size=8).hexdigest()
+
+
+async def cached_response(
+    request: Request,
+    session,
+    table: TableVersion,
+    key: str,
+    render: Callable[[], Awaitable[Tuple[bytes, Dict[str, str]]]],
+) -> Response:
+    # key names the representation (path, caller and query where they matter); render
+    # returns the body and any headers that go with it, such as X-Next-Cursor
+    version = await table.current(session)
+    etag = f'"{key}-{version}"'
+    # private: most of these are per-user or admin-only; no-cache: clients revalidate every time
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    # "*" only matches a representation that exists (RFC 9110 13.1.2), so it is answered after
+    # render() has had the chance to raise (e.g. a 404); a cached body is known to exist
+    wildcard = if_none_match is not None and if_none_match.strip() == "*"
+    if not wildcard and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    cached = response_cache.get((key, version))
+    if cached is None:
+        cached = await render()
+        if len(cached[0]) <= RESPONSE_CACHE_MAX_BYTES:
+            response_cache.put((key, version), cached)
+    if wildcard:
+        return Response(status_code=304, headers=headers)
+    body, extra = cached
+    return Response(body, media_type="application/json", headers={**extra, **headers})
@@ -0,0 +1,221 @@
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+import orjson
+from sqlalchemy import bindparam, text
+from response_cache import attempt_versions
+
+# Attempts older than RETENTION_DAYS move to the archive database (see ARCHIVE_DATABASE in
+# database.py) when `python manage.py archive` runs; each user's RETENTION_KEEP_LAST most
+# recent attempts stay live whatever their age.
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "365"))
+RETENTION_KEEP_LAST = int(os.getenv("RETENTION_KEEP_LAST", "0"))
+RETENTION_BATCH = int(os.getenv("RETENTION_BATCH", "2000"))
+# "table": every submission also inserts a legacy Result row. "view": it stops, and result
+# becomes a read-only view (rows written so far, then one per new attempt) for old readers.
+LEGACY_RESULTS = os.getenv("LEGACY_RESULTS", "table")
+
+# One row per attempt; its answers are a JSON array of [question_id, selected_option, is_correct],
+# in the order the live detail query returns them (ix_attemptanswer_attempt_id_question_id).
+# No per-answer rows or indexes: the archive is only read by id.
+ARCHIVE_DDL = """
+CREATE TABLE IF NOT EXISTS archive.archivedattempt (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    total_questions INTEGER NOT NULL,
+    attempted_at TEXT NOT NULL,
+    answers TEXT NOT NULL
+)
+"""
+
+# Keyset over ix_quizattempt_attempted_at. The highest id is never taken: SQLite would hand
+# it out again, to an attempt that already has an archived namesake.
+ARCHIVE_CANDIDATES = """
+SELECT id, user_id, score, total_questions, attempted_at FROM quizattempt
+WHERE attempted_at < :before AND (attempted_at, id) > (:after_at, :after_id)
+    AND id < (SELECT max(id) FROM quizattempt) {keep_last}
+ORDER BY attempted_at, id
+LIMIT :limit
+"""
+KEEP_LAST = """
+    AND attempted_at < (
+        SELECT newer.attempted_at FROM quizattempt AS newer WHERE newer.user_id = quizattempt.user_id
+        ORDER BY newer.attempted_at DESC LIMIT 1 OFFSET :keep_last - 1
+    )
+"""
+ARCHIVE_ANSWERS = text(
+    "SELECT attempt_id, question_id, selected_option, is_correct FROM attemptanswer "
+    "WHERE attempt_id IN :ids ORDER BY attempt_id, question_id"
+).bindparams(bindparam("ids", expanding=True))
+INSERT_ARCHIVED = text(
+    "INSERT OR IGNORE INTO archive.archivedattempt (id, user_id, score, total_questions, attempted_at, answers) "
+    "VALUES (:id, :user_id, :score, :total_questions, :attempted_at, :answers)"
+)
+DELETE_ANSWERS = text("DELETE FROM attemptanswer WHERE attempt_id IN :ids").bindparams(bindparam("ids", expanding=True))
+DELETE_ATTEMPTS = text("DELETE FROM quizattempt WHERE id IN :ids").bindparams(bindparam("ids", expanding=True))
+
+# Folded into the aggregates by rebuild_stats. An attempt left in both places by an
+# interrupted archive run is counted once, from the live tables.
+ARCHIVED_USER_STATS = """
+INSERT INTO userstats (user_id, attempts, total_score, best_score, total_questions)
+SELECT user_id, count(*), sum(score), max(score), sum(total_questions)
+FROM archive.archivedattempt AS a
+WHERE user_id IN (SELECT id FROM "user") AND NOT EXISTS (SELECT 1 FROM quizattempt WHERE quizattempt.id = a.id)
+GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE SET
+    attempts = userstats.attempts + excluded.attempts,
+    total_score = userstats.total_score + excluded.total_score,
+    best_score = max(userstats.best_score, excluded.best_score),
+    total_questions = userstats.total_questions + excluded.total_questions
+"""
+ARCHIVED_GLOBAL_STATS = """
+UPDATE globalstats SET
+    attempts = globalstats.attempts + archived.attempts,
+    total_score = globalstats.total_score + archived.total_score,
+    best_score = max(globalstats.best_score, archived.best_score),
+    total_questions = globalstats.total_questions + archived.total_questions
+FROM (
+    SELECT count(*) AS attempts, coalesce(sum(score), 0) AS total_score, coalesce(max(score), 0) AS best_score,
+        coalesce(sum(total_questions), 0) AS total_questions
+    FROM archive.archivedattempt AS a WHERE NOT EXISTS (SELECT 1 FROM quizattempt WHERE quizattempt.id = a.id)
+) AS archived
+WHERE globalstats.id = 1
+"""
+ARCHIVED_QUESTION_STATS = """
+INSERT INTO questionstats (question_id, answered, correct)
+SELECT json_extract(answer.value, '$[0]') AS question_id, count(*), sum(json_extract(answer.value, '$[2]'))
+FROM archive.archivedattempt AS a, json_each(a.answers) AS answer
+WHERE NOT EXISTS (SELECT 1 FROM quizattempt WHERE quizattempt.id = a.id)
+    AND json_extract(answer.value, '$[0]') IN (SELECT id FROM question)
+GROUP BY 1
+ON CONFLICT (question_id) DO UPDATE SET
+    answered = questionstats.answered + excluded.answered,
+    correct = questionstats.correct + excluded.correct
+"""
+
+
+def archive_attached(conn) -> bool:
+    # Works on a Session or a Connection
+    bind = conn.get_bind() if hasattr(conn, "get_bind") else conn
+    if bind.dialect.name != "sqlite":
+        return False
+    return conn.execute(text("SELECT 1 FROM pragma_database_list WHERE name = 'archive'")).first() is not None
+
+
+def has_archive(conn) -> bool:
+    return archive_attached(conn) and conn.execute(text(
+        "SELECT 1 FROM pragma_table_list WHERE schema = 'archive' AND name = 'archivedattempt'"
+    )).first() is not None
+
+
+def create_archive_schema(conn):
+    if archive_attached(conn):
+        conn.exec_driver_sql(ARCHIVE_DDL)
+
+
+def fold_archived_stats(conn):
+    if not has_archive(conn):
+        return
+    for statement in (ARCHIVED_USER_STATS, ARCHIVED_GLOBAL_STATS, ARCHIVED_QUESTION_STATS):
+        conn.execute(text(statement))
+
+
+def load_archived_attempt(session, attempt_id: int) -> Optional[dict]:
+    # Same shape as a live attempt's details; answers still show the question's current
+    # text, and answers to questions deleted since are left out, as for live attempts.
+    # init_db creates the table wherever the archive is attached.
+    if not archive_attached(session):
+        return None
+    row = session.execute(text(
+        "SELECT user_id, score, total_questions, attempted_at, answers FROM archive.archivedattempt WHERE id = :id"
+    ), {"id": attempt_id}).first()
+    if row is None:
+        return None
+    answers = orjson.loads(row.answers)
+    question_ids = {qid for qid, _, _ in answers if qid is not None}
+    questions = {}
+    if question_ids:
+        questions = {q.id: q for q in session.execute(
+            text("SELECT id, text, correct_answer FROM question WHERE id IN :ids").bindparams(bindparam("ids", expanding=True)),
+            {"ids": list(question_ids)},
+        )}
+    return {
+        "user_id": row.user_id,
+        "score": row.score,
+        "total_questions": row.total_questions,
+        "attempted_at": datetime.fromisoformat(row.attempted_at),
+        "answers": [
+            {
+                "question_id": qid,
+                "question_text": questions[qid].text,
+                "selected_option": selected,
+                "is_correct": bool(is_correct),
+                "correct_option": questions[qid].correct_answer
+            }
+            for qid, selected, is_correct in answers if qid in questions
+        ],
+    }
+
+
+def archive_attempts(engine, days: int = RETENTION_DAYS, keep_last: int = RETENTION_KEEP_LAST,
+                     batch: int = RETENTION_BATCH, now: Optional[datetime] = None) -> int:
+    # Each batch is copied to the archive and committed, then deleted from the live tables in
+    # a second transaction: a crash in between leaves the attempts in both places (reads
+    # prefer the live copy), and the next run finishes the move. Aggregates are untouched,
+    # so totals and the leaderboard still count archived attempts. Returns the number moved.
+    before = ((now or datetime.utcnow()) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S.%f")
+    candidates = text(ARCHIVE_CANDIDATES.format(keep_last=KEEP_LAST if keep_last > 0 else ""))
+    params = {"before": before, "after_at": "", "after_id": 0, "limit": batch, "keep_last": keep_last}
+    moved = 0
+    with engine.connect() as conn:
+        if not has_archive(conn):
+            raise RuntimeError("No archive database attached (set ARCHIVE_DATABASE)")
+        while True:
+            attempts = conn.execute(candidates, params).all()
+            if not attempts:
+                break
+            ids = [a.id for a in attempts]
+            answers = {}
+            for answer in conn.execute(ARCHIVE_ANSWERS, {"ids": ids}):
+                answers.setdefault(answer.attempt_id, []).append((answer.question_id, answer.selected_option, int(answer.is_correct)))
+            conn.execute(INSERT_ARCHIVED, [
+                {"id": a.id, "user_id": a.user_id, "score": a.score, "total_questions": a.total_questions,
+                 "attempted_at": a.attempted_at, "answers": orjson.dumps(answers.get(a.id, [])).decode()}
+                for a in attempts
+            ])
+            conn.commit()
+            conn.execute(DELETE_ANSWERS, {"ids": ids})
+            conn.execute(DELETE_ATTEMPTS, {"ids": ids})
+            # History lists change; the workers see it within TABLE_VERSION_POLL_SECONDS
+            version = attempt_versions.bump(conn)
+            conn.commit()
+            attempt_versions.applied(version)
+            moved += len(ids)
+            params["after_at"], params["after_id"] = attempts[-1].attempted_at, attempts[-1].id
+    return moved
+
+
+def apply_result_mode(conn, mode: str = LEGACY_RESULTS):
+    # SQLite only, like the rest of the schema upkeep. Switching back to "table" copies the
+    # view's newer rows into the kept table, so nothing written in between is lost.
+    if conn.dialect.name != "sqlite":
+        return
+    kind = conn.exec_driver_sql("SELECT type FROM sqlite_master WHERE name = 'result'").scalar()
+    if mode == "view" and kind == "table":
+        last_result = conn.exec_driver_sql("SELECT coalesce(max(id), 0) FROM result").scalar()
+        last_attempt = conn.exec_driver_sql("SELECT coalesce(max(id), 0) FROM quizattempt").scalar()
+        conn.exec_driver_sql("ALTER TABLE result RENAME TO result_legacy")
+        # Ids after the kept rows' stay unique and increasing; archived attempts drop out of the view
+        conn.exec_driver_sql(
+            "CREATE VIEW result (id, user_id, score) AS "
+            "SELECT id, user_id, score FROM result_legacy UNION ALL "
+            f"SELECT {last_result} + id, user_id, score FROM quizattempt WHERE id > {last_attempt}"
+        )
+    elif mode == "table" and kind == "view":
+        conn.exec_driver_sql(
+            "INSERT INTO result_legacy (id, user_id, score) SELECT id, user_id, score FROM result "
+            "WHERE id > (SELECT coalesce(max(id), 0) FROM result_legacy)"
+        )
+        conn.exec_driver_sql("DROP VIEW result")
+        conn.exec_driver_sql("ALTER TABLE result_legacy RENAME TO result")
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, HTTPException
+from auth import get_current_user
+from cache import caches
+from hashing import password_hasher
+from write_behind import write_behind
+
+router = APIRouter()
+
+@router.get("/admin/cache")
+async def cache_stats(user=Depends(get_current_user)):
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admins only")
+    return {name: cache.stats() for name, cache in caches.items()}
+
+@router.get("/admin/hashing")
+async def hashing_stats(user=Depends(get_current_user)):
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admins only")
+    return password_hasher.stats()
+
+@router.get("/admin/write-behind")
+async def write_behind_stats(user=Depends(get_current_user)):
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admins only")
+    return write_behind.stats()
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, Query
+from database import get_session
+from auth import get_current_user
+from leaderboard import leaderboard, BOARDS
+
+router = APIRouter()
+
+BOARD_PATTERN = f"^({'|'.join(BOARDS)})$"
+
+# Served from the in-process ranked boards; the session is only touched to check
+# whether another worker has recorded submissions this one has not seen
+
+@router.get("/leaderboard")
+async def get_leaderboard(
+    by: str = Query("best", pattern=BOARD_PATTERN),
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    session=Depends(get_session),
+    user=Depends(get_current_user),
+):
+    await session.run_sync(leaderboard.sync)
+    total, entries = leaderboard.page(by, offset, limit)
+    return {
+        "by": by,
+        "total_users": total,
+        "entries": [{"rank": rank, "user_id": user_id, "score": score} for rank, user_id, score in entries],
+    }
+
+@router.get("/leaderboard/me")
+async def my_rank(by: str = Query("best", pattern=BOARD_PATTERN), session=Depends(get_session), user=Depends(get_current_user)):
+    await session.run_sync(leaderboard.sync)
+    ranked = leaderboard.rank(by, user.id)
+    rank, score = ranked if ranked else (None, None)
+    return {"by": by, "user_id": user.id, "rank": rank, "score": score, "total_users": len(leaderboard.boards[by])}
@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from cache import caches
+from hashing import password_hasher
+from metrics import render_metrics, sample_lines
+from write_behind import write_behind
+
+router = APIRouter()
+
+# Prometheus text format, unauthenticated for scrapers: keep it off public listeners.
+# Each worker process reports its own numbers.
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    extra = []
+    for field in ("hits", "misses", "evictions"):
+        samples = {(name,): cache.stats()[field] for name, cache in caches.items()}
+        extra += sample_lines(f"cache_{field}_total", "counter", f"In-process cache {field}", ("cache",), samples)
+    extra += sample_lines("cache_entries", "gauge", "Entries held", ("cache",), {(name,): len(cache) for name, cache in caches.items()})
+    hashing = password_hasher.stats()
+    extra += sample_lines("password_hash_pending", "gauge", "Hashes running or queued", (), {(): hashing["pending"]})
+    extra += sample_lines("password_hash_rejected_total", "counter", "Logins/registrations refused with 503", (), {(): hashing["rejected"]})
+    if write_behind.running:
+        queue = write_behind.stats()
+        extra += sample_lines("write_behind_pending", "gauge", "Submissions accepted, not yet committed", (), {(): queue["pending"]})
+        extra += sample_lines("write_behind_written_total", "counter", "Submissions committed by the writer", (), {(): queue["written"]})
+        extra += sample_lines("write_behind_batches_total", "counter", "Group commits", (), {(): queue["batches"]})
+        extra += sample_lines("write_behind_rejected_total", "counter", "Submissions refused with 503", (), {(): queue["rejected"]})
+    return PlainTextResponse(render_metrics(extra), media_type="text/plain; version=0.0.4")
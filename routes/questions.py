@@ -1,14 +1,25 @@
 import json
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from database import get_session
-from models import Question, QuestionCreate
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlmodel import select
+from database import get_session, stream_partitions
+from models import Question, QuestionCreate, QuestionOut
 from auth import get_current_user
+from sampling import question_sampler
+from question_cache import question_cache, load_questions, question_json
+from search import search_questions, encode_cursor
+from response_cache import question_versions, cached_response
+from metrics import TimedORJSONResponse
+from pagination import MAX_PAGE_SIZE
+from bulk import IMPORT_BATCH_SIZE, IMPORT_MAX_ERRORS, CSV_COLUMNS, read_lines, ndjson_records, csv_records, validate, error_message, csv_lines
 
 router = APIRouter()
 
 @router.post("/questions")
-def create_question(question_data: QuestionCreate, session: Session = Depends(get_session), user=Depends(get_current_user)):
+async def create_question(question_data: QuestionCreate, session=Depends(get_session), user=Depends(get_current_user)):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Admins only")
     q = Question(
@@ -18,51 +29,154 @@ def create_question(question_data: QuestionCreate, session: Session = Depends(ge
     )
 
     session.add(q)
-    session.commit()
-    session.refresh(q)
-    return {"id": q.id, "text": q.text, "options": json.loads(q.options), "correct_answer": q.correct_answer}
+    version = await session.run_sync(question_sampler.changed)
+    table_version = await session.run_sync(question_versions.bump)
+    await session.commit()
+    await session.refresh(q)
+    question_sampler.add(q.id)
+    question_sampler.applied(version)
+    question_versions.applied(table_version)
+    return {"id": q.id, "text": q.text, "options": question_data.options, "correct_answer": q.correct_answer}
 
-@router.get("/questions")
-def list_questions(session: Session = Depends(get_session), user=Depends(get_current_user)):
+@router.get("/questions", response_model=List[QuestionOut])
+async def list_questions(request: Request, session=Depends(get_session), user=Depends(get_current_user)):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Admins only")
-    questions = session.exec(select(Question)).all()
-    return [{"id": q.id, "text": q.text, "options": json.loads(q.options), "correct_answer": q.correct_answer} for q in questions]
 
+    async def render():
+        rows = (await session.exec(select(Question.id, Question.text, Question.options, Question.correct_answer))).all()
+        return ("[" + ", ".join(question_json(*row) for row in rows) + "]").encode(), {}
+    return await cached_response(request, session, question_versions, "questions", render)
+
+
+@router.post("/questions/import")
+async def import_questions(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=50_000),
+    session=Depends(get_session),
+    user=Depends(get_current_user),
+):
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admins only")
+    if format is None:
+        format = "csv" if request.headers.get("content-type", "").startswith("text/csv") else "ndjson"
+    records = (csv_records if format == "csv" else ndjson_records)(read_lines(request.stream()))
+
+    # Rows are parsed as the body arrives and written one batch per transaction, so
+    # a failure part-way keeps the batches already committed; "inserted" says how many
+    inserted = failed = 0
+    errors = []
+    batch = []
+
+    async def flush():
+        nonlocal inserted
+        await session.execute(insert(Question), batch)
+        await session.run_sync(question_sampler.changed)
+        table_version = await session.run_sync(question_versions.bump)
+        await session.commit()
+        question_versions.applied(table_version)
+        inserted += len(batch)
+        batch.clear()
+
+    async for line_no, record in records:
+        try:
+            q = validate(record)
+        except (ValidationError, ValueError) as e:
+            failed += 1
+            if len(errors) < IMPORT_MAX_ERRORS:
+                errors.append({"line": line_no, "error": error_message(e)})
+            continue
+        batch.append({"text": q.text, "options": json.dumps(q.options), "correct_answer": q.correct_answer})
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+    if inserted:
+        # One id scan instead of an insort per imported row
+        await session.run_sync(question_sampler.reload_if_loaded)
+    return {"inserted": inserted, "failed": failed, "errors": errors}
+
+@router.get("/questions/export")
+async def export_questions(format: str = Query("ndjson", pattern="^(ndjson|csv)$"), session=Depends(get_session), user=Depends(get_current_user)):
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admins only")
+    statement = select(Question.id, Question.text, Question.options, Question.correct_answer).order_by(Question.id)
+
+    async def body():
+        if format == "csv":
+            yield csv_lines([["id", *CSV_COLUMNS]])
+        async for rows in stream_partitions(session, statement):
+            if format == "csv":
+                # options is stored as a JSON array already, which is what the CSV column holds
+                yield csv_lines(rows)
+            else:
+                yield "".join(question_json(*row) + "\n" for row in rows)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type, headers={"Content-Disposition": f"attachment; filename=questions.{format}"})
+
+@router.get("/questions/search", response_model=List[QuestionOut])
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    order: str = Query("rank", pattern="^(rank|id)$"),
+    session=Depends(get_session),
+    user=Depends(get_current_user),
+):
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admins only")
+    rows = await session.run_sync(search_questions, q, limit, cursor, order)
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1].score, rows[-1].id)
+    body = "[" + ", ".join(question_json(row.id, row.text, row.options, row.correct_answer) for row in rows) + "]"
+    return Response(body, media_type="application/json", headers=headers)
 
 @router.get("/questions/{id}")
-def get_question(id: int, session: Session = Depends(get_session), user=Depends(get_current_user)):
+async def get_question(id: int, request: Request, session=Depends(get_session), user=Depends(get_current_user)):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Admins only")
-    q = session.get(Question, id)
-    if not q:
-        raise HTTPException(status_code=404, detail="Question not found")
-    return {"id": q.id, "text": q.text, "options": json.loads(q.options), "correct_answer": q.correct_answer}
+
+    async def render():
+        q = (await session.run_sync(load_questions, [id])).get(id)
+        if not q:
+            raise HTTPException(status_code=404, detail="Question not found")
+        return TimedORJSONResponse(q).body, {}
+    return await cached_response(request, session, question_versions, f"question-{id}", render)
 
 @router.put("/questions/{id}")
-def update_question(id: int, question_data: QuestionCreate, session: Session = Depends(get_session), user=Depends(get_current_user)):
+async def update_question(id: int, question_data: QuestionCreate, session=Depends(get_session), user=Depends(get_current_user)):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Admins only")
-    q = session.get(Question, id)
+    q = await session.get(Question, id)
     if not q:
         raise HTTPException(status_code=404, detail="Question not found")
     q.text = question_data.text
     q.options = json.dumps(question_data.options)
     q.correct_answer = question_data.correct_answer
     session.add(q)
-    session.commit()
-    print(q.options)
-    print("ghjk")
-    session.refresh(q)
-    return {"id": q.id, "text": q.text, "options": json.loads(q.options), "correct_answer": q.correct_answer}
+    await session.run_sync(question_cache.invalidate, id)
+    table_version = await session.run_sync(question_versions.bump)
+    await session.commit()
+    await session.refresh(q)
+    question_versions.applied(table_version)
+    return {"id": q.id, "text": q.text, "options": question_data.options, "correct_answer": q.correct_answer}
 
 @router.delete("/questions/{id}")
-def delete_question(id: int, session: Session = Depends(get_session), user=Depends(get_current_user)):
+async def delete_question(id: int, session=Depends(get_session), user=Depends(get_current_user)):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Admins only")
-    q = session.get(Question, id)
+    q = await session.get(Question, id)
     if not q:
         raise HTTPException(status_code=404, detail="Question not found")
-    session.delete(q)
-    session.commit()
+    await session.delete(q)
+    await session.run_sync(question_cache.invalidate, id)
+    version = await session.run_sync(question_sampler.changed)
+    table_version = await session.run_sync(question_versions.bump)
+    await session.commit()
+    question_sampler.remove(id)
+    question_sampler.applied(version)
+    question_versions.applied(table_version)
     return {"message": f"Question {id} deleted successfully"}
\ No newline at end of file
@@ -1,125 +1,169 @@
-import random
-import json
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import insert
+from sqlmodel import select
 from database import get_session
-from models import Question, Result, QuizSubmission, QuizAttempt, AttemptAnswer, User
+from models import Result, QuizSubmission, QuizAttempt, AttemptAnswer, User, AttemptSummary, AdminAttemptSummary
 from auth import get_current_user
+from grading import parse_answers, load_answer_key, grade, existing_questions
+from sampling import question_sampler, QUIZ_SIZE, MAX_QUIZ_SIZE
+from pagination import MAX_PAGE_SIZE, keyset, paginate, ndjson_response
+from attempt_cache import attempt_cache, load_attempt_details
+from etags import etag_matches
+from response_cache import question_versions, attempt_versions, cached_response, query_key
+from stats import record_attempt
+from leaderboard import leaderboard
+from quiz_sessions import QUIZ_SESSION_REQUIRED, issue_quiz, claim_quiz
+from write_behind import write_behind
+from retention import LEGACY_RESULTS
 
 router = APIRouter()
 
 @router.get("/quiz")
-def get_quiz(session: Session = Depends(get_session), user=Depends(get_current_user)):
-    questions = session.exec(select(Question)).all()
-    if len(questions) < 2:
+async def get_quiz(response: Response, count: int = Query(QUIZ_SIZE, ge=1, le=MAX_QUIZ_SIZE), session=Depends(get_session), user=Depends(get_current_user)):
+    await session.run_sync(question_sampler.sync)
+    if len(question_sampler) < count:
         raise HTTPException(status_code=400, detail="Not enough questions available")
-    sample = random.sample(questions, min(2, len(questions)))
-    return [{"id": q.id, "text": q.text, "options": json.loads(q.options)} for q in sample]
+    sample = await session.run_sync(question_sampler.draw, count, user.id)
+    # Sent back as session_id so the submission is graded against exactly these questions
+    response.headers["X-Quiz-Session"] = await issue_quiz(session, user.id, sample)
+    return [{"id": q["id"], "text": q["text"], "options": q["options"]} for q in sample]
 
 @router.post("/quiz/result")
-def submit_quiz(submission: QuizSubmission, session: Session = Depends(get_session), user=Depends(get_current_user)):
-    score = 0
-    total_questions = len(submission.answers)
-    correct_answers = {}
-    
-    # Create quiz attempt
-    attempt = QuizAttempt(
-        user_id=user.id,
-        score=0,  # Will update after calculating
-        total_questions=total_questions
-    )
-    session.add(attempt)
-    session.commit()
-    session.refresh(attempt)
-    
-    # Process each answer
-    for qid, ans in submission.answers.items():
-        q = session.get(Question, int(qid))
-        if q:
-            correct_answers[qid] = q.correct_answer
-            is_correct = ans == q.correct_answer
-            if is_correct:
-                score += 1
-            
-            # Save attempt answer
-            attempt_answer = AttemptAnswer(
-                attempt_id=attempt.id,
-                question_id=int(qid),
-                selected_option=ans,
-                is_correct=is_correct
-            )
-            session.add(attempt_answer)
-    
-    # Update attempt with final score
-    attempt.score = score
+async def submit_quiz(submission: QuizSubmission, session=Depends(get_session), user=Depends(get_current_user)):
+    if submission.session_id is None and QUIZ_SESSION_REQUIRED:
+        raise HTTPException(status_code=400, detail="session_id is required: send back the X-Quiz-Session header of GET /quiz")
+    if write_behind.running:
+        # Shed load before a quiz session is used up
+        write_behind.check_capacity()
+    answers = parse_answers(submission.answers)
+    if submission.session_id is not None:
+        quiz = await claim_quiz(session, submission.session_id, user.id, answers)
+        # Drop questions this worker has seen deleted since the quiz was issued; the insert below
+        # (or the write-behind writer) checks for any deleted elsewhere
+        if not question_sampler.loaded:
+            await session.run_sync(question_sampler.ensure_loaded)
+        key = {qid: ans for qid, ans in quiz.answer_key().items() if qid in question_sampler}
+        total_questions = len(quiz.question_ids)
+    else:
+        key = await session.run_sync(load_answer_key, answers)
+        total_questions = len(answers)
+    now = datetime.utcnow()
+
+    # Grade in memory against the answer key (the quiz snapshot, or loaded in one query)
+    score, correct_answers, rows = grade(answers, key, now)
+
+    if write_behind.running:
+        # Acknowledged once spooled; the rows below are written by the group-commit writer
+        await write_behind.submit(user.id, score, total_questions, now, rows)
+        # Leaves only a quiz session claimed from the table to commit
+        await session.commit()
+        return {"score": score, "correct_answers": correct_answers}
+
+    # Attempt, answers, legacy Result (unless LEGACY_RESULTS=view) and the stats aggregates are written in a single transaction
+    attempt = QuizAttempt(user_id=user.id, score=score, total_questions=total_questions, attempted_at=now)
     session.add(attempt)
-    session.commit()
-    
-    # Keep old Result for backward compatibility
-    result = Result(user_id=user.id, score=score)
-    session.add(result)
-    session.commit()
-    
+    await session.flush()
+    # Checked after the flush, which on SQLite holds the write lock until commit. A question
+    # deleted since the key was read (by another worker, or here before the sampler heard of it)
+    # is dropped and the rest regraded, instead of failing the answer's foreign key.
+    existing = await session.run_sync(existing_questions, [row["question_id"] for row in rows])
+    if len(existing) < len(rows):
+        score, correct_answers, rows = grade(answers, {qid: ans for qid, ans in key.items() if qid in existing}, now)
+        attempt.score = score
+    if rows:
+        for row in rows:
+            row["attempt_id"] = attempt.id
+        await session.execute(insert(AttemptAnswer), rows)
+    if LEGACY_RESULTS == "table":
+        session.add(Result(user_id=user.id, score=score))
+    best_score, total_score, total_attempts = await session.run_sync(record_attempt, user.id, score, total_questions, rows)
+    version = await session.run_sync(attempt_versions.bump)
+    await session.commit()
+    attempt_versions.applied(version)
+    leaderboard.record(user.id, best_score, total_score, total_attempts)
+    question_sampler.record(user.id, rows, total_attempts)
+
     return {"score": score, "correct_answers": correct_answers}
 
-@router.get("/quiz/attempts")
-def get_user_attempts(session: Session = Depends(get_session), user=Depends(get_current_user)):
-    attempts = session.exec(select(QuizAttempt).where(QuizAttempt.user_id == user.id)).all()
-    return [
-        {
-            "attempt_id": attempt.id,
-            "score": attempt.score,
-            "total_questions": attempt.total_questions,
-            "attempted_at": attempt.attempted_at.isoformat()
-        }
-        for attempt in attempts
-    ]
-
-@router.get("/quiz/attempts/all")
-def get_all_attempts(session: Session = Depends(get_session), user=Depends(get_current_user)):
+def user_attempt(row):
+    return {
+        "attempt_id": row.id,
+        "score": row.score,
+        "total_questions": row.total_questions,
+        # orjson renders naive datetimes exactly as isoformat() does
+        "attempted_at": row.attempted_at
+    }
+
+def admin_attempt(row):
+    return {
+        "user_email": row.email,
+        "attempt_id": row.id,
+        "score": row.score,
+        "attempted_at": row.attempted_at
+    }
+
+def page(response):
+    # A paginate() response as cached_response's (body, headers)
+    return response.body, {k: v for k, v in response.headers.items() if k == "x-next-cursor"}
+
+@router.get("/quiz/attempts", response_model=List[AttemptSummary])
+async def get_user_attempts(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    session=Depends(get_session),
+    user=Depends(get_current_user),
+):
+    statement = select(QuizAttempt.id, QuizAttempt.score, QuizAttempt.total_questions, QuizAttempt.attempted_at).where(QuizAttempt.user_id == user.id)
+    statement = keyset(statement, QuizAttempt.attempted_at, QuizAttempt.id, cursor)
+    if format == "ndjson":
+        return ndjson_response(session, statement if limit is None else statement.limit(limit), user_attempt)
+    if limit is not None:
+        statement = statement.limit(limit + 1)
+
+    async def render():
+        return page(paginate((await session.exec(statement)).all(), limit, user_attempt))
+    return await cached_response(request, session, attempt_versions, f"attempts-{user.id}-{query_key(request)}", render)
+
+@router.get("/quiz/attempts/all", response_model=List[AdminAttemptSummary])
+async def get_all_attempts(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    session=Depends(get_session),
+    user=Depends(get_current_user),
+):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Admins only")
-    
-    attempts = session.exec(select(QuizAttempt)).all()
-    result = []
-    
-    for attempt in attempts:
-        user_obj = session.get(User, attempt.user_id)
-        if user_obj:
-            result.append({
-                "user_email": user_obj.email,
-                "attempt_id": attempt.id,
-                "score": attempt.score,
-                "attempted_at": attempt.attempted_at.isoformat()
-            })
-    
-    return result
+
+    # User emails come from the join, not a lookup per attempt
+    statement = select(User.email, QuizAttempt.id, QuizAttempt.score, QuizAttempt.attempted_at).join(User, User.id == QuizAttempt.user_id)
+    statement = keyset(statement, QuizAttempt.attempted_at, QuizAttempt.id, cursor)
+    if format == "ndjson":
+        return ndjson_response(session, statement if limit is None else statement.limit(limit), admin_attempt)
+    if limit is not None:
+        statement = statement.limit(limit + 1)
+
+    async def render():
+        return page(paginate((await session.exec(statement)).all(), limit, admin_attempt))
+    return await cached_response(request, session, attempt_versions, f"attempts-all-{query_key(request)}", render)
 
 @router.get("/quiz/attempts/{attempt_id}")
-def get_attempt_details(attempt_id: int, session: Session = Depends(get_session), user=Depends(get_current_user)):
-    attempt = session.get(QuizAttempt, attempt_id)
-    if not attempt or attempt.user_id != user.id:
+async def get_attempt_details(attempt_id: int, request: Request, session=Depends(get_session), user=Depends(get_current_user)):
+    version = await question_versions.current(session)
+    # A cached attempt is checked and revalidated without a thread hop or a query
+    details = attempt_cache.get((attempt_id, version))
+    if details is None:
+        details = await session.run_sync(load_attempt_details, attempt_id, version)
+    if not details or details.user_id != user.id:
         raise HTTPException(status_code=404, detail="Attempt not found")
-    
-    answers = session.exec(select(AttemptAnswer).where(AttemptAnswer.attempt_id == attempt_id)).all()
-    answer_details = []
-    
-    for answer in answers:
-        question = session.get(Question, answer.question_id)
-        if question:
-            answer_details.append({
-                "question_id": answer.question_id,
-                "question_text": question.text,
-                "selected_option": answer.selected_option,
-                "is_correct": answer.is_correct,
-                "correct_option": question.correct_answer
-            })
-    
-    return {
-        "attempt_id": attempt.id,
-        "score": attempt.score,
-        "total_questions": attempt.total_questions,
-        "attempted_at": attempt.attempted_at.isoformat(),
-        "answers": answer_details
-    }
\ No newline at end of file
+
+    # private: the body is per-user; no-cache: clients revalidate, since question edits change it
+    headers = {"ETag": details.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), details.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(details.body, media_type="application/json", headers=headers)
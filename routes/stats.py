@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException
+from database import get_session
+from models import Question, UserStats, QuestionStats, GlobalStats
+from auth import get_current_user
+from stats import totals, question_totals
+
+router = APIRouter()
+
+# Every endpoint reads one precomputed row by primary key
+
+@router.get("/stats/me")
+async def my_stats(session=Depends(get_session), user=Depends(get_current_user)):
+    return {"user_id": user.id, **totals(await session.get(UserStats, user.id))}
+
+@router.get("/stats/users/{user_id}")
+async def user_stats(user_id: int, session=Depends(get_session), user=Depends(get_current_user)):
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admins only")
+    return {"user_id": user_id, **totals(await session.get(UserStats, user_id))}
+
+@router.get("/stats/questions/{question_id}")
+async def question_stats(question_id: int, session=Depends(get_session), user=Depends(get_current_user)):
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admins only")
+    row = await session.get(QuestionStats, question_id)
+    if row is None and await session.get(Question, question_id) is None:
+        raise HTTPException(status_code=404, detail="Question not found")
+    return {"question_id": question_id, **question_totals(row)}
+
+@router.get("/stats/global")
+async def global_stats(session=Depends(get_session), user=Depends(get_current_user)):
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admins only")
+    return totals(await session.get(GlobalStats, 1))
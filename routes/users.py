@@ -1,28 +1,38 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from sqlmodel import select
 from database import get_session
 from models import User, UserRegister, UserLogin
-from auth import hash_password, verify_password, create_access_token
+from auth import access_token_for, invalidate_user
+from hashing import password_hasher
 from fastapi.security import OAuth2PasswordRequestForm
 
 router = APIRouter()
 
 @router.post("/register")
-def register(user_data: UserRegister, session: Session = Depends(get_session)):
-    existing = session.exec(select(User).where(User.email == user_data.email)).first()
+async def register(user_data: UserRegister, session=Depends(get_session)):
+    existing = (await session.exec(select(User).where(User.email == user_data.email))).first()
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     is_admin = user_data.email == "admin@example.com"
-    user = User(email=user_data.email, hashed_password=hash_password(user_data.password), is_admin=is_admin)
+    user = User(email=user_data.email, hashed_password=await password_hasher.hash(user_data.password), is_admin=is_admin)
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
     return {"message": "User registered"}
 
 @router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.email == form_data.username)).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), session=Depends(get_session)):
+    user = (await session.exec(select(User).where(User.email == form_data.username))).first()
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials", headers={"WWW-Authenticate": "Bearer"})
-    token = create_access_token({"sub": user.email})
+    verified, new_hash = await password_hasher.verify(form_data.password, user.hashed_password)
+    if not verified:
+        raise HTTPException(status_code=401, detail="Invalid credentials", headers={"WWW-Authenticate": "Bearer"})
+    if new_hash:
+        # Stored hash used an older BCRYPT_ROUNDS; upgrade it while we have the password
+        user.hashed_password = new_hash
+        session.add(user)
+        await session.run_sync(invalidate_user, user.email)
+        await session.commit()
+    token = access_token_for(user)
     return {"access_token": token, "token_type": "bearer"}
@@ -0,0 +1,330 @@
+import os
+import time
+import random
+import threading
+from array import array
+from bisect import bisect_left, insort
+from typing import Iterable, List, Set
+from sqlmodel import Session, select
+from cache import TTLCache, VersionWatch, bump_version
+from models import Question, QuestionStats, QuizAttempt, AttemptAnswer, GlobalStats
+from question_cache import load_questions
+
+QUIZ_SIZE = int(os.getenv("QUIZ_SIZE", "2"))
+MAX_QUIZ_SIZE = int(os.getenv("MAX_QUIZ_SIZE", "50"))
+# "weighted": harder questions come up more often and a user's correctly answered ones are
+# left out while enough others remain; "uniform": every question equally likely
+QUIZ_SELECTION = os.getenv("QUIZ_SELECTION", "weighted")
+# Keeps questions everyone answers correctly in rotation
+QUIZ_WEIGHT_FLOOR = float(os.getenv("QUIZ_WEIGHT_FLOOR", "0.05"))
+# How often a worker may reload weights when other workers have graded answers it has not seen
+QUIZ_WEIGHTS_RELOAD_SECONDS = float(os.getenv("QUIZ_WEIGHTS_RELOAD_SECONDS", "60"))
+QUIZ_MASTERED_TTL = int(os.getenv("QUIZ_MASTERED_TTL", "300"))
+QUIZ_MASTERED_USERS = int(os.getenv("QUIZ_MASTERED_USERS", "10000"))
+
+# Redraws of already-answered questions before they are taken out of the tree instead; at
+# least as many as there are to take out, since a redraw costs about as much as one removal
+REJECTION_LIMIT = 32
+
+
+def question_weight(answered: int, correct: int) -> float:
+    # Miss rate smoothed towards 1/2, so an unanswered question sits mid-table
+    return max(QUIZ_WEIGHT_FLOOR, (answered - correct + 1) / (answered + 2))
+
+
+# user id -> ids of the questions they have answered correctly
+mastered_questions = TTLCache("mastered_questions", QUIZ_MASTERED_USERS)
+
+
+# Binary indexed tree over float weights: set() and find() walk one path of
+# log2(n) nodes, so a weighted draw never touches the whole bank.
+class FenwickTree:
+    def __init__(self, weights: Iterable[float] = ()):
+        self._weights = array("d", weights)
+        n = len(self._weights)
+        tree = array("d", [0.0]) + self._weights
+        for i in range(1, n + 1):
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def __len__(self):
+        return len(self._weights)
+
+    def weight(self, i: int) -> float:
+        return self._weights[i]
+
+    def prefix(self, i: int) -> float:
+        # Sum of the first i weights
+        total = 0.0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def total(self) -> float:
+        return self.prefix(len(self._weights))
+
+    def set(self, i: int, weight: float):
+        delta = weight - self._weights[i]
+        self._weights[i] = weight
+        n = len(self._weights)
+        i += 1
+        while i <= n:
+            self._tree[i] += delta
+            i += i & -i
+
+    def append(self, weight: float):
+        # Node n covers the last lowbit(n) weights, including the new one
+        self._weights.append(weight)
+        n = len(self._weights)
+        self._tree.append(weight + self.prefix(n - 1) - self.prefix(n - (n & -n)))
+
+    def find(self, target: float) -> int:
+        # Index of the weight whose cumulative range holds target, 0 <= target < total()
+        n = len(self._weights)
+        pos = 0
+        step = 1 << n.bit_length() >> 1
+        while step:
+            nxt = pos + step
+            if nxt <= n and self._tree[nxt] <= target:
+                pos = nxt
+                target -= self._tree[nxt]
+            step >>= 1
+        return min(pos, n - 1)
+
+
+# Sorted array of question ids, loaded once per process and kept in step by
+# the question admin endpoints, so drawing a quiz never scans the table.
+# Endpoints that add or remove questions bump the "question_ids" version, and
+# every worker reloads when it sees a bump made by another.
+#
+# In weighted mode each id also has a weight in a Fenwick tree, from the
+# questionstats answered/correct counts. Graded answers update it in place;
+# answers graded by other workers are picked up by a reload, at most every
+# QUIZ_WEIGHTS_RELOAD_SECONDS, when globalstats.attempts shows any. Deleted
+# questions keep their slot with a zero weight until the next load.
+class QuestionSampler:
+    def __init__(self, weighted: bool = QUIZ_SELECTION == "weighted"):
+        self.weighted = weighted
+        self._ids = array("q")
+        self._answered = array("q")
+        self._correct = array("q")
+        self._tree = FenwickTree()
+        self._removed = set()
+        self._loaded = False
+        self._loaded_attempts = 0
+        self._applied = 0
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._watch = VersionWatch("question_ids")
+
+    def __len__(self):
+        return len(self._ids) - len(self._removed)
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def __contains__(self, question_id: int):
+        i = bisect_left(self._ids, question_id)
+        return i < len(self._ids) and self._ids[i] == question_id and question_id not in self._removed
+
+    def load(self, session: Session):
+        if not self.weighted:
+            ids = array("q", sorted(session.exec(select(Question.id)).all()))
+            with self._lock:
+                self._ids = ids
+                self._loaded = True
+            return
+        attempts = session.exec(select(GlobalStats.attempts).where(GlobalStats.id == 1)).first() or 0
+        rows = session.connection().execute(
+            select(Question.id, QuestionStats.answered, QuestionStats.correct)
+            .outerjoin(QuestionStats, QuestionStats.question_id == Question.id)
+            .order_by(Question.id)
+        ).all()
+        with self._lock:
+            self.replace([r[0] for r in rows], [r[1] or 0 for r in rows], [r[2] or 0 for r in rows])
+            self._loaded_attempts = attempts
+
+    def replace(self, ids: List[int], answered: List[int], correct: List[int]):
+        # Sorted ids with their counts; the caller holds the lock (or owns the sampler)
+        self._ids = array("q", ids)
+        self._answered = array("q", answered)
+        self._correct = array("q", correct)
+        self._tree = FenwickTree(map(question_weight, answered, correct))
+        self._removed = set()
+        self._applied = 0
+        self._loaded = True
+        self._loaded_at = time.monotonic()
+
+    def reload_if_loaded(self, session: Session):
+        # After bulk changes; a sampler nobody has used yet loads lazily anyway
+        if self._loaded:
+            self.sync(session, force=True)
+
+    def ensure_loaded(self, session: Session):
+        if not self._loaded:
+            self.sync(session)
+
+    def sync(self, session: Session, force: bool = False):
+        if self._watch.poll(session, force) or not self._loaded:
+            return self.load(session)
+        if self.weighted and time.monotonic() - self._loaded_at >= QUIZ_WEIGHTS_RELOAD_SECONDS:
+            attempts = session.exec(select(GlobalStats.attempts).where(GlobalStats.id == 1)).first() or 0
+            if attempts != self._loaded_attempts + self._applied:
+                self.load(session)
+            else:
+                self._loaded_at = time.monotonic()
+
+    def changed(self, session: Session) -> int:
+        # In the transaction that adds or removes questions; pass the result to applied() after commit
+        return bump_version(session, self._watch.name)
+
+    def applied(self, version: int):
+        self._watch.applied(version)
+
+    def add(self, question_id: int):
+        with self._lock:
+            if not self._loaded:
+                return
+            i = bisect_left(self._ids, question_id)
+            if i < len(self._ids) and self._ids[i] == question_id:
+                if question_id in self._removed:
+                    # SQLite reuses the highest id once it is deleted
+                    self._removed.discard(question_id)
+                    self._answered[i] = self._correct[i] = 0
+                    self._tree.set(i, question_weight(0, 0))
+                return
+            if not self.weighted:
+                insort(self._ids, question_id)
+            elif i == len(self._ids):
+                self._ids.append(question_id)
+                self._answered.append(0)
+                self._correct.append(0)
+                self._tree.append(question_weight(0, 0))
+            else:
+                # Below the highest id (rare): positions shift, so the tree is rebuilt
+                self._ids.insert(i, question_id)
+                self._answered.insert(i, 0)
+                self._correct.insert(i, 0)
+                self._tree = FenwickTree(
+                    0.0 if qid in self._removed else question_weight(a, c)
+                    for qid, a, c in zip(self._ids, self._answered, self._correct)
+                )
+
+    def remove(self, question_id: int):
+        with self._lock:
+            i = bisect_left(self._ids, question_id)
+            if i < len(self._ids) and self._ids[i] == question_id:
+                if not self.weighted:
+                    del self._ids[i]
+                elif question_id not in self._removed:
+                    self._removed.add(question_id)
+                    self._tree.set(i, 0.0)
+
+    def record(self, user_id: int, answers: List[dict], attempts: int):
+        # After a submission commits: answers are its graded rows, attempts is globalstats.attempts
+        # right after it (one that committed before the last load is already in the snapshot)
+        if not self.weighted:
+            return
+        mastered = mastered_questions.get(user_id)
+        with self._lock:
+            if mastered is not None:
+                # Under the lock: a draw may be iterating the same set
+                mastered.update(a["question_id"] for a in answers if a["is_correct"])
+            if self._loaded and attempts > self._loaded_attempts:
+                for a in answers:
+                    i = bisect_left(self._ids, a["question_id"])
+                    if i == len(self._ids) or self._ids[i] != a["question_id"] or a["question_id"] in self._removed:
+                        continue
+                    self._answered[i] += 1
+                    self._correct[i] += a["is_correct"]
+                    self._tree.set(i, question_weight(self._answered[i], self._correct[i]))
+                self._applied += 1
+
+    def load_mastered(self, session: Session, user_id: int) -> Set[int]:
+        mastered = mastered_questions.get(user_id)
+        if mastered is None:
+            mastered = set(session.exec(
+                select(AttemptAnswer.question_id)
+                .join(QuizAttempt, QuizAttempt.id == AttemptAnswer.attempt_id)
+                .where(QuizAttempt.user_id == user_id, AttemptAnswer.is_correct == True)  # noqa: E712
+            ).all())
+            mastered.discard(None)
+            mastered_questions.put(user_id, mastered, time.time() + QUIZ_MASTERED_TTL)
+        return mastered
+
+    def sample(self, k: int, exclude: Set[int] = frozenset()) -> List[int]:
+        with self._lock:
+            if not self.weighted:
+                return random.sample(self._ids, min(k, len(self._ids)))
+            return self._weighted_sample(min(k, len(self._ids) - len(self._removed)), exclude)
+
+    def _weighted_sample(self, k: int, exclude: Set[int]) -> List[int]:
+        # Successive draws without replacement: each pick is proportional to weight among
+        # the questions not yet picked, whose weights are zeroed until the draw is done.
+        # Excluded questions are redrawn; after as many redraws as there are excluded ones
+        # they are zeroed as well, and put back if nothing else is left.
+        tree = self._tree
+        picked = []
+        saved = []
+        excluded = []
+        rejections = 0
+        rejection_limit = max(REJECTION_LIMIT, len(exclude))
+        # Questions still holding a weight in the tree
+        remaining = len(self._ids) - len(self._removed)
+        try:
+            while len(picked) < k:
+                if remaining == 0:
+                    if not excluded:
+                        break
+                    for i, weight in excluded:
+                        tree.set(i, weight)
+                    remaining, excluded, exclude = len(excluded), [], frozenset()
+                i = tree.find(random.random() * tree.total())
+                weight = tree.weight(i)
+                if weight <= 0.0:
+                    # Rounding at the edge of a zeroed range
+                    continue
+                if self._ids[i] in exclude:
+                    rejections += 1
+                    if rejections > rejection_limit:
+                        excluded = self._zero(exclude)
+                        remaining -= len(excluded)
+                    continue
+                picked.append(self._ids[i])
+                saved.append((i, weight))
+                tree.set(i, 0.0)
+                remaining -= 1
+        finally:
+            for i, weight in excluded:
+                tree.set(i, weight)
+            for i, weight in reversed(saved):
+                tree.set(i, weight)
+        return picked
+
+    def _zero(self, question_ids: Set[int]):
+        zeroed = []
+        for qid in question_ids:
+            i = bisect_left(self._ids, qid)
+            if i < len(self._ids) and self._ids[i] == qid and self._tree.weight(i) > 0.0:
+                zeroed.append((i, self._tree.weight(i)))
+                self._tree.set(i, 0.0)
+        return zeroed
+
+    def draw(self, session: Session, k: int, user_id: int = None) -> List[dict]:
+        self.ensure_loaded(session)
+        exclude = self.load_mastered(session, user_id) if self.weighted and user_id is not None else frozenset()
+        for _ in range(2):
+            ids = self.sample(k, exclude)
+            found = load_questions(session, ids)
+            if len(found) == len(ids):
+                break
+            # Another process removed a sampled question; resync and retry.
+            self.load(session)
+        return [found[i] for i in ids if i in found]
+
+
+question_sampler = QuestionSampler()
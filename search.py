@@ -0,0 +1,146 @@
+import os
+import re
+import json
+import base64
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlmodel import Session
+
+# bm25 column weights: a match in the question text outranks one in the options
+SEARCH_TEXT_WEIGHT = float(os.getenv("SEARCH_TEXT_WEIGHT", "2.0"))
+SEARCH_OPTIONS_WEIGHT = float(os.getenv("SEARCH_OPTIONS_WEIGHT", "1.0"))
+MAX_SEARCH_TERMS = int(os.getenv("MAX_SEARCH_TERMS", "16"))
+
+
+
+def option_words(column: str) -> str:
+    # The options as indexed: the array's strings joined by spaces. The stored JSON escapes
+    # non-ASCII characters ("K\u00f6ln"), and FTS5 would only ever see the escapes
+    return f"(CASE WHEN json_valid({column}) THEN (SELECT group_concat(value, ' ') FROM json_each({column})) ELSE {column} END)"
+
+
+# External-content FTS5 index over question.text and the words of question.options. It
+# holds only the index, rows are read from question, and the triggers keep it in step with
+# every write, including bulk imports and raw SQL. prefix='2 3' adds prefix indexes so
+# short `term*` queries stay cheap.
+SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS question_fts USING fts5("
+    "text, options, content='question', content_rowid='id', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS question_fts_insert AFTER INSERT ON question BEGIN "
+    f"INSERT INTO question_fts (rowid, text, options) VALUES (new.id, new.text, {option_words('new.options')}); END",
+    "CREATE TRIGGER IF NOT EXISTS question_fts_delete AFTER DELETE ON question BEGIN "
+    f"INSERT INTO question_fts (question_fts, rowid, text, options) VALUES ('delete', old.id, old.text, {option_words('old.options')}); END",
+    "CREATE TRIGGER IF NOT EXISTS question_fts_update AFTER UPDATE OF text, options ON question BEGIN "
+    f"INSERT INTO question_fts (question_fts, rowid, text, options) VALUES ('delete', old.id, old.text, {option_words('old.options')}); "
+    f"INSERT INTO question_fts (rowid, text, options) VALUES (new.id, new.text, {option_words('new.options')}); END",
+]
+SEARCH_TRIGGERS = ["question_fts_insert", "question_fts_delete", "question_fts_update"]
+
+TERM = re.compile(r"\w+\*?")
+
+
+def create_search_index(conn):
+    # SQLite only (FTS5); other databases fall back to a LIKE scan in search_questions
+    if conn.dialect.name != "sqlite":
+        return
+    for statement in SEARCH_DDL:
+        conn.exec_driver_sql(statement)
+
+
+def rebuild_search_index(conn):
+    # Re-reads every question; for databases that predate the index or were loaded with the triggers missing.
+    # Not FTS5's 'rebuild', which would index the options as stored.
+    conn.exec_driver_sql("INSERT INTO question_fts (question_fts) VALUES ('delete-all')")
+    conn.exec_driver_sql(f"INSERT INTO question_fts (rowid, text, options) SELECT id, text, {option_words('options')} FROM question")
+    conn.exec_driver_sql("INSERT INTO question_fts (question_fts) VALUES ('optimize')")
+
+
+def match_query(q: str) -> str:
+    # Words are ANDed; a trailing * makes a prefix term. Everything else (quotes, operators,
+    # column filters) is dropped, so user input can never be an FTS5 syntax error.
+    terms = TERM.findall(q)[:MAX_SEARCH_TERMS]
+    if not terms:
+        raise HTTPException(status_code=400, detail="Search query has no words")
+    return " ".join(f'"{t[:-1]}"*' if t.endswith("*") else f'"{t}"' for t in terms)
+
+
+def encode_cursor(score: float, id: int) -> str:
+    return base64.urlsafe_b64encode(f"{score!r}|{id}".encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        score, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return float(score), int(id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+RANK = f"bm25(question_fts, {SEARCH_TEXT_WEIGHT!r}, {SEARCH_OPTIONS_WEIGHT!r})"
+
+# order=rank: best match first (bm25 is negative, lower is better), ties by id. Every match
+# is scored before the first page is known, so a word in most questions costs time in
+# proportion; the inner query ranks on the index alone and only the page is joined to
+# question. order=id walks the index in id order and stops after the page.
+# Pages are keyset on (score, id); score is 0 throughout with order=id.
+FTS_SEARCH = {
+    "rank": f"""
+        SELECT question.id, question.text, question.options, question.correct_answer, ranked.score
+        FROM (
+            SELECT rowid, {RANK} AS score FROM question_fts
+            WHERE question_fts MATCH :match {{after}}
+            ORDER BY score, rowid
+            LIMIT :limit
+        ) AS ranked
+        JOIN question ON question.id = ranked.rowid
+        ORDER BY ranked.score, ranked.rowid
+    """,
+    "id": """
+        SELECT question.id, question.text, question.options, question.correct_answer, 0.0 AS score
+        FROM question_fts JOIN question ON question.id = question_fts.rowid
+        WHERE question_fts MATCH :match {after}
+        ORDER BY question_fts.rowid
+        LIMIT :limit
+    """,
+}
+
+LIKE_SEARCH = """
+    SELECT id, text, options, correct_answer, 0.0 AS score
+    FROM question
+    WHERE {terms} {after}
+    ORDER BY id
+    LIMIT :limit
+"""
+
+
+def search_questions(session: Session, q: str, limit: int, cursor: Optional[str] = None, order: str = "rank"):
+    # limit + 1 rows are fetched, so the caller can tell whether there is a next page
+    params = {"limit": limit + 1}
+    if session.get_bind().dialect.name == "sqlite":
+        params["match"] = match_query(q)
+        after = ""
+        if cursor:
+            params["score"], params["id"] = decode_cursor(cursor)
+            if order == "rank":
+                after = f"AND ({RANK}, rowid) > (:score, :id)"
+            else:
+                after = "AND question_fts.rowid > :id"
+        statement = FTS_SEARCH[order].format(after=after)
+    else:
+        # No ranking or tokenizer here: every word must appear as a substring, in id order
+        terms = [t.rstrip("*") for t in TERM.findall(q)[:MAX_SEARCH_TERMS]]
+        if not terms:
+            raise HTTPException(status_code=400, detail="Search query has no words")
+        conditions = []
+        for i, term in enumerate(terms):
+            params[f"term{i}"] = f"%{term}%"
+            # options are matched as stored, so the term is escaped the way json.dumps wrote them
+            params[f"option{i}"] = f"%{json.dumps(term)[1:-1]}%"
+            conditions.append(f"(text LIKE :term{i} OR options LIKE :option{i})")
+        after = ""
+        if cursor:
+            _, params["id"] = decode_cursor(cursor)
+            after = "AND id > :id"
+        statement = LIKE_SEARCH.format(terms=" AND ".join(conditions), after=after)
+    return session.execute(text(statement), params).all()
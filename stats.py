@@ -0,0 +1,77 @@
+from typing import List, Optional, Tuple
+from sqlalchemy import Integer, cast, delete, func, insert, literal, select, text
+from sqlmodel import Session
+from models import QuizAttempt, AttemptAnswer, UserStats, QuestionStats, GlobalStats
+from retention import fold_archived_stats
+
+# Upserts as text: SQLite (3.35+ for RETURNING) and PostgreSQL share the syntax, and SQLAlchemy
+# cannot cache its on_conflict_do_update() construct, which then recompiles on every submission
+ATTEMPT_TOTALS = """
+INSERT INTO {table} ({key}, attempts, total_score, best_score, total_questions)
+VALUES (:key, 1, :score, :score, :total_questions)
+ON CONFLICT ({key}) DO UPDATE SET
+    attempts = {table}.attempts + 1,
+    total_score = {table}.total_score + excluded.total_score,
+    best_score = CASE WHEN excluded.best_score > {table}.best_score THEN excluded.best_score ELSE {table}.best_score END,
+    total_questions = {table}.total_questions + excluded.total_questions
+RETURNING best_score, total_score, attempts
+"""
+UPSERT_USER_STATS = text(ATTEMPT_TOTALS.format(table="userstats", key="user_id"))
+UPSERT_GLOBAL_STATS = text(ATTEMPT_TOTALS.format(table="globalstats", key="id"))
+UPSERT_QUESTION_STATS = text("""
+INSERT INTO questionstats (question_id, answered, correct) VALUES (:question_id, 1, :correct)
+ON CONFLICT (question_id) DO UPDATE SET
+    answered = questionstats.answered + 1,
+    correct = questionstats.correct + excluded.correct
+""")
+
+
+# Called from submit_quiz before its commit, so the aggregates always match the
+# attempts that were actually written. Returns the user's new best and total score
+# and the new global attempt count (for the leaderboard).
+def record_attempt(session: Session, user_id: int, score: int, total_questions: int, answers: List[dict]) -> Tuple[int, int, int]:
+    user = session.execute(UPSERT_USER_STATS, {"key": user_id, "score": score, "total_questions": total_questions}).one()
+    totals = session.execute(UPSERT_GLOBAL_STATS, {"key": 1, "score": score, "total_questions": total_questions}).one()
+    if answers:
+        session.execute(UPSERT_QUESTION_STATS, [{"question_id": a["question_id"], "correct": int(a["is_correct"])} for a in answers])
+    return user.best_score, user.total_score, totals.attempts
+
+
+def rebuild_stats(conn):
+    # Recomputes every aggregate from quizattempt/attemptanswer and the archive; works on a Session or a Connection
+    for model in (UserStats, QuestionStats, GlobalStats):
+        conn.execute(delete(model))
+    conn.execute(insert(UserStats).from_select(
+        ["user_id", "attempts", "total_score", "best_score", "total_questions"],
+        select(QuizAttempt.user_id, func.count(), func.sum(QuizAttempt.score), func.max(QuizAttempt.score), func.sum(QuizAttempt.total_questions))
+        .group_by(QuizAttempt.user_id),
+    ))
+    conn.execute(insert(QuestionStats).from_select(
+        ["question_id", "answered", "correct"],
+        select(AttemptAnswer.question_id, func.count(), func.sum(cast(AttemptAnswer.is_correct, Integer)))
+        .where(AttemptAnswer.question_id.is_not(None))
+        .group_by(AttemptAnswer.question_id),
+    ))
+    conn.execute(insert(GlobalStats).from_select(
+        ["id", "attempts", "total_score", "best_score", "total_questions"],
+        select(literal(1), func.count(), func.coalesce(func.sum(QuizAttempt.score), 0), func.coalesce(func.max(QuizAttempt.score), 0),
+               func.coalesce(func.sum(QuizAttempt.total_questions), 0)),
+    ))
+    fold_archived_stats(conn)
+
+
+def totals(row) -> dict:
+    if row is None:
+        return {"attempts": 0, "best_score": 0, "average_score": 0.0, "total_questions": 0}
+    return {
+        "attempts": row.attempts,
+        "best_score": row.best_score,
+        "average_score": row.total_score / row.attempts if row.attempts else 0.0,
+        "total_questions": row.total_questions,
+    }
+
+
+def question_totals(row: Optional[QuestionStats]) -> dict:
+    answered = row.answered if row else 0
+    correct = row.correct if row else 0
+    return {"answered": answered, "correct": correct, "correct_rate": correct / answered if answered else 0.0}
@@ -0,0 +1,115 @@
+"""
+Query-plan checks for every route.
+
+Runs each endpoint in-process against a seeded SQLite file, captures the
+SELECTs it issues and asserts via EXPLAIN QUERY PLAN that none of them
+scans a table or sorts without an index. Endpoints that are meant to read
+a whole table (GET /questions) are allowed to scan it, and ranked search
+to sort its matches.
+
+Run with: python -m pytest test_query_plans.py
+"""
+
+import pytest
+from sqlalchemy import event
+from fastapi.testclient import TestClient
+import main
+from database import engine
+from cache import caches
+from auth import create_access_token
+from hashing import hash_password
+
+captured = []
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def capture(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip().upper().startswith("SELECT") and not executemany:
+        captured.append((statement, parameters))
+
+
+def explain(statement, parameters):
+    raw = engine.raw_connection()
+    try:
+        return [row[3] for row in raw.cursor().execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()]
+    finally:
+        raw.close()
+
+
+def unindexed(plan, allowed_scans=()):
+    bad = []
+    for detail in plan:
+        if detail.startswith("SCAN ") and "USING" not in detail and detail.split()[1] not in allowed_scans:
+            bad.append(detail)
+        if "USE TEMP B-TREE" in detail and "TEMP B-TREE" not in allowed_scans:
+            bad.append(detail)
+    return bad
+
+
+@pytest.fixture(scope="module")
+def client():
+    raw = engine.raw_connection()
+    cur = raw.cursor()
+    cur.executemany("INSERT INTO user (email, hashed_password, is_admin) VALUES (?, ?, ?)",
+                    [("admin@example.com", hash_password("pw"), 1)] + [(f"u{i}@example.com", "x", 0) for i in range(200)])
+    cur.executemany("INSERT INTO question (text, options, correct_answer) VALUES (?, ?, ?)",
+                    [(f"Q{i}", '["a", "b"]', "a") for i in range(200)])
+    raw.commit()
+    raw.close()
+    with TestClient(main.app) as c:
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': 'admin@example.com'})}"}
+        for _ in range(5):
+            c.post("/quiz/result", json={"answers": {"1": "a", "2": "b", "3": "a"}}, headers=headers)
+        c.headers.update(headers)
+        yield c
+
+
+# One-time loads of in-process structures, which read the whole table by design
+FULL_LOADS = {
+    "SELECT question.id FROM question",
+    "SELECT question.id, questionstats.answered, questionstats.correct FROM question "
+    "LEFT OUTER JOIN questionstats ON questionstats.question_id = question.id ORDER BY question.id",
+    "SELECT userstats.user_id, userstats.best_score, userstats.total_score FROM userstats",
+}
+
+ROUTES = [
+    ("GET", "/quiz", None, ()),
+    ("POST", "/quiz/result", {"answers": {"4": "a", "5": "b"}}, ()),
+    ("GET", "/quiz/attempts", None, ()),
+    ("GET", "/quiz/attempts?limit=2", None, ()),
+    ("GET", "/quiz/attempts/all", None, ()),
+    ("GET", "/quiz/attempts/all?limit=2", None, ()),
+    ("GET", "/quiz/attempts/1", None, ()),
+    ("GET", "/questions", None, ("question",)),
+    ("GET", "/questions/export", None, ("question",)),
+    # The FTS5 index is the scan; the bm25 order is computed per query, so the matches are
+    # sorted, and "ranked" is the page they are cut down to
+    ("GET", "/questions/search?q=Q1*&limit=5", None, ("question_fts", "ranked", "TEMP B-TREE")),
+    ("GET", "/questions/search?q=Q1*&limit=5&order=id", None, ("question_fts",)),
+    ("GET", "/questions/7", None, ()),
+    ("PUT", "/questions/8", {"text": "Q8", "options": ["a", "b"], "correct_answer": "b"}, ()),
+    ("DELETE", "/questions/9", None, ()),
+    ("GET", "/stats/me", None, ()),
+    ("GET", "/stats/users/1", None, ()),
+    ("GET", "/stats/questions/1", None, ()),
+    ("GET", "/stats/questions/150", None, ()),
+    ("GET", "/stats/global", None, ()),
+    ("GET", "/leaderboard", None, ()),
+    ("GET", "/leaderboard/me?by=total", None, ()),
+]
+
+
+@pytest.mark.parametrize("method,url,body,allowed_scans", ROUTES)
+def test_route_queries_use_indexes(client, method, url, body, allowed_scans):
+    # Start from cold caches so the route's own queries are the ones captured
+    for cache in caches.values():
+        cache.clear()
+    captured.clear()
+    response = client.request(method, url, json=body)
+    assert response.status_code == 200, response.text
+    assert captured, f"{method} {url} issued no queries"
+    for statement, parameters in captured:
+        if " ".join(statement.split()) in FULL_LOADS:
+            continue
+        bad = unindexed(explain(statement, parameters), allowed_scans)
+        assert not bad, f"{method} {url}: {statement} -> {bad}"
@@ -0,0 +1,79 @@
+"""
+Per-row error reporting of POST /questions/import.
+
+Imports NDJSON and CSV bodies that mix valid rows with malformed ones
+(bad JSON, missing or extra fields, short CSV rows) and checks that the
+valid rows are inserted and every bad row comes back in "errors" with
+its line number, instead of failing the request.
+
+Run with: python -m pytest test_question_import.py
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+import main
+from database import engine
+from auth import create_access_token
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as c:
+        raw = engine.raw_connection()
+        raw.cursor().execute("INSERT INTO user (email, hashed_password, is_admin) VALUES ('importer@example.com', 'x', 1)")
+        raw.commit()
+        raw.close()
+        c.headers.update({"Authorization": f"Bearer {create_access_token({'sub': 'importer@example.com'})}"})
+        yield c
+
+
+def import_body(client, body, format):
+    response = client.post(f"/questions/import?format={format}", content=body.encode())
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_malformed_ndjson_rows_are_reported(client):
+    body = "\n".join([
+        '{"text": "NDJSON 1", "options": ["a", "b"], "correct_answer": "a"}',
+        '{"text": "NDJSON 2", "options": ',
+        '{"text": "NDJSON 3"}',
+        '["not", "an", "object"]',
+        "",
+        '{"text": "NDJSON 4", "options": ["a", "b"], "correct_answer": "b"}',
+    ])
+    result = import_body(client, body, "ndjson")
+    assert result["inserted"] == 2
+    assert result["failed"] == 3
+    assert [e["line"] for e in result["errors"]] == [2, 3, 4]
+    assert "options" in result["errors"][1]["error"]
+
+
+def test_malformed_csv_rows_are_reported(client):
+    body = "\n".join([
+        "text,options,correct_answer",
+        'CSV 1,"[""a"", ""b""]",a',
+        "foo",
+        "CSV 2,not json,a",
+        'CSV 3,"[""a""]",a,extra',
+        '"CSV 4, on',
+        'two lines","[""a"", ""b""]",b',
+    ])
+    result = import_body(client, body, "csv")
+    assert result["inserted"] == 2
+    assert result["failed"] == 3
+    assert [e["line"] for e in result["errors"]] == [3, 4, 5]
+    assert result["errors"][0]["error"] == "Expected 3 fields, got 1"
+    assert result["errors"][2]["error"] == "Expected 3 fields, got 4"
+
+
+def test_csv_with_only_short_rows_inserts_nothing(client):
+    result = import_body(client, "text,options,correct_answer\nfoo\nbar,baz\n", "csv")
+    assert result == {
+        "inserted": 0,
+        "failed": 2,
+        "errors": [
+            {"line": 2, "error": "Expected 3 fields, got 1"},
+            {"line": 3, "error": "Expected 3 fields, got 2"},
+        ],
+    }
@@ -0,0 +1,91 @@
+"""
+Submissions graded against a quiz session.
+
+Issues a quiz, deletes one of its questions behind the worker's back (from
+another connection, as another worker would) and checks that the
+submission still succeeds, graded on the questions that are left. Also
+checks that QUIZ_SESSION_REQUIRED refuses submissions without a session.
+
+Run with: python -m pytest test_quiz_sessions.py
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+import main
+import quiz_sessions
+import routes.quiz
+from database import engine
+from auth import create_access_token
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as c:
+        raw = engine.raw_connection()
+        cur = raw.cursor()
+        cur.execute("INSERT INTO user (email, hashed_password, is_admin) VALUES ('sessions@example.com', 'x', 0)")
+        cur.executemany("INSERT INTO question (text, options, correct_answer) VALUES (?, ?, ?)",
+                        [(f"Session Q{i}", '["a", "b"]', "ab"[i % 2]) for i in range(10)])
+        raw.commit()
+        raw.close()
+        c.headers.update({"Authorization": f"Bearer {create_access_token({'sub': 'sessions@example.com'})}"})
+        yield c
+
+
+def raw_execute(statement, parameters=()):
+    raw = engine.raw_connection()
+    try:
+        rows = raw.cursor().execute(statement, parameters).fetchall()
+        raw.commit()
+        return rows
+    finally:
+        raw.close()
+
+
+def answer_key(ids):
+    # Correct answers of the questions that still exist
+    return dict(raw_execute(f"SELECT id, correct_answer FROM question WHERE id IN ({', '.join('?' * len(ids))})", ids))
+
+
+@pytest.mark.parametrize("store", ["memory", "sqlite"])
+def test_question_deleted_after_issue_is_dropped_from_grading(client, monkeypatch, store):
+    monkeypatch.setattr(quiz_sessions, "QUIZ_SESSION_STORE", store)
+    response = client.get("/quiz?count=3")
+    assert response.status_code == 200, response.text
+    ids = [q["id"] for q in response.json()]
+    # The sampler may also hand out a question an earlier case deleted behind its back
+    key = answer_key(ids)
+    deleted = next(iter(key))
+    raw_execute("DELETE FROM question WHERE id = ?", (deleted,))
+    del key[deleted]
+    answers = {str(qid): "a" for qid in ids}
+    answers.update({str(qid): correct for qid, correct in key.items()})
+
+    response = client.post("/quiz/result", json={"answers": answers, "session_id": response.headers["X-Quiz-Session"]})
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["score"] == len(key)
+    assert set(result["correct_answers"]) == {str(qid) for qid in key}
+
+    attempt_id = raw_execute("SELECT max(id) FROM quizattempt")[0][0]
+    details = client.get(f"/quiz/attempts/{attempt_id}").json()
+    assert details["score"] == len(key)
+    assert details["total_questions"] == 3
+    assert sorted(a["question_id"] for a in details["answers"]) == sorted(key)
+
+
+def test_session_required(client, monkeypatch):
+    monkeypatch.setattr(routes.quiz, "QUIZ_SESSION_REQUIRED", True)
+    issued = client.get("/quiz?count=2")
+    ids = [q["id"] for q in issued.json()]
+    # The sampler may still hand out a question the case above deleted; it is not graded
+    key = answer_key(ids)
+    answers = {str(qid): key.get(qid, "a") for qid in ids}
+
+    response = client.post("/quiz/result", json={"answers": answers})
+    assert response.status_code == 400
+    assert "session_id" in response.json()["detail"]
+
+    response = client.post("/quiz/result", json={"answers": answers, "session_id": issued.headers["X-Quiz-Session"]})
+    assert response.status_code == 200, response.text
+    assert response.json() == {"score": len(key), "correct_answers": {str(qid): correct for qid, correct in key.items()}}
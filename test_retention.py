@@ -0,0 +1,64 @@
+"""
+Archived attempts after the questions they answered are deleted.
+
+Archives an attempt, deletes one of the questions it answered and creates
+a new question. The new question must not take the deleted one's id: the
+archived detail keeps leaving that answer out, and rebuild-stats does not
+credit it to the new question.
+
+Run with: python -m pytest test_retention.py
+"""
+
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+import main
+from database import engine
+from auth import create_access_token
+from retention import archive_attempts
+from stats import rebuild_stats
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as c:
+        raw = engine.raw_connection()
+        raw.cursor().execute("INSERT INTO user (email, hashed_password, is_admin) VALUES ('archivist@example.com', 'x', 1)")
+        raw.commit()
+        raw.close()
+        c.headers.update({"Authorization": f"Bearer {create_access_token({'sub': 'archivist@example.com'})}"})
+        yield c
+
+
+def create_question(client, text, answer):
+    response = client.post("/questions", json={"text": text, "options": ["a", "b"], "correct_answer": answer})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_deleted_question_id_is_not_reused_by_archived_answers(client):
+    kept = create_question(client, "Kept question", "a")
+    deleted = create_question(client, "Deleted question", "b")
+    archived = client.post("/quiz/result", json={"answers": {str(kept): "a", str(deleted): "b"}})
+    assert archived.json()["score"] == 2
+    # The newest attempt is never archived, so a second one lets the first go
+    client.post("/quiz/result", json={"answers": {str(kept): "b"}})
+    attempt_id = next(a["attempt_id"] for a in client.get("/quiz/attempts").json() if a["score"] == 2)
+    assert archive_attempts(engine, days=0, now=datetime.utcnow() + timedelta(days=1)) == 1
+    assert attempt_id not in [a["attempt_id"] for a in client.get("/quiz/attempts").json()]
+
+    assert client.delete(f"/questions/{deleted}").status_code == 200
+    recreated = create_question(client, "Brand new unrelated question", "a")
+    assert recreated != deleted
+
+    details = client.get(f"/quiz/attempts/{attempt_id}")
+    assert details.status_code == 200, details.text
+    assert details.json()["score"] == 2
+    assert [(a["question_id"], a["question_text"]) for a in details.json()["answers"]] == [(kept, "Kept question")]
+
+    with Session(engine) as session:
+        rebuild_stats(session)
+        session.commit()
+    assert client.get(f"/stats/questions/{recreated}").json()["answered"] == 0
+    assert client.get(f"/stats/questions/{kept}").json()["answered"] == 2
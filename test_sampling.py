@@ -0,0 +1,132 @@
+"""
+Distribution checks for the weighted question sampler.
+
+Draws many quizzes from a sampler filled in memory (no database) with a
+fixed seed, and compares how often each question comes up with what its
+weight implies: a chi-square goodness-of-fit test for single draws, and
+per-question inclusion probabilities for draws without replacement.
+Also checks the Fenwick tree against plain sums and that exclusions,
+deletions and incremental weight updates behave.
+
+Run with: python -m pytest test_sampling.py
+"""
+
+import math
+import random
+from collections import Counter
+import pytest
+from sampling import FenwickTree, QuestionSampler, question_weight
+
+DRAWS = 40_000
+# Chi-square critical values at p = 0.001, by degrees of freedom
+CHI2_CRITICAL = {19: 43.82}
+
+
+@pytest.fixture(autouse=True)
+def seed():
+    random.seed(12345)
+
+
+def make_sampler(n=20):
+    sampler = QuestionSampler(weighted=True)
+    ids = list(range(1, n + 1))
+    # From never answered to answered 50 times, with all sorts of miss rates
+    answered = [(i * 7) % 51 for i in range(n)]
+    correct = [a * ((i * 3) % 5) // 4 for i, a in enumerate(answered)]
+    sampler.replace(ids, answered, correct)
+    return sampler, {qid: question_weight(a, c) for qid, a, c in zip(ids, answered, correct)}
+
+
+def test_fenwick_tree_matches_plain_sums():
+    weights = [random.random() for _ in range(100)]
+    tree = FenwickTree(weights)
+    for _ in range(200):
+        i = random.randrange(len(weights))
+        weights[i] = random.random()
+        tree.set(i, weights[i])
+    for _ in range(37):
+        weights.append(random.random())
+        tree.append(weights[-1])
+    for i in range(len(weights) + 1):
+        assert tree.prefix(i) == pytest.approx(sum(weights[:i]))
+    for i in range(len(weights)):
+        # Just inside the start and end of each weight's cumulative range
+        start = sum(weights[:i])
+        assert tree.find(start + weights[i] * 1e-6) == i
+        assert tree.find(start + weights[i] * (1 - 1e-6)) == i
+
+
+def test_single_draws_follow_weights():
+    sampler, weights = make_sampler()
+    counts = Counter(sampler.sample(1)[0] for _ in range(DRAWS))
+    total = sum(weights.values())
+    chi2 = sum((counts[qid] - DRAWS * w / total) ** 2 / (DRAWS * w / total) for qid, w in weights.items())
+    assert chi2 < CHI2_CRITICAL[len(weights) - 1], counts
+
+
+def test_draws_without_replacement_follow_inclusion_probabilities():
+    sampler, weights = make_sampler()
+    total = sum(weights.values())
+    p = {qid: w / total for qid, w in weights.items()}
+    draws = DRAWS // 2
+    counts = Counter()
+    for _ in range(draws):
+        quiz = sampler.sample(2)
+        assert len(set(quiz)) == 2
+        counts.update(quiz)
+    for qid, pi in p.items():
+        # Picked first, or second after some other question j was taken out
+        inclusion = pi + sum(pj * pi / (1 - pj) for j, pj in p.items() if j != qid)
+        sd = math.sqrt(draws * inclusion * (1 - inclusion))
+        assert abs(counts[qid] - draws * inclusion) < 4.5 * sd, (qid, counts[qid], draws * inclusion)
+
+
+def test_excluded_questions_are_not_drawn_while_others_remain():
+    sampler, weights = make_sampler()
+    # The heaviest questions, so plain redraws would keep hitting them
+    exclude = set(sorted(weights, key=weights.get)[-12:])
+    for _ in range(2000):
+        quiz = sampler.sample(8, exclude)
+        assert len(set(quiz)) == 8
+        assert not exclude & set(quiz)
+
+
+def test_excluded_questions_fill_in_when_nothing_else_is_left():
+    sampler, weights = make_sampler()
+    exclude = set(list(weights)[:17])
+    quiz = sampler.sample(5, exclude)
+    assert len(set(quiz)) == 5
+    assert set(weights) - exclude <= set(quiz)
+    # The draw leaves every weight as it found it
+    assert sampler._tree.total() == pytest.approx(sum(weights.values()))
+
+
+def test_removed_questions_are_not_drawn_and_added_ones_are():
+    sampler, weights = make_sampler()
+    sampler.remove(3)
+    sampler.add(21)
+    assert 3 not in sampler and 21 in sampler and len(sampler) == 20
+    drawn = Counter(q for _ in range(2000) for q in sampler.sample(3))
+    assert drawn[3] == 0 and drawn[21] > 0
+    assert len(sampler.sample(50)) == 20
+    # SQLite hands a deleted highest id out again
+    sampler.remove(21)
+    sampler.add(21)
+    assert 21 in sampler and sampler._tree.weight(20) == question_weight(0, 0)
+
+
+def test_graded_answers_update_weights_in_place():
+    sampler, _ = make_sampler()
+    sampler._loaded_attempts = 10
+    answers = [{"question_id": 1, "is_correct": False}, {"question_id": 2, "is_correct": True}, {"question_id": 99, "is_correct": True}]
+    sampler.record(7, answers, attempts=11)
+    # Already in the loaded snapshot: not counted twice
+    sampler.record(7, answers, attempts=10)
+    fresh = QuestionSampler(weighted=True)
+    answered = list(sampler._answered)
+    correct = list(sampler._correct)
+    fresh.replace(list(sampler._ids), answered, correct)
+    assert (answered[0], correct[0]) == (1, 0)
+    for i in range(len(answered)):
+        assert sampler._tree.weight(i) == fresh._tree.weight(i)
+        assert sampler._tree.prefix(i + 1) == pytest.approx(fresh._tree.prefix(i + 1))
@@ -0,0 +1,55 @@
+"""
+Full-text search over questions whose options are not ASCII.
+
+Options are stored as JSON with non-ASCII characters escaped; the index
+has to hold the words themselves. Checks that they are found after an
+insert, an update, a delete and a full rebuild of the index.
+
+Run with: python -m pytest test_search.py
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+import main
+from database import engine
+from auth import create_access_token
+from search import rebuild_search_index
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as c:
+        raw = engine.raw_connection()
+        raw.cursor().execute("INSERT INTO user (email, hashed_password, is_admin) VALUES ('searcher@example.com', 'x', 1)")
+        raw.commit()
+        raw.close()
+        c.headers.update({"Authorization": f"Bearer {create_access_token({'sub': 'searcher@example.com'})}"})
+        yield c
+
+
+def found(client, q):
+    response = client.get("/questions/search", params={"q": q})
+    assert response.status_code == 200, response.text
+    return [item["id"] for item in response.json()]
+
+
+def test_non_ascii_option_words_are_found(client):
+    response = client.post("/questions", json={"text": "Where is the cathedral?", "options": ["Köln", "München"], "correct_answer": "Köln"})
+    assert response.status_code == 200, response.text
+    qid = response.json()["id"]
+    assert found(client, "Köln") == [qid]
+    assert found(client, "München") == [qid]
+    assert found(client, "Mün*") == [qid]
+    # Not the escapes the options are stored with
+    assert found(client, "u00f6ln") == []
+
+    client.put(f"/questions/{qid}", json={"text": "Where is the cathedral?", "options": ["Zürich", "Genève"], "correct_answer": "Zürich"})
+    assert found(client, "Köln") == []
+    assert found(client, "Genève") == [qid]
+
+    with engine.begin() as conn:
+        rebuild_search_index(conn)
+    assert found(client, "Zürich") == [qid]
+
+    client.delete(f"/questions/{qid}")
+    assert found(client, "Zürich") == []
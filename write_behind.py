@@ -0,0 +1,282 @@
+import os
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from itertools import count
+from typing import List, Tuple
+import orjson
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.engine import make_url
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+from database import engine, DATABASE_URL
+from models import QuizAttempt, AttemptAnswer, Result, Question, WriteBehindCheckpoint
+from stats import record_attempt
+from retention import LEGACY_RESULTS
+from response_cache import attempt_versions
+from leaderboard import leaderboard
+from sampling import question_sampler
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single worker is assumed
+    fcntl = None
+
+# Off by default. When on, POST /quiz/result answers once the attempt is in the spool
+# file, and a background writer commits attempts in groups.
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND_BATCH = int(os.getenv("WRITE_BEHIND_BATCH", "200"))
+WRITE_BEHIND_INTERVAL_MS = int(os.getenv("WRITE_BEHIND_INTERVAL_MS", "50"))
+# Submissions accepted but not yet committed; beyond this POST /quiz/result answers 503
+WRITE_BEHIND_QUEUE = int(os.getenv("WRITE_BEHIND_QUEUE", "10000"))
+WRITE_BEHIND_RETRY_AFTER = int(os.getenv("WRITE_BEHIND_RETRY_AFTER", "1"))
+
+logger = logging.getLogger("write_behind")
+
+
+def default_spool() -> str:
+    url = make_url(DATABASE_URL)
+    if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:"):
+        return url.database + ".spool"
+    return "quiz.spool"
+
+
+# Spool files are <prefix>.<slot>; each process holds one slot, locked while it runs
+WRITE_BEHIND_SPOOL = os.getenv("WRITE_BEHIND_SPOOL", default_spool())
+
+
+# Accepted submissions are appended to a spool file (one fsync for everything that
+# arrived meanwhile) before the client gets its score, then written to the database
+# WRITE_BEHIND_BATCH at a time, or every WRITE_BEHIND_INTERVAL_MS, in one transaction
+# that also records the last spooled sequence number written. After a crash the
+# spool entries past that number are written at the next start, exactly once.
+class WriteBehind:
+    def __init__(self, spool_prefix: str, batch: int, interval_ms: int, max_pending: int):
+        self.spool_prefix = spool_prefix
+        self.batch = batch
+        self.interval = interval_ms / 1000
+        self.max_pending = max_pending
+        self.pending = 0
+        self.accepted = 0
+        self.written = 0
+        self.batches = 0
+        self.rejected = 0
+        self.replayed = 0
+        self.running = False
+        self.slot = None
+        self._file = None
+        self._seq = 0
+        self._spooled_seq = 0
+        self._file_lock = threading.Lock()
+        self._spool_buffer = []
+        self._queue = []
+
+    def check_capacity(self):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503, detail="Server busy, try again shortly",
+                headers={"Retry-After": str(WRITE_BEHIND_RETRY_AFTER)},
+            )
+
+    async def submit(self, user_id: int, score: int, total_questions: int, attempted_at: datetime, answers: List[dict]):
+        # Returns once the attempt is durable in the spool; the database write follows
+        self.check_capacity()
+        self.pending += 1
+        self._seq += 1
+        record = {
+            "seq": self._seq, "user_id": user_id, "score": score, "total_questions": total_questions,
+            "attempted_at": attempted_at,
+            "answers": [[a["question_id"], a["selected_option"], a["is_correct"]] for a in answers],
+        }
+        future = asyncio.get_running_loop().create_future()
+        self._spool_buffer.append((record, future))
+        self._spool_wakeup.set()
+        await future
+        self.accepted += 1
+
+    async def start(self):
+        await run_in_threadpool(self._open)
+        self._spool_wakeup = asyncio.Event()
+        self._queue_wakeup = asyncio.Event()
+        self.running = True
+        self._spool_task = asyncio.create_task(self._spool_loop())
+        self._write_task = asyncio.create_task(self._write_loop())
+
+    async def stop(self):
+        # Shutdown hook: everything accepted is committed before the process exits
+        if not self.running:
+            return
+        self.running = False
+        self._spool_wakeup.set()
+        await self._spool_task
+        self._queue_wakeup.set()
+        await self._write_task
+        await run_in_threadpool(self._close)
+
+    def _open(self):
+        for slot in count():
+            spool = open(f"{self.spool_prefix}.{slot}", "a+b")
+            if fcntl is None:
+                break
+            try:
+                fcntl.flock(spool, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                # Held by another worker
+                spool.close()
+        self.slot, self._file = slot, spool
+        spool.seek(0)
+        records = []
+        for line in spool:
+            try:
+                records.append(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                # A write torn by a crash; its fsync never returned, so it was never acknowledged
+                break
+        with Session(engine) as session:
+            checkpoint = session.get(WriteBehindCheckpoint, slot)
+            done = checkpoint.seq if checkpoint else 0
+        todo = [r for r in records if r["seq"] > done]
+        for r in todo:
+            r["attempted_at"] = datetime.fromisoformat(r["attempted_at"])
+        for i in range(0, len(todo), self.batch):
+            self._write(todo[i:i + self.batch])
+        if todo:
+            logger.warning("Wrote %d spooled submissions left by the previous run (slot %d)", len(todo), slot)
+        self.replayed = len(todo)
+        self._seq = self._spooled_seq = max(done, records[-1]["seq"] if records else 0)
+        spool.truncate(0)
+
+    def _close(self):
+        with self._file_lock:
+            self._file.close()
+            self._file = None
+
+    def _append(self, records: List[dict], last_seq: int):
+        data = b"".join(orjson.dumps(r) + b"\n" for r in records)
+        with self._file_lock:
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._spooled_seq = last_seq
+
+    def _truncate(self, committed_seq: int):
+        # Only when nothing was spooled after the last commit
+        with self._file_lock:
+            if self._spooled_seq == committed_seq:
+                self._file.truncate(0)
+
+    async def _spool_loop(self):
+        # Checked after every batch rather than on a wakeup: stop()'s wakeup may have been
+        # taken by the batch in flight when it came
+        while self.running or self._spool_buffer:
+            if not self._spool_buffer:
+                await self._spool_wakeup.wait()
+                self._spool_wakeup.clear()
+                continue
+            batch, self._spool_buffer = self._spool_buffer, []
+            records = [record for record, _ in batch]
+            try:
+                await run_in_threadpool(self._append, records, records[-1]["seq"])
+            except Exception as e:
+                logger.error("Spool write failed: %s", e)
+                self.pending -= len(batch)
+                for _, future in batch:
+                    future.set_exception(HTTPException(status_code=503, detail="Could not record the submission, try again"))
+                continue
+            self._queue.extend(records)
+            self._queue_wakeup.set()
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._queue_wakeup.wait()
+            self._queue_wakeup.clear()
+            if not self._queue:
+                if not self.running and self._spool_task.done():
+                    return
+                continue
+            # Group commit: wait for a full batch, or at most the interval
+            deadline = loop.time() + self.interval
+            while len(self._queue) < self.batch and self.running and loop.time() < deadline:
+                self._queue_wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._queue_wakeup.wait(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    break
+            batch = self._queue[:self.batch]
+            del self._queue[:self.batch]
+            try:
+                totals = await run_in_threadpool(self._write, batch)
+            except Exception as e:
+                # Still spooled; retried after the interval (the checkpoint keeps it from being written twice)
+                logger.error("Write of %d submissions failed, retrying: %s", len(batch), e)
+                self._queue[:0] = batch
+                await asyncio.sleep(self.interval)
+                self._queue_wakeup.set()
+                continue
+            self.pending -= len(batch)
+            self.written += len(batch)
+            self.batches += 1
+            for user_id, graded, best_score, total_score, total_attempts in totals:
+                leaderboard.record(user_id, best_score, total_score, total_attempts)
+                question_sampler.record(user_id, graded, total_attempts)
+            if self._queue or not self.running:
+                self._queue_wakeup.set()
+            else:
+                await run_in_threadpool(self._truncate, batch[-1]["seq"])
+
+    def _write(self, records: List[dict]) -> List[Tuple[int, List[dict], int, int, int]]:
+        with Session(engine) as session:
+            # Questions deleted since grading keep their answers with a NULL question_id, as on delete
+            question_ids = {a[0] for r in records for a in r["answers"]}
+            existing = set(session.execute(select(Question.id).where(Question.id.in_(question_ids))).scalars()) if question_ids else set()
+            attempt_ids = session.execute(
+                insert(QuizAttempt).returning(QuizAttempt.id, sort_by_parameter_order=True),
+                [{"user_id": r["user_id"], "score": r["score"], "total_questions": r["total_questions"], "attempted_at": r["attempted_at"]} for r in records],
+            ).scalars().all()
+            answers = [
+                {"attempt_id": attempt_id, "question_id": qid if qid in existing else None, "selected_option": selected,
+                 "is_correct": is_correct, "attempted_at": r["attempted_at"]}
+                for attempt_id, r in zip(attempt_ids, records) for qid, selected, is_correct in r["answers"]
+            ]
+            if answers:
+                session.execute(insert(AttemptAnswer), answers)
+            if LEGACY_RESULTS == "table":
+                session.execute(insert(Result), [{"user_id": r["user_id"], "score": r["score"]} for r in records])
+            totals = []
+            for r in records:
+                graded = [{"question_id": qid, "is_correct": is_correct} for qid, _, is_correct in r["answers"] if qid in existing]
+                totals.append((r["user_id"], graded, *record_attempt(session, r["user_id"], r["score"], r["total_questions"], graded)))
+            session.merge(WriteBehindCheckpoint(slot=self.slot, seq=records[-1]["seq"]))
+            version = attempt_versions.bump(session)
+            session.commit()
+            attempt_versions.applied(version)
+        return totals
+
+    def stats(self):
+        return {
+            "enabled": self.running,
+            "slot": self.slot,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "accepted": self.accepted,
+            "written": self.written,
+            "batches": self.batches,
+            "rejected": self.rejected,
+            "replayed": self.replayed,
+        }
+
+
+write_behind = WriteBehind(WRITE_BEHIND_SPOOL, WRITE_BEHIND_BATCH, WRITE_BEHIND_INTERVAL_MS, WRITE_BEHIND_QUEUE)
+
+
+async def start_write_behind():
+    if WRITE_BEHIND:
+        await write_behind.start()